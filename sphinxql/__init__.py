@@ -1 +1,3 @@
+from .memoization import memo
+
 default_app_config = 'sphinxql.apps.SphinxQL'
@@ -3,7 +3,6 @@ import logging
 from django.apps import AppConfig, apps
 
 from sphinxql.configuration import indexes_configurator
-from django.db.utils import InternalError, OperationalError
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +12,9 @@ class SphinxQL(AppConfig):
 
     def ready(self):
         """
-        Loads all indexes and configures Sphinx. When db isn't ready, it logs
-        it and doesn't index the models.
+        Loads all indexes and configures what querying Sphinx needs. The SQL
+        of the sources is only built by the commands that need it (e.g.
+        ``generate_sphinx_conf``), so starting does not access the database.
         """
         for app in apps.get_app_configs():
             module_name = app.module.__package__ + '.indexes'
@@ -26,8 +26,4 @@ class SphinxQL(AppConfig):
                 # ignore apps without indexes.
                 pass
 
-        try:
-            indexes_configurator.configure()
-        except (InternalError, OperationalError):
-            logger.exception('Sphinx was not configured properly, please check.')
-            raise
+        indexes_configurator.configure_runtime()
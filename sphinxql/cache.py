@@ -0,0 +1,176 @@
+"""
+Opt-in cache of Sphinx results, enabled by ``settings.INDEXES['result_cache']``.
+
+Results are keyed by the compiled SQL, its parameters and the generation of the
+queried indexes. Bumping the generation of an index (e.g. on a reindex)
+invalidates every result cached for it.
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+DEFAULT_TIMEOUT = 300
+DEFAULT_LOCK_TIMEOUT = 10
+
+# generation of all indexes, bumped when every index changes.
+ALL_INDEXES = '__all__'
+
+# number of locks shared by keys to protect misses within a process.
+LOCKS_NUM = 64
+
+
+class ResultCache(object):
+    """
+    Caches the rows and the `SHOW META` of queries in a Django cache.
+
+    A miss is fetched once: concurrent misses of the same key in this process
+    wait on a lock, and misses in other processes wait on a lock in the cache
+    for at most `lock_timeout` seconds, after which they hit Sphinx anyway.
+    """
+    def __init__(self, alias='default', timeout=DEFAULT_TIMEOUT,
+                 lock_timeout=DEFAULT_LOCK_TIMEOUT, key_prefix='sphinxql'):
+        self.alias = alias
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+        self.key_prefix = key_prefix
+
+        self._locks = [threading.Lock() for _ in range(LOCKS_NUM)]
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation_key(self, index_name):
+        return '%s:generation:%s' % (self.key_prefix, index_name)
+
+    def get_generations(self, index_names):
+        """
+        Returns the list of generations of the indexes `index_names`, preceded
+        by the generation of all indexes.
+        """
+        keys = [self._generation_key(name)
+                for name in [ALL_INDEXES] + list(index_names)]
+        generations = self.cache.get_many(keys)
+
+        for key in keys:
+            if key not in generations:
+                # start from the time so a generation evicted from the cache
+                # does not collide with the previous ones.
+                self.cache.add(key, int(time.time() * 1000), None)
+                generations[key] = self.cache.get(key)
+        return [generations[key] for key in keys]
+
+    def bump_generation(self, index_names=None):
+        """
+        Bumps the generation of the indexes `index_names`, or of all indexes
+        if None.
+        """
+        if index_names is None:
+            index_names = [ALL_INDEXES]
+
+        for name in index_names:
+            key = self._generation_key(name)
+            try:
+                self.cache.incr(key)
+            except ValueError:
+                self.cache.add(key, int(time.time() * 1000), None)
+
+    def make_key(self, query):
+        """
+        Returns the cache key of a `Query`.
+        """
+        generations = self.get_generations(query.fromm.names())
+        digest = hashlib.sha1(repr((query.as_sql(), query.get_params(),
+                                    generations)).encode('utf-8')).hexdigest()
+        return '%s:result:%s' % (self.key_prefix, digest)
+
+    def _get(self, key, with_meta):
+        entry = self.cache.get(key)
+        if entry is None or (with_meta and entry[1] is None):
+            return None
+        return entry
+
+    def _wait(self, key, with_meta):
+        """
+        Waits, with exponential backoff, for another process to cache `key`.
+        """
+        delay = 0.01
+        deadline = time.time() + self.lock_timeout
+        while time.time() < deadline:
+            time.sleep(delay)
+            entry = self._get(key, with_meta)
+            if entry is not None:
+                return entry
+            delay = min(delay * 2, 0.5)
+        return None
+
+    def _set(self, key, fetch):
+        entry = fetch()
+        self.cache.set(key, entry, self.timeout)
+        return entry
+
+    def fetch(self, query, fetch, with_meta=False):
+        """
+        Returns the cached tuple (rows, meta) of `query`. On a miss, calls
+        `fetch()` to retrieve it from Sphinx and caches it.
+        """
+        key = self.make_key(query)
+        entry = self._get(key, with_meta)
+        if entry is not None:
+            return entry
+
+        lock = self._locks[hash(key) % LOCKS_NUM]
+        lock_key = '%s:lock' % key
+        with lock:
+            entry = self._get(key, with_meta)
+            if entry is not None:
+                return entry
+            if self.cache.add(lock_key, 1, self.lock_timeout):
+                try:
+                    return self._set(key, fetch)
+                finally:
+                    self.cache.delete(lock_key)
+
+        # another process is fetching it: wait without holding the lock, which
+        # is shared with other keys.
+        entry = self._wait(key, with_meta)
+        if entry is not None:
+            return entry
+        with lock:
+            entry = self._get(key, with_meta)
+            if entry is not None:
+                return entry
+            return self._set(key, fetch)
+
+
+_result_cache = None
+
+
+def get_result_cache():
+    """
+    Returns the `ResultCache` configured by ``INDEXES['result_cache']`` or None
+    if results are not cached.
+    """
+    global _result_cache
+
+    options = settings.INDEXES.get('result_cache')
+    if not options:
+        return None
+    if _result_cache is None:
+        if options is True:
+            options = {}
+        _result_cache = ResultCache(**options)
+    return _result_cache
+
+
+def bump_generation(index_names=None):
+    """
+    Invalidates the cached results of the indexes `index_names`, or of all
+    indexes if None.
+    """
+    result_cache = get_result_cache()
+    if result_cache is not None:
+        result_cache.bump_generation(index_names)
@@ -1,8 +1,17 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import signal
 import subprocess
-import time
 import os
 
-from .configurators import Configurator
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models.signals import post_delete
+
+from .configurators import Configurator, delta_merged_queries, delta_deleted_query, \
+    DELTA_DELETED_TABLE
+from . import fingerprints, generations, readiness
+from ..cache import bump_generation
+from ..exceptions import SphinxError
 
 indexes_configurator = Configurator()
 
@@ -45,20 +54,228 @@ def _fix_sphinx_binary_path(args):
 
 def index(output=None):
     _make_index_directory()
-    return call_process(['indexer', '--all', '--config',
-                         indexes_configurator.sphinx_file], output=output)
+    indexes_configurator.check_replica_lag()
+    out = call_process(['indexer', '--all', '--config',
+                        indexes_configurator.sphinx_file], output=output)
+    fingerprints.save(indexes_configurator)
+    return out
 
 
 def reindex(output=None):
     _make_index_directory()
+    indexes_configurator.check_replica_lag()
     out = call_process(['indexer', '--all', '--rotate', '--config',
                         indexes_configurator.sphinx_file], output=output)
-    # it is not immediately available; wait a bit
+    # it is not immediately available
     # see http://sphinxsearch.com/bugs/view.php?id=2350
-    time.sleep(0.5)
+    fingerprints.save(indexes_configurator)
+    wait_until_rotated()
+    # results cached before the rotation are stale.
+    bump_generation()
     return out
 
 
+def index_parallel(names=None, jobs=None, rotate=False, output=None):
+    """
+    Builds the plain indexes of `names` (all if None) running one ``indexer``
+    per index in a pool of `jobs` processes (the number of CPUs if None).
+
+    If `rotate`, each index is rotated in ``searchd`` as soon as it is built.
+    The output of each ``indexer`` is written to `output` when it finishes.
+    Returns an ordered dictionary mapping each index to its output and raises
+    ``SphinxError`` with the outputs of the failed ones if any fails.
+    """
+    _make_index_directory()
+    indexes_configurator.load_configuration()
+    index_names = indexes_configurator.get_indexer_names(names)
+    indexes_configurator.check_replica_lag(index_names)
+
+    def build(name):
+        args = ['indexer', name, '--config', indexes_configurator.sphinx_file]
+        if rotate:
+            args.append('--rotate')
+        return call_process(args)
+
+    outputs = {}
+    errors = OrderedDict()
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        futures = {executor.submit(build, name): name for name in index_names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                outputs[name] = future.result()
+            except Exception as e:
+                outputs[name] = errors[name] = str(e)
+            if output is not None:
+                output.write(outputs[name])
+    fingerprints.save(indexes_configurator,
+                      [name for name in index_names if name not in errors])
+
+    if rotate:
+        # see `reindex`
+        wait_until_rotated(index_names)
+        bump_generation()
+
+    if errors:
+        raise SphinxError('Indexing failed for {0}.\n\n{1}'.format(
+            ', '.join(errors), '\n\n'.join(errors.values())))
+    return OrderedDict((name, outputs[name]) for name in index_names)
+
+
+def build_generation(names=None, output=None):
+    """
+    Builds the plain indexes of `names` (all if None) in a new generation and
+    swaps it into ``searchd`` once it is valid, keeping the previous
+    generations for :func:`rollback`.
+
+    Each index is built in its own directory, checked with ``indextool
+    --check`` and must have at least ``INDEXES['min_documents_ratio']`` of
+    the documents of the current generation. Raises ``SphinxError`` and
+    leaves the current generations untouched if any index is not valid.
+    Returns an ordered dictionary mapping each index to its new generation.
+    """
+    _make_index_directory()
+    indexes_configurator.load_configuration()
+    index_names = indexes_configurator.get_indexer_names(names)
+    indexes_configurator.check_replica_lag(index_names)
+
+    new_generations = OrderedDict(
+        (name, generations.new_generation(indexes_configurator, name))
+        for name in index_names)
+    build_file = '%s.build' % indexes_configurator.sphinx_file
+    indexes_configurator.output(build_file, paths=dict(
+        (name, generations.get_path(indexes_configurator, name, generation))
+        for name, generation in new_generations.items()))
+
+    documents = {}
+    try:
+        call_process(['indexer'] + index_names + ['--config', build_file],
+                     output=output)
+        for name in index_names:
+            call_process(['indextool', '--check', name, '--config', build_file])
+            header = call_process(['indextool', '--dumpheader', name,
+                                   '--config', build_file])
+            documents[name] = generations.get_documents(header)
+            generations.check_documents(indexes_configurator, name, documents[name])
+    except Exception:
+        for name, generation in new_generations.items():
+            generations.discard(indexes_configurator, name, generation)
+        raise
+    finally:
+        os.remove(build_file)
+
+    _swap_generations(new_generations, documents)
+    fingerprints.save(indexes_configurator, index_names)
+    return new_generations
+
+
+def rollback(names=None):
+    """
+    Swaps the plain indexes of `names` (all if None) back to their previous
+    generation. Returns an ordered dictionary mapping each index to its
+    generation.
+    """
+    indexes_configurator.load_configuration()
+    index_names = indexes_configurator.get_indexer_names(names)
+    previous_generations = OrderedDict(
+        (name, generations.previous_generation(indexes_configurator, name))
+        for name in index_names)
+    _swap_generations(previous_generations)
+    return previous_generations
+
+
+def _swap_generations(index_generations, documents=None):
+    """
+    Makes ``searchd`` serve the generations `index_generations` (a dictionary
+    index -> generation) by rotating them, or installs them if it is not
+    running.
+    """
+    for name, generation in index_generations.items():
+        generations.stage(indexes_configurator, name, generation)
+
+    pid = readiness.get_pid(indexes_configurator.searchd_conf.params['pid_file'])
+    if pid is not None:
+        # what ``indexer --rotate`` does after building.
+        os.kill(pid, signal.SIGHUP)
+        wait_until_rotated(list(index_generations))
+    else:
+        for name in index_generations:
+            generations.install(indexes_configurator, name)
+
+    for name, generation in index_generations.items():
+        generations.activate(indexes_configurator, name, generation,
+                             (documents or {}).get(name))
+    # results cached from the previous generations are stale.
+    bump_generation()
+
+
+def current_generation(name):
+    """
+    Returns the generation served of the plain index `name`, or None if it
+    was not built with :func:`build_generation`.
+    """
+    return generations.current_generation(indexes_configurator, name)
+
+
+def index_delta(names=None, jobs=None, output=None):
+    """
+    Rebuilds and rotates the delta index of the indexes with delta `names`
+    (all if None).
+    """
+    indexes = indexes_configurator.get_delta_indexes(names)
+    return index_parallel(['%s_delta' % index.build_name() for index in indexes],
+                          jobs=jobs, rotate=True, output=output)
+
+
+def merge_delta(names=None, output=None):
+    """
+    Merges the delta index into the main index of the indexes with delta
+    `names` (all if None), so the next delta starts empty.
+    """
+    indexes = indexes_configurator.get_delta_indexes(names)
+    main_names = []
+    for index in indexes:
+        main_name = '%s_main' % index.build_name()
+        main_names.append(main_name)
+        delta_name = '%s_delta' % index.build_name()
+        call_process(['indexer', '--merge', main_name, delta_name, '--rotate',
+                      '--config', indexes_configurator.sphinx_file],
+                     output=output)
+
+        query = indexes_configurator._get_source_query(index)
+        with connections[query.db].cursor() as cursor:
+            for sql in delta_merged_queries(index):
+                cursor.execute(sql)
+
+    # see `reindex`
+    wait_until_rotated(main_names)
+    bump_generation([index.build_name() for index in indexes])
+
+
+def connect_delta_signals(index):
+    """
+    Records the deletes of the model of the `index` with delta, so the next
+    delta index kills them in the main index.
+    """
+    # the aliases where the table exists; it is never dropped.
+    created = set()
+
+    def on_delete(sender, instance, using=None, **kwargs):
+        using = using or DEFAULT_DB_ALIAS
+        connection = connections[using]
+        # the table is created by the main index: without it, there is no
+        # main index to kill the document in.
+        if using not in created:
+            if DELTA_DELETED_TABLE not in connection.introspection.table_names():
+                return
+            created.add(using)
+        with connection.cursor() as cursor:
+            cursor.execute(delta_deleted_query(index), [instance.pk])
+
+    post_delete.connect(on_delete, sender=index.Meta.model, weak=False,
+                        dispatch_uid='sphinxql_delta_%s' % index.build_name())
+
+
 def _make_index_directory():
     if not os.path.isdir(indexes_configurator.index_path):
         os.makedirs(indexes_configurator.index_path)
@@ -68,6 +285,31 @@ def start(output=None):
     return call_process_no_wait(['searchd', '--config', indexes_configurator.sphinx_file], output)
 
 
+def changed_indexes():
+    """
+    Returns the names of the indexes built by ``indexer`` whose configuration
+    changed since they were last built, or that were never built.
+    """
+    return fingerprints.get_changed(indexes_configurator)
+
+
+def wait_until_ready(timeout=None):
+    """
+    Waits until ``searchd`` is running and answers queries, polling it with
+    exponential backoff for at most `timeout` seconds (by default
+    ``INDEXES['ready_timeout']``). Raises ``SphinxError`` on timeout.
+    """
+    readiness.wait_until_ready(indexes_configurator, timeout)
+
+
+def wait_until_rotated(names=None, timeout=None):
+    """
+    Waits until ``searchd`` serves the rotated plain indexes `names` (all if
+    None), see `wait_until_ready`.
+    """
+    readiness.wait_until_rotated(indexes_configurator, names, timeout)
+
+
 def stop(silent_fail=False):
     return call_process(['searchd', '--stopwait', '--config', indexes_configurator.sphinx_file], silent_fail)
 
@@ -81,3 +323,4 @@ def statistics():
 def restart():
     stop(silent_fail=True)
     start()
+    wait_until_ready()
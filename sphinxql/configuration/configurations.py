@@ -14,7 +14,8 @@ class Configuration(object):
     multi_valued_parameters = tuple()
 
     def __init__(self, name, params, parent=None):
-        self.validate_parameters(params)
+        # a configuration inherits the mandatory parameters from its parent.
+        self.validate_parameters(params, check_mandatory=parent is None)
 
         self.name = name
         self.params = params
@@ -39,7 +40,7 @@ class Configuration(object):
         Formats configuration parent, if any.
         """
         if self.parent:
-            return ': %(parent_name)s'.format({'parent_name': self.parent})
+            return ': %(parent_name)s' % {'parent_name': self.parent}
         else:
             return ''
 
@@ -57,7 +58,7 @@ class Configuration(object):
                 'params_format': self._format_params()}
 
     @classmethod
-    def validate_parameters(cls, params):
+    def validate_parameters(cls, params, check_mandatory=True):
         """
         Checks that all parameters `params` are valid for this configuration.
         """
@@ -94,7 +95,7 @@ class Configuration(object):
                             'Item "{0}" of parameter "{1}" in {2} has wrong type.'
                                 .format(entry, param_name, cls.type_name))
 
-        if missing_parameters:
+        if missing_parameters and check_mandatory:
             raise ImproperlyConfigured(
                 'Missing parameter(s) {0} for "{1}". '
                 'See Sphinx documentation for {1} configuration.'
@@ -111,6 +112,20 @@ class IndexConfiguration(Configuration):
     multi_valued_parameters = constants.index_multi_valued_parameters
 
 
+class DistributedIndexConfiguration(IndexConfiguration):
+    """
+    Responsible for configuring a Sphinx distributed index
+    """
+    mandatory_parameters = ('type',)
+
+
+class RtIndexConfiguration(IndexConfiguration):
+    """
+    Responsible for configuring a Sphinx real-time index
+    """
+    mandatory_parameters = ('type', 'path')
+
+
 class SourceConfiguration(Configuration):
     """
     Responsible for configuring a Sphinx source and index
@@ -121,6 +136,13 @@ class SourceConfiguration(Configuration):
     multi_valued_parameters = constants.source_multi_valued_parameters
 
 
+class PipeSourceConfiguration(SourceConfiguration):
+    """
+    Responsible for configuring a Sphinx source streamed by a command
+    """
+    mandatory_parameters = constants.pipe_source_mandatory_parameters
+
+
 class IndexerConfiguration(Configuration):
     """
     Responsible for configuring a Sphinx source and index
@@ -140,10 +162,28 @@ class SearchdConfiguration(Configuration):
     valid_parameters = constants.searchd_parameters
     mandatory_parameters = constants.searchd_mandatory_parameters
     DEFAULT_MAX_MATCHES = 1000
+    DEFAULT_MAX_FILTER_VALUES = 4096
 
     def __init__(self, params):
         super(SearchdConfiguration, self).__init__('', params)
         self.max_matches = self.params.get('max_matches', SearchdConfiguration.DEFAULT_MAX_MATCHES)
+        self.max_filter_values = int(self.params.get('max_filter_values',
+                                                     SearchdConfiguration.DEFAULT_MAX_FILTER_VALUES))
+
+
+def parse_endpoints(values):
+    """
+    Returns the list of (host, port) of `values`, a ``'host:port'`` or a list
+    of them.
+    """
+    endpoints = []
+    for endpoint in [values] if isinstance(values, str) else values:
+        host, _, port = endpoint.rpartition(':')
+        if not host or not port.isdigit():
+            raise ImproperlyConfigured('Connection endpoint "%s" must be '
+                                       '"host:port".' % endpoint)
+        endpoints.append((host, int(port)))
+    return endpoints
 
 
 class ConnectionConfiguration(Configuration):
@@ -152,10 +192,35 @@ class ConnectionConfiguration(Configuration):
     type_name = 'connection'
     valid_parameters = constants.connection_parameters
     mandatory_parameters = constants.connection_mandatory_parameters
+    multi_valued_parameters = constants.connection_multi_valued_parameters
 
     def __init__(self, params):
         super(ConnectionConfiguration, self).__init__('', params)
         self.params['port'] = int(self.params['port'])
 
+        policy = self.params.get('policy', constants.DEFAULT_ROUTING_POLICY)
+        if policy not in constants.routing_policies:
+            raise ImproperlyConfigured('Connection "policy" must be one of %s.' %
+                                       (constants.routing_policies,))
+
     def get_connection_parameters(self):
         return self.params['host'], self.params['port']
+
+    def get_endpoints(self):
+        """
+        Returns the list of (host, port) of the ``searchd`` to query: the
+        `endpoints` (a list of ``'host:port'``) if set, or the host and port.
+        """
+        if not self.params.get('endpoints'):
+            return [self.get_connection_parameters()]
+        return parse_endpoints(self.params['endpoints'])
+
+    def get_routing_parameters(self):
+        """
+        Returns the routing policy, the seconds a failed endpoint is ejected
+        and the percentile of latencies after which reads are hedged (0 to
+        not hedge).
+        """
+        return (self.params.get('policy', constants.DEFAULT_ROUTING_POLICY),
+                int(self.params.get('eject_seconds', constants.DEFAULT_EJECT_SECONDS)),
+                int(self.params.get('hedge_percentile', 0)))
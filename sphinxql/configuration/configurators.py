@@ -1,19 +1,30 @@
 from collections import OrderedDict
+import copy
+import hashlib
+from importlib import import_module
 import os.path
+import pickle
 import re
+import sys
 
 from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
 from django.db import connections
-from django.db.models import F
+from django.db.models import F, IntegerField, Value, Min, Max
 from django.db.models.expressions import Combinable
 
-from ..exceptions import ImproperlyConfigured
+from ..exceptions import ImproperlyConfigured, SphinxError
+from ..fields import JoinedText
 from ..types import DateTime, Date
 from .configurations import IndexerConfiguration, \
     SearchdConfiguration, \
     SourceConfiguration, \
     IndexConfiguration, \
-    ConnectionConfiguration
+    DistributedIndexConfiguration, \
+    RtIndexConfiguration, \
+    PipeSourceConfiguration, \
+    ConnectionConfiguration, \
+    parse_endpoints
 from . import constants
 
 
@@ -23,9 +34,10 @@ def add_source_conf_param(source_conf, key, value):
     key is a multi_valued_parameter or single_valued_parameter.
     """
     if key in constants.source_multi_valued_parameters:
-        if key not in source_conf:
-            source_conf[key] = []
-        source_conf[key].append(value)
+        values = source_conf.get(key, [])
+        if isinstance(values, str):
+            values = [values]
+        source_conf[key] = list(values) + [value]
     elif key in constants.source_single_valued_parameters:
         source_conf[key] = value
     else:
@@ -47,9 +59,10 @@ DJANGO_TO_SPHINX_VENDOR = {'postgresql': 'pgsql',
 
 DEFAULT_INDEXER_PARAMS = {}
 
-DEFAULT_SOURCE_PARAMS = {'sql_host': 'localhost',
-                         'sql_pass': '',
-                         }
+# ordered, so the generated configuration is the same on every run.
+DEFAULT_SOURCE_PARAMS = OrderedDict([('sql_host', 'localhost'),
+                                     ('sql_pass', ''),
+                                     ])
 
 DEFAULT_SEARCHD_PARAMS = {'listen': '9306:mysql41',
                           }
@@ -59,6 +72,27 @@ DEFAULT_CONNECTION_PARAMS = {'port': '9306',
 
 DEFAULT_INDEX_PARAMS = {'type': 'plain'}
 
+SHARD_METHODS = ('modulo', 'range')
+
+SOURCE_TYPES = ('sql', 'pipe')
+
+# number of rows per ranged query aimed by `Meta.range_step = 'auto'`.
+AUTO_RANGE_ROWS = 10000
+
+# table with the marks of the main and delta indexes of a main + delta scheme.
+DELTA_COUNTER_TABLE = 'sphinxql_counter'
+# table with the ids deleted since the main index of a main + delta scheme was
+# built, in the kill-list of the delta index.
+DELTA_DELETED_TABLE = 'sphinxql_deleted'
+
+# file with the sources and indexes of the last `sphinx.conf`, so they are
+# loaded without building their SQL.
+CONFIGURATION_CACHE_FILE = 'sphinxql_configuration.pickle'
+
+# attribute with the `Meta.index_id` of the index, used to identify the index
+# of each result when searching several indexes.
+INDEX_ID_ATTRIBUTE = 'sphinxql_index_id'
+
 
 def _pymysql_mogrify(cursor, query, args=None):
     """
@@ -95,36 +129,38 @@ def _generate_sql(query, vendor):
             return _pymysql_mogrify(cursor, *compiler.as_sql())
 
 
-def _build_query(index, query, vendor):
+def _special_annotate(query, dict_values):
     """
-    Returns a SQL query built according to the fields we want to index.
+    This is a copy of normal Django annotate but 1. does not check for name
+    collisions and 2. does not add GROUP_BY to the query.
+
+    GROUP BY is not required since we are building a SELECT expression.
+    Name collision is avoided so our indexes can have the same names as
+    the Model.
     """
-    assert (vendor in ('mysql', 'pgsql'))
+    obj = query._clone()
 
-    def special_annotate(query, dict_values):
-        """
-        This is a copy of normal Django annotate but 1. does not check for name
-        collisions and 2. does not add GROUP_BY to the query.
+    # this line de-activates GROUP BY so we remember what magic we did it.
+    # obj._setup_aggregate_query(list(dict_values.items()))
 
-        GROUP BY is not required since we are building a SELECT expression.
-        Name collision is avoided so our indexes can have the same names as
-        the Model.
-        """
-        obj = query._clone()
+    # Add the aggregates to the query
+    for (alias, aggregate_expr) in dict_values.items():
+        obj.query.add_annotation(aggregate_expr, alias, is_summary=False)
+        # obj.query.add_aggregate(aggregate_expr, query.model, alias,
+        #                         is_summary=False)
 
-        # this line de-activates GROUP BY so we remember what magic we did it.
-        # obj._setup_aggregate_query(list(dict_values.items()))
+    return obj
 
-        # Add the aggregates to the query
-        for (alias, aggregate_expr) in dict_values.items():
-            obj.query.add_annotation(aggregate_expr, alias, is_summary=False)
-            # obj.query.add_aggregate(aggregate_expr, query.model, alias,
-            #                         is_summary=False)
-
-        return obj
 
+def _get_annotation(index):
+    """
+    Returns an ordered dictionary mapping the name of each field of the index
+    (and of the index id attribute) to the Django expression of its value.
+    """
     annotation = OrderedDict()
     for field in index.Meta.fields:
+        if not field._is_query_column:
+            continue
         if isinstance(field.model_attr, str):
             annotation[field.name] = F(field.model_attr)
         elif isinstance(field.model_attr, Combinable):
@@ -135,9 +171,152 @@ def _build_query(index, query, vendor):
                 'a string or a F expression. It is a "%s".' %
                 (field.name, type(field.model_attr)))
 
+    if hasattr(index.Meta, 'index_id'):
+        annotation[INDEX_ID_ATTRIBUTE] = Value(int(index.Meta.index_id),
+                                               output_field=IntegerField())
+    return annotation
+
+
+def _get_multi_valued_relation(index, field):
+    """
+    Returns a tuple (through model, document field, value field) of the
+    many-to-many relation of the multi-valued `field`.
+    """
+    try:
+        model_field = index.Meta.model._meta.get_field(field.model_attr)
+    except FieldDoesNotExist:
+        model_field = None
+    if model_field is None or not model_field.many_to_many or model_field.auto_created:
+        raise ImproperlyConfigured('Field "%s" model_attr must be a many-to-many '
+                                   'field of "%s".' % (field.name, index.Meta.model.__name__))
+
+    # Django 1.8 has no `remote_field`.
+    through = (getattr(model_field, 'remote_field', None) or model_field.rel).through
+    return (through,
+            through._meta.get_field(model_field.m2m_field_name()),
+            through._meta.get_field(model_field.m2m_reverse_field_name()))
+
+
+def _multi_valued_declaration(index, field):
+    """
+    Returns the `sql_attr_multi` of the multi-valued `field`, populated with a
+    ranged query over the through table of its relation.
+    """
+    through, document_field, value_field = _get_multi_valued_relation(index, field)
+    table = through._meta.db_table
+    document_column = '{0}.{1}'.format(table, document_field.column)
+
+    return 'uint {name} from ranged-query; ' \
+           'SELECT {document}, {table}.{value} FROM {table} ' \
+           'WHERE {document}>=$start AND {document}<=$end; ' \
+           'SELECT MIN({document}), MAX({document}) FROM {table}'.format(
+               name=field.name, table=table, document=document_column,
+               value=value_field.column)
+
+
+def _get_joined_relation(index, field):
+    """
+    Returns a tuple (related query, document field, text lookup) of the
+    one-to-many relation of the joined `field`.
+    """
+    relation_name, _, text_lookup = field.model_attr.partition('__')
+    try:
+        relation = index.Meta.model._meta.get_field(relation_name)
+    except FieldDoesNotExist:
+        relation = None
+    if relation is None or not relation.one_to_many or not text_lookup:
+        raise ImproperlyConfigured('Field "%s" model_attr must be a lookup '
+                                   '"<relation>__<field>" of a one-to-many '
+                                   'relation of "%s".' %
+                                   (field.name, index.Meta.model.__name__))
+
+    query = field.related_query
+    if query is None:
+        query = relation.related_model._default_manager.all()
+    return query, relation.field, text_lookup
+
+
+def _joined_field_declaration(index, field, vendor):
+    """
+    Returns the `sql_joined_field` of the joined `field`, populated from the
+    related table ordered by document id.
+    """
+    query, document_field, text_lookup = _get_joined_relation(index, field)
+    document_column = '{0}.{1}'.format(document_field.model._meta.db_table,
+                                       document_field.column)
+
+    query = query.order_by(document_field.attname)
+    if field.ranged:
+        query = query.extra(where=['{0}>=$start AND {0}<=$end'.format(document_column)])
+    sql = _generate_sql(query.values_list(document_field.attname, text_lookup), vendor)
+
+    if not field.ranged:
+        return '{0} from query; {1}'.format(field.name, sql)
+    return '{0} from ranged-query; {1}; SELECT MIN({2}), MAX({2}) FROM {3}'.format(
+        field.name, sql, document_column, document_field.model._meta.db_table)
+
+
+def pipe_declarations(index):
+    """
+    Returns an ordered dictionary mapping each ``tsvpipe_*`` declaration of
+    the fields of `index` to the list of their names. The columns streamed by
+    a pipe source are in this order.
+    """
+    declarations = OrderedDict()
+    for field in index.Meta.fields:
+        if field._sphinx_field_name is None:
+            declaration = 'tsvpipe_field'
+        else:
+            declaration = field._sphinx_field_name.replace('sql_', 'tsvpipe_', 1)
+        declarations.setdefault(declaration, []).append(field.name)
+    if hasattr(index.Meta, 'index_id'):
+        declarations.setdefault('tsvpipe_attr_uint', []).append(INDEX_ID_ATTRIBUTE)
+    return declarations
+
+
+def _pipe_command(index, shard=None):
+    """
+    Returns the command that streams the documents of `index` (or of the
+    shard `shard`, a tuple (shard, shards)).
+    """
+    command = settings.INDEXES.get('pipe_command')
+    if command is None:
+        # the project is the directory with the package of the settings.
+        package = import_module(settings.SETTINGS_MODULE.split('.')[0])
+        project_path = os.path.dirname(os.path.abspath(package.__file__))
+        if hasattr(package, '__path__'):
+            project_path = os.path.dirname(project_path)
+        command = '{0} -m django stream_sphinx_documents --settings={1} ' \
+                  '--pythonpath={2}'.format(sys.executable, settings.SETTINGS_MODULE,
+                                            project_path)
+    command = '{0} {1}'.format(command, index.build_name())
+    if shard is not None:
+        command += ' --shard {0} --shards {1}'.format(*shard)
+        if Configurator._get_shard_by(index) == 'range':
+            # the bounds of the configuration, as the ids change until the
+            # command runs.
+            bounds = Configurator._shard_bounds(
+                Configurator._get_indexing_query(index), *shard)
+            for name, bound in zip(('--shard-first', '--shard-after-last'), bounds):
+                if bound is not None:
+                    command += ' {0} {1}'.format(name, bound)
+    processes = getattr(index.Meta, 'pipe_processes', None)
+    if processes:
+        command += ' --processes %d' % int(processes)
+    return command
+
+
+def _build_query(index, query, vendor):
+    """
+    Returns a SQL query built according to the fields we want to index.
+    """
+    assert (vendor in ('mysql', 'pgsql'))
+
+    annotation = _get_annotation(index)
+
     # this is an hacky approach, but until we find something better,
     # we have to live with it.
-    query = special_annotate(query.only('id'), annotation)
+    query = _special_annotate(query.only('id'), annotation)
     sql = _generate_sql(query, vendor)
 
     for field in [f for f in index.Meta.fields
@@ -164,6 +343,187 @@ def _build_query(index, query, vendor):
     return sql
 
 
+def _table_rows(query):
+    """
+    Returns the number of rows of the table of `query` estimated by the
+    statistics of the database, or None if it has no statistics.
+    """
+    table = query.model._meta.db_table
+    connection = connections[query.db]
+    if connection.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES ' \
+              'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+    else:
+        sql = 'SELECT reltuples FROM pg_class WHERE relname = %s'
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or not row[0] or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def _auto_range_step(index, query):
+    """
+    Returns the step of the ranged query of `index` so each query reads about
+    `Meta.range_rows` rows: the span of ids of `query` is scaled by the number
+    of rows of its table, so sparse ids get larger steps.
+    """
+    rows_per_step = int(getattr(index.Meta, 'range_rows', AUTO_RANGE_ROWS))
+
+    bounds = query.aggregate(min=Min('pk'), max=Max('pk'))
+    if bounds['min'] is None:
+        return rows_per_step
+    span = bounds['max'] - bounds['min'] + 1
+
+    rows = _table_rows(query) or query.count()
+    return max(rows_per_step, -(-span * rows_per_step // rows))
+
+
+def _get_index_using(index):
+    """
+    Returns the database alias `index` is built from, or None for the alias
+    of its query.
+    """
+    return getattr(index.Meta, 'index_using', settings.INDEXES.get('index_using'))
+
+
+def replica_lag(alias):
+    """
+    Returns the seconds the database `alias` lags behind its primary, 0 if it
+    is not a replica, or None if its replication is stopped.
+    """
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('SHOW SLAVE STATUS')
+            row = cursor.fetchone()
+            if row is None:
+                return 0
+            columns = [column[0] for column in cursor.description]
+            return dict(zip(columns, row))['Seconds_Behind_Master']
+        # PostgreSQL 10 renamed the functions of the xlog to wal.
+        if connection.pg_version < 100000:
+            receive, replay = 'pg_last_xlog_receive_location', 'pg_last_xlog_replay_location'
+        else:
+            receive, replay = 'pg_last_wal_receive_lsn', 'pg_last_wal_replay_lsn'
+        cursor.execute('SELECT CASE WHEN NOT pg_is_in_recovery() OR '
+                       '{0}() = {1}() THEN 0 '
+                       'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) '
+                       'END'.format(receive, replay))
+        return cursor.fetchone()[0]
+
+
+def check_replica_lag(index):
+    """
+    Raises ``SphinxError`` if the database `index` is built from lags more
+    than `Meta.max_replica_lag` or ``INDEXES['max_replica_lag']`` seconds.
+    """
+    max_lag = getattr(index.Meta, 'max_replica_lag',
+                      settings.INDEXES.get('max_replica_lag'))
+    using = _get_index_using(index)
+    if max_lag is None or not using:
+        return
+
+    lag = replica_lag(using)
+    if lag is None or lag > max_lag:
+        raise SphinxError('Database "{0}" of index "{1}" lags {2} seconds behind '
+                          'its primary (max {3}).'.format(
+                              using, index.build_name(),
+                              'unknown' if lag is None else lag, max_lag))
+
+
+def _get_delta_field_column(index):
+    """
+    Returns the qualified column of `Meta.delta_field` or None if not defined.
+    """
+    if not getattr(index.Meta, 'delta_field', None):
+        return None
+    field = index.Meta.model._meta.get_field(index.Meta.delta_field)
+    return '{0}.{1}'.format(index.Meta.model._meta.db_table, field.column)
+
+
+def _counter_value(index, column):
+    """
+    Returns the SQL subquery of the value of `column` in the counter table
+    for `index`.
+    """
+    return "(SELECT {0} FROM {1} WHERE index_name = '{2}')".format(
+        column, DELTA_COUNTER_TABLE, index.build_name())
+
+
+def _delta_main_pre_queries(index, pk, vendor):
+    """
+    Returns the SQL queries that mark, in the counter table, the last id
+    and the last change of the rows indexed in the main index.
+    """
+    if vendor == 'mysql':
+        timestamp_type = 'DATETIME'
+    else:
+        timestamp_type = 'TIMESTAMP WITH TIME ZONE'
+    table = index.Meta.model._meta.db_table
+    delta_field = _get_delta_field_column(index)
+    marked_at = 'MAX({0})'.format(delta_field) if delta_field else 'NULL'
+
+    return [
+        'CREATE TABLE IF NOT EXISTS {0} ('
+        'index_name VARCHAR(255) NOT NULL PRIMARY KEY, '
+        'max_id BIGINT, marked_at {1} NULL, '
+        'delta_max_id BIGINT, delta_marked_at {1} NULL)'.format(
+            DELTA_COUNTER_TABLE, timestamp_type),
+        "DELETE FROM {0} WHERE index_name = '{1}'".format(
+            DELTA_COUNTER_TABLE, index.build_name()),
+        "INSERT INTO {0} (index_name, max_id, marked_at, delta_max_id, delta_marked_at) "
+        "SELECT '{1}', COALESCE(MAX({2}), 0), {3}, COALESCE(MAX({2}), 0), {3} "
+        "FROM {4}".format(DELTA_COUNTER_TABLE, index.build_name(), pk, marked_at, table),
+        'CREATE TABLE IF NOT EXISTS {0} ('
+        'index_name VARCHAR(255) NOT NULL, document_id BIGINT NOT NULL, '
+        'in_delta SMALLINT NOT NULL DEFAULT 0)'.format(DELTA_DELETED_TABLE),
+        # the main index does not have the rows deleted before it is built.
+        "DELETE FROM {0} WHERE index_name = '{1}'".format(
+            DELTA_DELETED_TABLE, index.build_name()),
+    ]
+
+
+def _delta_pre_queries(index, pk):
+    """
+    Returns the SQL queries that mark, in the counter table, the last id and
+    the last change of the rows indexed in the delta index, and the deleted
+    rows in its kill-list.
+    """
+    table = index.Meta.model._meta.db_table
+    delta_field = _get_delta_field_column(index)
+
+    sql = "UPDATE {0} SET delta_max_id = (SELECT COALESCE(MAX({1}), 0) FROM {2})".format(
+        DELTA_COUNTER_TABLE, pk, table)
+    if delta_field:
+        sql += ", delta_marked_at = (SELECT MAX({0}) FROM {1})".format(delta_field, table)
+    return [sql + " WHERE index_name = '{0}'".format(index.build_name()),
+            "UPDATE {0} SET in_delta = 1 WHERE index_name = '{1}'".format(
+                DELTA_DELETED_TABLE, index.build_name())]
+
+
+def delta_deleted_query(index):
+    """
+    Returns the SQL query that records a deleted id (its parameter) of the
+    model of `index`, so the delta index kills it in the main index.
+    """
+    return "INSERT INTO {0} (index_name, document_id) VALUES ('{1}', %s)".format(
+        DELTA_DELETED_TABLE, index.build_name())
+
+
+def delta_merged_queries(index):
+    """
+    Returns the SQL queries that move the mark of the main index to the mark
+    of the delta index and forget the deleted rows killed by the delta,
+    executed after the delta is merged into the main index.
+    """
+    return ["UPDATE {0} SET max_id = delta_max_id, marked_at = delta_marked_at "
+            "WHERE index_name = '{1}'".format(DELTA_COUNTER_TABLE, index.build_name()),
+            "DELETE FROM {0} WHERE index_name = '{1}' AND in_delta = 1".format(
+                DELTA_DELETED_TABLE, index.build_name())]
+
+
 class Configurator(object):
     """
     The main configurator.
@@ -188,12 +548,23 @@ class Configurator(object):
         self.indexes = OrderedDict()
         self.indexes_confs = []
         self.sources_confs = []
+        # index name -> list of its sources and indexes configurations
+        self.index_blocks = OrderedDict()
 
         # configured indexer and searchd
         self.indexer_conf = None
         self.searchd_conf = None
         self.connection_conf = None
-
+        # index name -> connection configuration of `Meta.connection_params`
+        self.index_connection_confs = {}
+        # index name -> list of (host, port) of `Meta.shard_endpoints`
+        self.index_shard_endpoints = {}
+
+        # `_runtime_configured`: indexer, searchd, connection and indexes;
+        # `_loaded`: also their sources and indexes, built (`_configured`) or
+        # from the cache.
+        self._runtime_configured = False
+        self._loaded = False
         self._configured = False
 
     def register(self, index):
@@ -206,25 +577,140 @@ class Configurator(object):
             self._registered_indexes.append(index)
 
     @staticmethod
-    def _configure_source(index):
+    def _get_shard_by(index):
+        shard_by = getattr(index.Meta, 'shard_by', 'modulo')
+        if shard_by not in SHARD_METHODS:
+            raise ImproperlyConfigured('%s.Meta.shard_by must be one of %s' %
+                                       (index.__name__, SHARD_METHODS))
+        return shard_by
+
+    @staticmethod
+    def _shard_bounds(query, shard, shards):
+        """
+        Returns the (first id, id after the last) of the shard `shard` out of
+        `shards` split by range, None for an unbounded end. The current ids
+        are split in `shards` ranges; the last range is unbounded so it
+        receives new rows.
+
+        The length of the ranges is rounded up to a power of two and their
+        start down to a multiple of it, so the bounds (and the fingerprint of
+        the index) do not change with every new or deleted row.
+        """
+        bounds = query.aggregate(min=Min('pk'), max=Max('pk'))
+        start, end = bounds['min'] or 0, bounds['max'] or 0
+        size = 1
+        while size * shards < end - start + 1:
+            size *= 2
+        start -= start % size
+        return (start + shard * size if shard > 0 else None,
+                start + (shard + 1) * size if shard < shards - 1 else None)
+
+    @staticmethod
+    def _shard_query(index, query, shard, shards, bounds=None):
+        """
+        Returns `query` restricted to the rows of the shard `shard` out of
+        `shards`, split by `Meta.shard_by`. `bounds` are the bounds of a
+        range shard (see `_shard_bounds`), computed from `query` if None.
+        """
+        shard_by = Configurator._get_shard_by(index)
+        pk = '{0}.{1}'.format(index.Meta.model._meta.db_table,
+                              index.Meta.model._meta.pk.column)
+
+        if shard_by == 'modulo':
+            return query.extra(where=['MOD({0}, {1}) = {2}'.format(pk, shards, shard)])
+
+        if bounds is None:
+            bounds = Configurator._shard_bounds(query, shard, shards)
+        first, after_last = bounds
+        where = []
+        if first is not None:
+            where.append('{0} >= {1}'.format(pk, first))
+        if after_last is not None:
+            where.append('{0} < {1}'.format(pk, after_last))
+        return query.extra(where=where)
+
+    @staticmethod
+    def _get_source_query(index):
+        """
+        Returns the Django query the index is populated from.
+        """
+        if hasattr(index.Meta, 'query'):
+            return index.Meta.query
+        return index.Meta.model.objects.all()
+
+    @staticmethod
+    def _get_indexing_query(index):
         """
-        Maps an ``Index`` into a Sphinx source configuration.
+        Returns the query the index is built from: the source query on the
+        database alias of `Meta.index_using` or ``INDEXES['index_using']``,
+        e.g. a replica, if set.
+        """
+        query = Configurator._get_source_query(index)
+        using = _get_index_using(index)
+        if using:
+            query = query.using(using)
+        return query
+
+    @staticmethod
+    def _get_vendor(query):
+        """
+        Returns the Sphinx source type of the database of `query`.
+        """
+        if connections[query.db].vendor not in DJANGO_TO_SPHINX_VENDOR:
+            raise ImproperlyConfigured('Django-SphinxQL currently only supports '
+                                       'mysql and postgresql backends')
+        return DJANGO_TO_SPHINX_VENDOR[connections[query.db].vendor]
+
+    @staticmethod
+    def _get_pk_column(index):
+        """
+        Returns the qualified primary key column of the index's model.
+        """
+        return '{0}.{1}'.format(index.Meta.model._meta.db_table,
+                                index.Meta.model._meta.pk.column)
+
+    @staticmethod
+    def _range_query(index, query):
+        """
+        Returns `query` restricted to the range of a ranged query.
+        """
+        return query.extra(where=['{0}>=$start AND {0}<=$end'
+                           .format(Configurator._get_pk_column(index))])
+
+    @staticmethod
+    def _query_range(index, query, vendor):
+        """
+        Returns the SQL of the minimum and maximum ids of `query`, the
+        ``sql_query_range`` of a ranged query. The filters of `query` are
+        applied so the range only spans the indexed rows.
+        """
+        if not query.query.where:
+            return 'SELECT MIN({0}),MAX({0}) FROM {1}'.format(
+                Configurator._get_pk_column(index), index.Meta.model._meta.db_table)
+
+        query = query.order_by().annotate(sphinxql_pk=F('pk')).values_list('sphinxql_pk')
+        return 'SELECT MIN(sphinxql_pk),MAX(sphinxql_pk) FROM ({0}) AS sphinxql_range'.format(
+            _generate_sql(query, vendor))
+
+    @staticmethod
+    def _configure_source(index, name=None, shard=None, delta=False):
+        """
+        Maps an ``Index`` into a Sphinx source configuration. If `shard` is a
+        tuple (shard, shards), the source only contains the rows of the shard.
+        If `delta`, the source is the main source of a main + delta scheme.
         """
         source_attrs = OrderedDict()
         source_attrs.update(DEFAULT_SOURCE_PARAMS)
         source_attrs.update(settings.INDEXES.get('source_params', {}))
         source_attrs.update(getattr(index.Meta, 'source_params', {}))
 
-        if hasattr(index.Meta, 'query'):
-            query = index.Meta.query
-        else:
-            query = index.Meta.model.objects.all()
+        query = Configurator._get_indexing_query(index)
+
+        if shard is not None:
+            query = Configurator._shard_query(index, query, *shard)
 
         ### select type from backend
-        if connections[query.db].vendor not in DJANGO_TO_SPHINX_VENDOR:
-            raise ImproperlyConfigured('Django-SphinxQL currently only supports '
-                                       'mysql and postgresql backends')
-        vendor = DJANGO_TO_SPHINX_VENDOR[connections[query.db].vendor]
+        vendor = Configurator._get_vendor(query)
 
         source_attrs = add_source_conf_param(source_attrs, 'type', vendor)
 
@@ -244,60 +730,291 @@ class Configurator(object):
         ### create parameters for attributes
         for field in index.Meta.fields:
             if field.is_attribute:
+                if field._is_query_column:
+                    declaration = field.name
+                else:
+                    declaration = _multi_valued_declaration(index, field)
                 source_attrs = add_source_conf_param(source_attrs,
                                                      field._sphinx_field_name,
-                                                     field.name)
+                                                     declaration)
+        if hasattr(index.Meta, 'index_id'):
+            source_attrs = add_source_conf_param(source_attrs, 'sql_attr_uint',
+                                                 INDEX_ID_ATTRIBUTE)
+
+        ### create parameters for joined fields
+        for field in index.Meta.fields:
+            if isinstance(field, JoinedText):
+                source_attrs = add_source_conf_param(
+                    source_attrs, 'sql_joined_field',
+                    _joined_field_declaration(index, field, vendor))
 
         if hasattr(index.Meta, 'range_step'):
             # see http://sphinxsearch.com/docs/current.html#ranged-queries
-            range_step = int(index.Meta.range_step)
+            if index.Meta.range_step == 'auto':
+                range_step = _auto_range_step(index, query)
+            else:
+                range_step = int(index.Meta.range_step)
 
             source_attrs = add_source_conf_param(
                 source_attrs, 'sql_query_range',
-                'SELECT MIN(id),MAX(id) FROM %s' % index.Meta.model._meta.db_table)
+                Configurator._query_range(index, query, vendor))
             source_attrs = add_source_conf_param(
                 source_attrs, 'sql_range_step', range_step)
-            query = query.extra(where=['{0}.id>=$start AND {0}.id<=$end'
-                                .format(index.Meta.model._meta.db_table)])
+            if hasattr(index.Meta, 'range_throttle'):
+                source_attrs = add_source_conf_param(
+                    source_attrs, 'sql_ranged_throttle',
+                    int(index.Meta.range_throttle))
+            query = Configurator._range_query(index, query)
+
+        if delta:
+            # the main source marks what it indexes in the counter table.
+            for sql in _delta_main_pre_queries(index, Configurator._get_pk_column(index), vendor):
+                source_attrs = add_source_conf_param(source_attrs, 'sql_query_pre', sql)
+            query = query.extra(where=['{0} <= {1}'.format(
+                Configurator._get_pk_column(index), _counter_value(index, 'max_id'))])
 
         ### add the query
         source_attrs = add_source_conf_param(
             source_attrs,
             'sql_query', _build_query(index, query, vendor))
 
-        return SourceConfiguration(index.build_name(), source_attrs)
+        return SourceConfiguration(name or index.build_name(), source_attrs)
+
+    @staticmethod
+    def _configure_pipe_source(index, name=None, shard=None):
+        """
+        Maps an ``Index`` into a Sphinx ``tsvpipe`` source, whose documents
+        are streamed from the ORM by the ``stream_sphinx_documents`` command.
+        """
+        source_attrs = OrderedDict()
+        source_attrs['type'] = 'tsvpipe'
+        source_attrs['tsvpipe_command'] = _pipe_command(index, shard)
+        source_attrs.update(pipe_declarations(index))
+
+        return PipeSourceConfiguration(name or index.build_name(), source_attrs)
+
+    @staticmethod
+    def _configure_delta_source(index, name, parent_name):
+        """
+        Maps an ``Index`` into the Sphinx delta source of a main + delta scheme,
+        inheriting from the main source `parent_name`.
+
+        The delta contains the rows added after the mark of the main source,
+        and, if `Meta.delta_field` is set, the rows changed after it. The
+        changed rows and the rows deleted since the main index was built are
+        in the kill-list, so they are discarded from the main index.
+        """
+        query = Configurator._get_indexing_query(index)
+        vendor = Configurator._get_vendor(query)
+        pk = Configurator._get_pk_column(index)
+
+        pre_queries = settings.INDEXES.get('source_params', {}).get('sql_query_pre', [])
+        pre_queries = getattr(index.Meta, 'source_params', {}).get('sql_query_pre', pre_queries)
+        if isinstance(pre_queries, str):
+            pre_queries = [pre_queries]
+        pre_queries = list(pre_queries)
+        if vendor == 'mysql':
+            pre_queries.append('SET CHARACTER_SET_RESULTS=utf8')
+        pre_queries.extend(_delta_pre_queries(index, pk))
+
+        source_attrs = OrderedDict()
+        source_attrs['sql_query_pre'] = pre_queries
+
+        table = index.Meta.model._meta.db_table
+        condition = '({0} > {1} AND {0} <= {2})'.format(
+            pk, _counter_value(index, 'max_id'), _counter_value(index, 'delta_max_id'))
+        killlist = "SELECT document_id FROM {0} WHERE index_name = '{1}'".format(
+            DELTA_DELETED_TABLE, index.build_name())
+        delta_field = _get_delta_field_column(index)
+        if delta_field:
+            changed_condition = '{0} >= {1}'.format(
+                delta_field, _counter_value(index, 'marked_at'))
+            condition = '{0} OR {1}'.format(condition, changed_condition)
+            killlist = 'SELECT {0} FROM {1} WHERE {2} UNION {3}'.format(
+                pk, table, changed_condition, killlist)
+        source_attrs['sql_query_killlist'] = killlist
+
+        if hasattr(index.Meta, 'range_step'):
+            # the range of the main source spans the whole table.
+            source_attrs['sql_query_range'] = \
+                'SELECT COALESCE(MIN({0}), 0),COALESCE(MAX({0}), 0) FROM {1} WHERE {2}'.format(
+                    pk, table, condition)
+            query = Configurator._range_query(index, query)
+
+        query = query.extra(where=[condition])
+        source_attrs['sql_query'] = _build_query(index, query, vendor)
+
+        return SourceConfiguration(name, source_attrs, parent=parent_name)
 
     @staticmethod
-    def _configure_index(index, source_name):
+    def _configure_index(index, source_name, name=None):
         """
         Maps a ``Index`` into a Sphinx index configuration.
         """
-        index_params = {
-            'source': source_name,
-            'path': os.path.join(settings.INDEXES['path'], source_name)
-        }
+        index_params = OrderedDict()
+        index_params['source'] = source_name
+        index_params['path'] = os.path.join(settings.INDEXES['path'], source_name)
         index_params.update(DEFAULT_INDEX_PARAMS)
         index_params.update(settings.INDEXES.get('index_params', {}))
         index_params.update(getattr(index.Meta, 'index_params', {}))
 
-        return IndexConfiguration(index.build_name(), index_params)
+        return IndexConfiguration(name or index.build_name(), index_params)
 
     @staticmethod
-    def _configure_searchd():
+    def _configure_rt_index(index):
+        """
+        Maps a ``Index`` into a Sphinx real-time index, whose fields and
+        attributes are declared from `Meta.fields`.
+        """
+        index_params = OrderedDict()
+        index_params['path'] = os.path.join(settings.INDEXES['path'], index.build_name())
+        index_params.update(settings.INDEXES.get('index_params', {}))
+        index_params.update(getattr(index.Meta, 'index_params', {}))
+        index_params['type'] = 'rt'
+        for field in index.Meta.fields:
+            for rt_field_name in field._rt_field_names:
+                index_params.setdefault(rt_field_name, []).append(field.name)
+        if hasattr(index.Meta, 'index_id'):
+            index_params.setdefault('rt_attr_uint', []).append(INDEX_ID_ATTRIBUTE)
+
+        return RtIndexConfiguration(index.build_name(), index_params)
+
+    @staticmethod
+    def _configure_distributed_index(index, local_names):
+        """
+        Maps a ``Index`` into a Sphinx distributed index of the local indexes
+        `local_names` and the remote agents of `Meta.agents`.
+        """
+        index_params = OrderedDict()
+        index_params['type'] = 'distributed'
+        index_params['local'] = list(local_names)
+        agents = list(getattr(index.Meta, 'agents', []))
+        if agents:
+            index_params['agent'] = agents
+        index_params.update(getattr(index.Meta, 'distributed_params', {}))
+
+        return DistributedIndexConfiguration(index.build_name(), index_params)
+
+    def _configure_index_blocks(self, index):
+        """
+        Maps an ``Index`` into its Sphinx sources and indexes configurations.
+
+        When `Meta.shards` is set, the index is split in shards, each with its
+        source and index, and a distributed index of all shards is named after
+        the ``Index`` so queries use it.
+
+        When `Meta.shard_endpoints` is set, the index only contains the shard
+        of this node, ``INDEXES['shard_node']``, out of the endpoints.
+        """
+        shards = int(getattr(index.Meta, 'shards', 1))
+        shard_endpoints = getattr(index.Meta, 'shard_endpoints', None)
+        if shard_endpoints and (shards > 1 or getattr(index.Meta, 'delta', False) or
+                                getattr(index.Meta, 'rt', False)):
+            raise ImproperlyConfigured('%s: an index with shard endpoints cannot '
+                                       'be sharded, real-time nor have '
+                                       'delta.' % index.__name__)
+        if getattr(index.Meta, 'rt', False):
+            if shards > 1 or getattr(index.Meta, 'delta', False):
+                raise ImproperlyConfigured('%s: a real-time index cannot be '
+                                           'sharded nor have delta.' % index.__name__)
+            return [], [self._configure_rt_index(index)]
+        source_type = getattr(index.Meta, 'source_type', 'sql')
+        if source_type not in SOURCE_TYPES:
+            raise ImproperlyConfigured('%s: Meta.source_type must be one of %s.' %
+                                       (index.__name__, SOURCE_TYPES))
+        if source_type == 'pipe':
+            if getattr(index.Meta, 'delta', False):
+                raise ImproperlyConfigured('%s: a pipe source cannot have '
+                                           'delta.' % index.__name__)
+            configure_source = self._configure_pipe_source
+        else:
+            configure_source = self._configure_source
+        if getattr(index.Meta, 'delta', False):
+            if shards > 1:
+                raise ImproperlyConfigured('%s: an index with delta cannot be '
+                                           'sharded.' % index.__name__)
+            using = _get_index_using(index)
+            if using and using != self._get_source_query(index).db:
+                # its sources write the counter table.
+                raise ImproperlyConfigured('%s: an index with delta cannot be '
+                                           'built from the database "%s"; set '
+                                           'Meta.index_using = None.' % (index.__name__, using))
+            return self._configure_delta_index_blocks(index)
+        if shard_endpoints:
+            source_conf = configure_source(index, shard=self._get_shard_node(index))
+            return [source_conf], [self._configure_index(index, source_conf.name)]
+        if shards < 2:
+            source_conf = configure_source(index)
+            return [source_conf], [self._configure_index(index, source_conf.name)]
+
+        sources_confs = []
+        indexes_confs = []
+        for shard in range(shards):
+            name = '%s_shard%d' % (index.build_name(), shard)
+            source_conf = configure_source(index, name, (shard, shards))
+            sources_confs.append(source_conf)
+            indexes_confs.append(self._configure_index(index, source_conf.name, name))
+        indexes_confs.append(self._configure_distributed_index(
+            index, [index_conf.name for index_conf in indexes_confs]))
+        return sources_confs, indexes_confs
+
+    @staticmethod
+    def _get_shard_node(index):
+        """
+        Returns the shard of this node out of `Meta.shard_endpoints`, a tuple
+        (shard, shards), or None (all rows) if ``INDEXES['shard_node']`` is
+        not set.
+        """
+        node = settings.INDEXES.get('shard_node')
+        if node is None:
+            return None
+        shards = len(parse_endpoints(index.Meta.shard_endpoints))
+        if not 0 <= int(node) < shards:
+            raise ImproperlyConfigured('INDEXES["shard_node"] must be between 0 '
+                                       'and %d, the shard endpoints of %s.' %
+                                       (shards - 1, index.__name__))
+        return int(node), shards
+
+    def _configure_delta_index_blocks(self, index):
+        """
+        Maps an ``Index`` into the sources and indexes of a main + delta
+        scheme: a main index, a delta index and a distributed index of both
+        named after the ``Index`` so queries use it.
+        """
+        main_name = '%s_main' % index.build_name()
+        delta_name = '%s_delta' % index.build_name()
+
+        main_source = self._configure_source(index, main_name, delta=True)
+        delta_source = self._configure_delta_source(index, delta_name, main_name)
+
+        indexes_confs = [self._configure_index(index, main_name, main_name),
+                         self._configure_index(index, delta_name, delta_name)]
+        indexes_confs.append(self._configure_distributed_index(
+            index, [main_name, delta_name]))
+        return [main_source, delta_source], indexes_confs
+
+    def _configure_searchd(self):
         searchd_params = OrderedDict()
         searchd_params.update(DEFAULT_SEARCHD_PARAMS)
         searchd_params['pid_file'] = os.path.join(settings.INDEXES.get('sphinx_path'), 'searchd.pid')
         # see WARNING at http://sphinxsearch.com/docs/current/conf-binlog-path.html
         searchd_params['binlog_path'] = settings.INDEXES.get('sphinx_path')
 
+        # search the shards of distributed indexes in parallel.
+        shards = [int(getattr(index.Meta, 'shards', 1)) for index in self._registered_indexes]
+        if shards and max(shards) > 1:
+            searchd_params['dist_threads'] = max(shards)
+
         searchd_params.update(settings.INDEXES.get('searchd_params', {}))
 
         return SearchdConfiguration(searchd_params)
 
-    def _configure_connection(self, test=False):
+    def _configure_connection(self, test=False, index=None):
         connection_params = self._get_default_values()
         if not test:
             connection_params.update(settings.INDEXES.get('connection_params', {}))
+            if index is not None:
+                connection_params.update(index.Meta.connection_params)
         if connection_params.get('port') is None:
             connection_params['port'] = self._determine_port_from_listen()
         if connection_params.get('host') is None:
@@ -336,25 +1053,24 @@ class Configurator(object):
         indexer_params.update(settings.INDEXES.get('indexer_params', {}))
         return IndexerConfiguration(indexer_params)
 
-    def configure(self, force=False, test=False):
+    def configure_runtime(self, force=False, test=False):
         """
-        Configures the registered indexes.
-
-        This method must be called before `output`.
+        Configures what querying needs: indexer, searchd, the connection and
+        the registered indexes. It does not access the database.
         """
-        if self._configured and not force:
+        if self._runtime_configured and not force:
             return
         if not hasattr(settings, 'INDEXES'):
             raise ImproperlyConfigured('Django-SphinxQL requires '
                                        'settings.INDEXES')
 
-        self._configured = True
+        self._runtime_configured = True
         self.indexer_conf = self._configure_indexer()
         self.searchd_conf = self._configure_searchd()
         self.connection_conf = self._configure_connection(test=test)
-        self.sources_confs.clear()
-        self.indexes_confs.clear()
         self.indexes.clear()
+        self.index_connection_confs.clear()
+        self.index_shard_endpoints.clear()
         for index in self._registered_indexes:
             meta = getattr(index.Meta.model, '_meta', None)
             assert meta is not None
@@ -362,29 +1078,190 @@ class Configurator(object):
             assert index not in self.indexes.values()
             self.indexes[index.build_name()] = index
 
-            source_conf = self._configure_source(index)
-            index_conf = self._configure_index(index, source_conf.name)
-            self.sources_confs.append(source_conf)
-            self.indexes_confs.append(index_conf)
+            if hasattr(index.Meta, 'connection_params'):
+                self.index_connection_confs[index.build_name()] = \
+                    self._configure_connection(test=test, index=index)
+            if getattr(index.Meta, 'shard_endpoints', None) and not test:
+                self.index_shard_endpoints[index.build_name()] = \
+                    parse_endpoints(index.Meta.shard_endpoints)
 
-    def output(self):
+    def configure(self, force=False, test=False):
+        """
+        Configures the registered indexes, building the SQL of their sources
+        from the database.
+
+        This method must be called before `output`.
+        """
+        if self._configured and not force:
+            return
+
+        self.configure_runtime(force, test)
+        self._configured = True
+        self._loaded = True
+        self.sources_confs.clear()
+        self.indexes_confs.clear()
+        self.index_blocks.clear()
+        for name, index in self.indexes.items():
+            sources_confs, indexes_confs = self._configure_index_blocks(index)
+            self.sources_confs.extend(sources_confs)
+            self.indexes_confs.extend(indexes_confs)
+            self.index_blocks[name] = sources_confs + indexes_confs
+
+    def _get_cache_file(self):
+        return os.path.join(os.path.dirname(self.sphinx_file), CONFIGURATION_CACHE_FILE)
+
+    def _sphinx_file_hash(self):
+        try:
+            with open(self.sphinx_file, 'rb') as conf_file:
+                return hashlib.sha1(conf_file.read()).hexdigest()
+        except (IOError, OSError):
+            return None
+
+    def _save_cache(self):
+        """
+        Saves the sources and indexes of `sphinx.conf` to be loaded by
+        `load_configuration`.
+        """
+        cache_file = self._get_cache_file()
+        with open(cache_file + '.tmp', 'wb') as f:
+            pickle.dump((self._sphinx_file_hash(), OrderedDict(
+                (name, self.index_blocks[name]) for name in self.indexes)), f)
+        os.replace(cache_file + '.tmp', cache_file)
+
+    def load_configuration(self):
         """
-        Outputs the configuration file `sphinx.conf`.
+        Loads the sources and indexes of the registered indexes from the
+        cache written with `sphinx.conf` or, if it does not match the current
+        `sphinx.conf` or indexes, configures them with `configure`.
+        """
+        if self._loaded:
+            return
+        self.configure_runtime()
+
+        try:
+            with open(self._get_cache_file(), 'rb') as f:
+                file_hash, index_blocks = pickle.load(f)
+        except Exception:
+            # missing, corrupted or written by another version of sphinxql
+            # (e.g. unpickling a moved class raises ``AttributeError``).
+            file_hash, index_blocks = None, None
+
+        if file_hash is None or file_hash != self._sphinx_file_hash() or \
+                list(index_blocks) != list(self.indexes):
+            return self.configure()
+
+        self._loaded = True
+        self.index_blocks.clear()
+        self.index_blocks.update(index_blocks)
+        self.sources_confs[:] = [conf for confs in index_blocks.values()
+                                 for conf in confs if isinstance(conf, SourceConfiguration)]
+        self.indexes_confs[:] = [conf for confs in index_blocks.values()
+                                 for conf in confs if not isinstance(conf, SourceConfiguration)]
+
+    def get_indexer_names(self, names=None):
+        """
+        Returns the names of the plain indexes (the ones built by ``indexer``)
+        of the indexes `names`, or of all indexes if None. Each name is the name
+        of an ``Index`` (e.g. of a sharded index) or of a plain index.
+        """
+        if names is None:
+            names = list(self.index_blocks)
+
+        plain_names = []
+        for name in names:
+            if name in self.index_blocks:
+                blocks = self.index_blocks[name]
+            else:
+                blocks = [conf for confs in self.index_blocks.values()
+                          for conf in confs if conf.name == name]
+            confs = [conf for conf in blocks if isinstance(conf, IndexConfiguration)
+                     and conf.params.get('type', 'plain') == 'plain']
+            if not confs:
+                raise ImproperlyConfigured('"%s" is not an index built by '
+                                           'indexer.' % name)
+            for conf in confs:
+                if conf.name not in plain_names:
+                    plain_names.append(conf.name)
+        return plain_names
+
+    def check_replica_lag(self, names=None):
+        """
+        Checks the lag of the databases the indexes `names` (all if None) are
+        built from, see `check_replica_lag`. Names can also be of plain
+        indexes, e.g. of shards.
+        """
+        for name, index in self.indexes.items():
+            if names is not None and name not in names and \
+                    not any(conf.name in names for conf in self.index_blocks[name]):
+                continue
+            check_replica_lag(index)
+
+    def get_delta_indexes(self, names=None):
+        """
+        Returns the ``Index`` with delta of the indexes `names`, or all of
+        them if None.
+        """
+        if names is None:
+            names = [name for name, index in self.indexes.items()
+                     if getattr(index.Meta, 'delta', False)]
+
+        indexes = []
+        for name in names:
+            index = self.indexes.get(name)
+            if index is None or not getattr(index.Meta, 'delta', False):
+                raise ImproperlyConfigured('"%s" is not an index with '
+                                           'delta.' % name)
+            indexes.append(index)
+        return indexes
+
+    def format_output(self, paths=None):
+        """
+        Returns the content of `sphinx.conf`. `paths` optionally maps names of
+        plain indexes to a path that replaces theirs, e.g. to build them
+        elsewhere.
         """
         assert self.indexes
+        paths = paths or {}
 
         string_blocks = ["# WARNING! This file was automatically generated: do not "
                          "modify it.\n"]
         # output all source and indexes
-        for i in range(len(self.indexes)):
-            string_blocks.append(self.sources_confs[i].format_output())
-            string_blocks.append(self.indexes_confs[i].format_output())
+        for name in self.indexes:
+            for conf in self.index_blocks[name]:
+                if isinstance(conf, IndexConfiguration) and conf.name in paths:
+                    conf = copy.copy(conf)
+                    conf.params = OrderedDict(conf.params)
+                    conf.params['path'] = paths[conf.name]
+                string_blocks.append(conf.format_output())
 
         # output indexer and searchd
         string_blocks.append(self.indexer_conf.format_output())
         string_blocks.append(self.searchd_conf.format_output())
 
-        os.makedirs(os.path.dirname(self.sphinx_file), exist_ok=True)
+        return '\n'.join(string_blocks)
 
-        with open(self.sphinx_file, 'w') as conf_file:
-            conf_file.write('\n'.join(string_blocks))
+    def output(self, file_name=None, paths=None):
+        """
+        Outputs the configuration file `sphinx.conf` (or `file_name`), see
+        `format_output`. The file is replaced atomically, and only if its
+        content changed; returns whether it did.
+        """
+        file_name = file_name or self.sphinx_file
+        content = self.format_output(paths)
+        if os.path.exists(file_name):
+            with open(file_name) as conf_file:
+                if conf_file.read() == content:
+                    if file_name == self.sphinx_file:
+                        self._save_cache()
+                    return False
+
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+
+        # `searchd` and `indexer` never read a partially written file.
+        temporary_file = '%s.%d.tmp' % (file_name, os.getpid())
+        with open(temporary_file, 'w') as conf_file:
+            conf_file.write(content)
+        os.replace(temporary_file, file_name)
+        if file_name == self.sphinx_file:
+            self._save_cache()
+        return True
@@ -1,3 +1,8 @@
+from collections import OrderedDict
+import os
+import threading
+import time
+
 # see http://stackoverflow.com/a/21416007/931303
 try:
     import pymysql
@@ -7,35 +12,219 @@ except ImportError:
 
 import MySQLdb
 
+from . import routing
+from .constants import DEFAULT_ROUTING_POLICY, DEFAULT_EJECT_SECONDS
+from ..exceptions import SphinxError
+
+# errors of a connection that failed or was closed by ``searchd`` (e.g.
+# restarted), after which the statement is retried in a new connection.
+CONNECTION_ERRORS = (2003, 2006, 2013)
+
+# connections of each thread of this process, by (host, port).
+_local = threading.local()
+
+
+def _reset_connections():
+    """
+    Forgets the connections inherited by a forked process, without closing
+    them: their sockets are shared with the parent, which still uses them.
+    """
+    global _local
+    _local = threading.local()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_connections)
+
+
+def _get_connections():
+    # without `os.register_at_fork`, a fork is detected by the pid.
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.connections = {}
+    return _local.connections
+
 
 class Connection:
+    """
+    A connection to ``searchd``. The socket is shared by the connections of
+    the same thread and process, so threads and forked workers never share
+    one.
+
+    Without `host` and `port`, each statement is routed to one of the
+    endpoints of ``INDEXES['connection_params']`` (or of the
+    `Meta.connection_params` of the queried indexes), failing over to the
+    next one if it cannot connect. With ``'hedge_percentile'``, a ``SELECT``
+    not answered within that percentile of the latencies is also sent to a
+    second endpoint, and the first answer is used.
+    """
     def __init__(self, host=None, port=None):
+        self._routed = host is None and port is None
         self.host, self.port = self.configure_connection(host, port)
-        self.db = None
+        # the endpoint and indexes of the last statement, where its
+        # `SHOW META` is.
+        self._endpoint = None
+        self._indexes = None
+        # the `SHOW META` of the last statement, if it was hedged.
+        self._meta = None
+
+    def _get_router(self, indexes):
+        from sphinxql.configuration import indexes_configurator
+        if self._routed:
+            return routing.get_index_router(indexes_configurator, indexes)
+        return routing.get_router([(self.host, self.port)], DEFAULT_ROUTING_POLICY,
+                                  DEFAULT_EJECT_SECONDS)
 
-    def iterator(self, sql, params):
+    def _get_db(self):
         # lazy connect to the server to avoid connection without usage.
-        if self.db is None:
-            self.db = MySQLdb.connect(host=self.host, port=self.port, charset='utf8')
-        cursor = self.db.cursor()
+        connections = _get_connections()
+        key = (self.host, self.port)
+        if key not in connections:
+            connections[key] = MySQLdb.connect(host=self.host, port=self.port, charset='utf8')
+        return connections[key]
+
+    def close(self):
+        """
+        Closes the socket of this thread, if open.
+        """
+        db = _get_connections().pop((self.host, self.port), None)
+        if db is not None:
+            try:
+                db.close()
+            except MySQLdb.Error:
+                pass
+
+    def _execute(self, sql, params, indexes=None, endpoint=None, sample=False):
+        """
+        Returns a cursor with `sql` executed in `endpoint`, or in the first
+        endpoint of the router of `indexes` that connects. Its latency is a
+        `sample` of the router if it is a read.
+        """
+        router = self._get_router(indexes)
+        endpoints = [endpoint] if endpoint is not None else router.get_endpoints()
+        if len(endpoints) == 1:
+            # a lost connection is reopened once.
+            endpoints = endpoints * 2
 
+        for i, endpoint in enumerate(endpoints):
+            self.host, self.port = endpoint.host, endpoint.port
+            cursor = None
+            router.start(endpoint)
+            start = time.time()
+            try:
+                cursor = self._get_db().cursor()
+                cursor.execute(sql, params)
+            except (MySQLdb.OperationalError, MySQLdb.InterfaceError) as e:
+                if cursor is not None:
+                    cursor.close()
+                lost = isinstance(e, MySQLdb.InterfaceError) or \
+                    (e.args and e.args[0] in CONNECTION_ERRORS)
+                router.finish(endpoint, None if lost else time.time() - start, sample)
+                if not lost or i == len(endpoints) - 1:
+                    raise
+                self.close()
+            except Exception:
+                router.finish(endpoint, time.time() - start, sample)
+                if cursor is not None:
+                    cursor.close()
+                raise
+            else:
+                router.finish(endpoint, time.time() - start, sample)
+                self._endpoint = endpoint
+                return cursor
+
+    def _fetch(self, sql, params, indexes, endpoint):
+        """
+        Returns the rows of `sql` executed in `endpoint` and its `SHOW META`,
+        fetched from the same socket.
+        """
+        cursor = self._execute(sql, params, indexes, endpoint, sample=True)
+        try:
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        cursor = self._execute('SHOW META', (), indexes, endpoint)
         try:
-            cursor.execute(sql, params)
-        except Exception:
+            return rows, OrderedDict(cursor.fetchall())
+        finally:
             cursor.close()
-            raise
 
-        cursor.execute(sql, params)
+    def iterator(self, sql, params, indexes=None):
+        """
+        Returns an iterator over the rows of `sql`, executed in an endpoint of
+        the names of the queried `indexes`.
+        """
+        router = self._get_router(indexes)
+        self._indexes = indexes
+        select = sql.lstrip()[:6].upper() == 'SELECT'
+        delay = None
+        if select:
+            delay = router.get_hedge_delay()
+        if delay is not None:
+            # each thread of the executor has its own sockets.
+            rows, self._meta = routing.hedge(
+                router, lambda endpoint: Connection()._fetch(sql, params, indexes, endpoint),
+                delay)
+            for row in rows:
+                yield row
+            return
+
+        self._meta = None
+        cursor = self._execute(sql, params, indexes, sample=select)
 
         for x in range(cursor.rowcount):
             yield cursor.fetchone()
 
         cursor.close()
 
+    def execute(self, sql, params, indexes=None):
+        """
+        Executes a statement that returns no rows (e.g. a ``REPLACE``) in
+        every endpoint of the names of the written `indexes`, so replicas
+        stay identical, and returns the number of affected rows. Raises
+        ``SphinxError`` if it fails in any of them.
+        """
+        router = self._get_router(indexes)
+        self._indexes = indexes
+        self._meta = None
+        rowcount = None
+        errors = []
+        for endpoint in router.endpoints:
+            try:
+                cursor = self._execute(sql, params, indexes, endpoint)
+            except MySQLdb.Error as e:
+                if len(router.endpoints) == 1:
+                    raise
+                errors.append('%r: %s' % (endpoint, e))
+                continue
+            try:
+                if rowcount is None:
+                    rowcount = cursor.rowcount
+            finally:
+                cursor.close()
+
+        if errors:
+            raise SphinxError('Statement failed in {0} of {1} endpoints.\n\n{2}'.format(
+                len(errors), len(router.endpoints), '\n'.join(errors)))
+        return rowcount
+
+    def meta(self):
+        """
+        Returns a dictionary with the `SHOW META` of the last query executed
+        in this connection.
+        """
+        if self._meta is not None:
+            return OrderedDict(self._meta)
+        cursor = self._execute('SHOW META', (), self._indexes, self._endpoint)
+        try:
+            return OrderedDict(cursor.fetchall())
+        finally:
+            cursor.close()
+
     @staticmethod
     def configure_connection(host, port):
         from sphinxql.configuration import indexes_configurator
-        indexes_configurator.configure()
+        indexes_configurator.configure_runtime()
         if host is None or port is None:
             host_conf, port_conf = indexes_configurator.connection_conf.get_connection_parameters()
             host = host if host is not None else host_conf
@@ -18,7 +18,7 @@ source_single_valued_parameters = (
     'sql_column_buffers',
 
     'sql_query',
-    'sql_joined_field',
+    'tsvpipe_command',
     'sql_query_post',
     'sql_query_post_index',
     'sql_ranged_throttle',
@@ -53,6 +53,18 @@ source_multi_valued_parameters = (
     'xmlpipe_field_string',
     'xmlpipe_field_wordcount',
 
+    'tsvpipe_field',
+    'tsvpipe_field_string',
+    'tsvpipe_attr_uint',
+    'tsvpipe_attr_timestamp',
+    'tsvpipe_attr_bool',
+    'tsvpipe_attr_float',
+    'tsvpipe_attr_bigint',
+    'tsvpipe_attr_multi',
+    'tsvpipe_attr_multi_64',
+    'tsvpipe_attr_string',
+    'tsvpipe_attr_json',
+
     'sql_attr_uint',
     'sql_attr_timestamp',
     'sql_attr_float',
@@ -66,7 +78,8 @@ source_multi_valued_parameters = (
 
     'sql_field_string',
     'sql_field_str2wordcount',
-    'sql_file_field'
+    'sql_file_field',
+    'sql_joined_field'
 )
 
 source_parameters = source_single_valued_parameters + source_multi_valued_parameters
@@ -80,6 +93,11 @@ source_mandatory_parameters = (
     'sql_query',
 )
 
+pipe_source_mandatory_parameters = (
+    'type',
+    'tsvpipe_command',
+)
+
 source_limited_options = {
     'type': ('mysql', 'pgsql', 'mssql', 'xmlpipe', 'xmlpipe2', 'odbc'),
 }
@@ -116,10 +134,6 @@ index_single_valued_parameters = (
     'html_strip',
     'html_index_attrs',
     'html_remove_elements',
-    'local',
-    'agent',
-    'agent_persistent',
-    'agent_blackhole',
     'agent_connect_timeout',
     'agent_query_timeout',
     'preopen',
@@ -147,6 +161,10 @@ index_single_valued_parameters = (
 )
 
 index_multi_valued_parameters = (
+    'local',
+    'agent',
+    'agent_persistent',
+    'agent_blackhole',
     'rt_field',
     'rt_attr_uint',
     'rt_attr_bool',
@@ -235,11 +253,25 @@ searchd_mandatory_parameters = (
 
 connection_parameters = (
     'host',
-    'port'
+    'port',
+    'endpoints',
+    'policy',
+    'eject_seconds',
+    'hedge_percentile',
 )
 
 connection_mandatory_parameters = ()
 
+connection_multi_valued_parameters = (
+    'endpoints',
+)
+
+routing_policies = ('round_robin', 'least_outstanding', 'latency')
+
+DEFAULT_ROUTING_POLICY = 'round_robin'
+
+DEFAULT_EJECT_SECONDS = 30
+
 reserved_keywords = (
     'AND',
     'AGENT',
@@ -0,0 +1,91 @@
+"""
+Fingerprints of the generated configuration of each index, used to rebuild
+only the indexes whose definition changed since they were last built.
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+
+from .configurations import IndexConfiguration
+
+FINGERPRINTS_FILE = 'sphinxql_fingerprints.json'
+
+# parameters that change how an index is built, but not its documents.
+IGNORED_PARAMETERS = ('sql_range_step', 'sql_ranged_throttle', 'sql_pass')
+
+
+def fingerprint(confs):
+    """
+    Returns the hash of the configurations `confs` of an index.
+    """
+    content = []
+    for conf in confs:
+        # sorted, as the order of a dictionary may change between runs.
+        params = [(name, value) for name, value in sorted(conf.params.items())
+                  if name not in IGNORED_PARAMETERS]
+        content.append([conf.type_name, conf.name, conf.parent, params])
+    return hashlib.sha1(json.dumps(content, default=str).encode('utf-8')).hexdigest()
+
+
+def get_fingerprints(configurator):
+    """
+    Returns an ordered dictionary mapping the name of each index built by
+    ``indexer`` to the fingerprint of its configured sources and indexes.
+    """
+    fingerprints = OrderedDict()
+    for name, confs in configurator.index_blocks.items():
+        if any(isinstance(conf, IndexConfiguration) and
+               conf.params.get('type', 'plain') == 'plain' for conf in confs):
+            fingerprints[name] = fingerprint(confs)
+    return fingerprints
+
+
+def _get_file(configurator):
+    return os.path.join(configurator.index_path, FINGERPRINTS_FILE)
+
+
+def load(configurator):
+    """
+    Returns the fingerprints of the indexes when they were last built.
+    """
+    try:
+        with open(_get_file(configurator)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def save(configurator, names=None):
+    """
+    Stores the current fingerprints of the indexes `names` (all if None),
+    after they are built. Names can also be of plain indexes (e.g. of shards),
+    in which case an index is stored once all its plain indexes are built.
+    """
+    # the indexes were built from the current `sphinx.conf`.
+    configurator.load_configuration()
+    current = get_fingerprints(configurator)
+    if names is None:
+        names = list(current)
+
+    built = [name for name in current if name in names or
+             set(configurator.get_indexer_names([name])) <= set(names)]
+    stored = load(configurator)
+    stored.update((name, current[name]) for name in built)
+
+    path = _get_file(configurator)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(stored, f, indent=4, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def get_changed(configurator):
+    """
+    Returns the names of the indexes built by ``indexer`` whose configuration
+    changed since they were last built, or that were never built.
+    """
+    configurator.configure()
+    stored = load(configurator)
+    return [name for name, value in get_fingerprints(configurator).items()
+            if stored.get(name) != value]
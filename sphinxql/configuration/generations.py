@@ -0,0 +1,199 @@
+"""
+Generations of plain indexes: each build is written in its own directory,
+validated and then swapped into the path served by ``searchd``, so a bad build
+never replaces good data and previous generations can be restored.
+"""
+import glob
+import json
+import os
+import re
+import shutil
+
+from django.conf import settings
+
+from .configurations import IndexConfiguration
+from ..exceptions import SphinxError
+
+GENERATIONS_DIRECTORY = 'generations'
+METADATA_FILE = 'generations.json'
+
+DEFAULT_KEEP_GENERATIONS = 2
+
+# minimum ratio between the documents of a new generation and of the current.
+DEFAULT_MIN_DOCUMENTS_RATIO = 0.5
+
+# the lock of an index belongs to the process using it.
+LOCK_EXTENSION = '.spl'
+
+
+def get_index_path(configurator, name):
+    """
+    Returns the path of the plain index `name` served by ``searchd``.
+    """
+    for confs in configurator.index_blocks.values():
+        for conf in confs:
+            if isinstance(conf, IndexConfiguration) and conf.name == name:
+                return conf.params['path']
+    raise SphinxError('"%s" is not an index built by indexer.' % name)
+
+
+def get_directory(configurator, name):
+    return os.path.join(configurator.index_path, GENERATIONS_DIRECTORY, name)
+
+
+def get_path(configurator, name, generation):
+    """
+    Returns the path the generation `generation` of the index `name` is built
+    into.
+    """
+    return os.path.join(get_directory(configurator, name), str(generation),
+                        os.path.basename(get_index_path(configurator, name)))
+
+
+def load(configurator, name):
+    """
+    Returns the metadata of the generations of the index `name`: the current
+    generation and the list of kept generations, each a dictionary with its
+    ``'generation'`` and ``'documents'``.
+    """
+    try:
+        with open(os.path.join(get_directory(configurator, name), METADATA_FILE)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return {'current': None, 'generations': []}
+
+
+def _save(configurator, name, metadata):
+    path = os.path.join(get_directory(configurator, name), METADATA_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(metadata, f, indent=4)
+    os.replace(path + '.tmp', path)
+
+
+def current_generation(configurator, name):
+    """
+    Returns the generation of the index `name` served by ``searchd``, or None
+    if it was not built in generations.
+    """
+    return load(configurator, name)['current']
+
+
+def new_generation(configurator, name):
+    """
+    Returns the number of the next generation of the index `name` and creates
+    its directory.
+    """
+    metadata = load(configurator, name)
+    generation = max([entry['generation'] for entry in metadata['generations']] +
+                     [metadata['current'] or 0]) + 1
+    directory = os.path.dirname(get_path(configurator, name, generation))
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory)
+    return generation
+
+
+def discard(configurator, name, generation):
+    """
+    Removes the files of a generation that failed to build or to validate.
+    """
+    shutil.rmtree(os.path.dirname(get_path(configurator, name, generation)),
+                  ignore_errors=True)
+
+
+def get_documents(header):
+    """
+    Returns the number of documents in the output of ``indextool --dumpheader``.
+    """
+    match = re.search(r'total-documents: (\d+)', header)
+    if match is None:
+        raise SphinxError('Header without the number of documents:\n\n%s' % header)
+    return int(match.group(1))
+
+
+def check_documents(configurator, name, documents):
+    """
+    Raises ``SphinxError`` if `documents` is less than
+    ``INDEXES['min_documents_ratio']`` of the documents of the current
+    generation of the index `name`.
+    """
+    metadata = load(configurator, name)
+    current = [entry for entry in metadata['generations']
+               if entry['generation'] == metadata['current']]
+    if not current:
+        return
+
+    ratio = settings.INDEXES.get('min_documents_ratio', DEFAULT_MIN_DOCUMENTS_RATIO)
+    if documents < current[0]['documents'] * ratio:
+        raise SphinxError('Index "{0}" has {1} documents, less than {2} of the {3} '
+                          'of the current generation.'.format(
+                              name, documents, ratio, current[0]['documents']))
+
+
+def stage(configurator, name, generation):
+    """
+    Links the files of the generation `generation` of the index `name` to the
+    path of the index with the suffix ``.new``, which ``searchd`` serves on
+    its next rotation.
+    """
+    path = get_path(configurator, name, generation)
+    index_path = get_index_path(configurator, name)
+    for file_name in glob.glob(path + '.*'):
+        extension = file_name[len(path):]
+        if extension == LOCK_EXTENSION:
+            continue
+        new_file_name = '%s.new%s' % (index_path, extension)
+        if os.path.exists(new_file_name):
+            os.remove(new_file_name)
+        try:
+            # generations are kept without copying them.
+            os.link(file_name, new_file_name)
+        except OSError:
+            shutil.copy2(file_name, new_file_name)
+
+
+def install(configurator, name):
+    """
+    Moves the staged files of the index `name` to its path, when ``searchd``
+    is not running to rotate them.
+    """
+    index_path = get_index_path(configurator, name)
+    for file_name in glob.glob(index_path + '.new.*'):
+        os.replace(file_name, index_path + file_name[len(index_path) + 4:])
+
+
+def activate(configurator, name, generation, documents=None):
+    """
+    Records the generation `generation` as the current generation of the
+    index `name` and removes the generations older than the
+    ``INDEXES['keep_generations']`` last ones.
+    """
+    metadata = load(configurator, name)
+    if documents is not None:
+        metadata['generations'].append({'generation': generation,
+                                        'documents': documents})
+    metadata['current'] = generation
+
+    keep = settings.INDEXES.get('keep_generations', DEFAULT_KEEP_GENERATIONS)
+    entries = sorted(metadata['generations'], key=lambda entry: entry['generation'])
+    kept = entries[-keep:] if keep > 0 else []
+    for entry in entries:
+        if entry not in kept and entry['generation'] != generation:
+            discard(configurator, name, entry['generation'])
+    metadata['generations'] = [entry for entry in entries
+                               if entry in kept or entry['generation'] == generation]
+    _save(configurator, name, metadata)
+
+
+def previous_generation(configurator, name):
+    """
+    Returns the kept generation before the current generation of the index
+    `name`; raises ``SphinxError`` if there is none.
+    """
+    metadata = load(configurator, name)
+    previous = [entry['generation'] for entry in metadata['generations']
+                if metadata['current'] is not None and
+                entry['generation'] < metadata['current']]
+    if not previous:
+        raise SphinxError('Index "%s" has no previous generation.' % name)
+    return max(previous)
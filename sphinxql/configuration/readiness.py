@@ -0,0 +1,124 @@
+"""
+Polls ``searchd`` until it is ready, instead of sleeping a fixed time after
+starting it or rotating its indexes.
+"""
+import glob
+import os
+import time
+
+from django.conf import settings
+
+from .configurations import IndexConfiguration
+from ..exceptions import SphinxError
+
+DEFAULT_TIMEOUT = 30
+
+# first and maximum delay, in seconds, between two polls.
+INITIAL_DELAY = 0.01
+MAX_DELAY = 0.5
+
+
+def _get_timeout(timeout):
+    if timeout is None:
+        timeout = settings.INDEXES.get('ready_timeout', DEFAULT_TIMEOUT)
+    return timeout
+
+
+def poll(check, timeout=None, description='searchd to be ready'):
+    """
+    Calls `check()`, with exponential backoff, until it returns True. Raises
+    ``SphinxError`` if it does not within `timeout` seconds (by default
+    ``INDEXES['ready_timeout']``, 30).
+    """
+    deadline = time.time() + _get_timeout(timeout)
+    delay = INITIAL_DELAY
+    while not check():
+        if time.time() + delay > deadline:
+            raise SphinxError('Timeout waiting for %s.' % description)
+        time.sleep(delay)
+        delay = min(delay * 2, MAX_DELAY)
+
+
+def get_pid(pid_file):
+    """
+    Returns the pid written in `pid_file` if that process is alive, or None.
+    """
+    try:
+        with open(pid_file) as f:
+            pid = int(f.read().strip())
+    except (IOError, OSError, ValueError):
+        return None
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return None
+    except PermissionError:
+        # alive, but from another user.
+        pass
+    return pid
+
+
+def is_responding():
+    """
+    Returns whether ``searchd`` accepts connections and answers queries.
+    """
+    from .connection import Connection
+
+    connection = Connection()
+    try:
+        list(connection.iterator('SHOW STATUS', ()))
+    except Exception:
+        return False
+    finally:
+        connection.close()
+    return True
+
+
+def is_running(configurator):
+    """
+    Returns whether the ``searchd`` of `configurator` wrote its pid file and
+    answers queries.
+    """
+    pid_file = configurator.searchd_conf.params['pid_file']
+    return get_pid(pid_file) is not None and is_responding()
+
+
+def get_index_paths(configurator, names=None):
+    """
+    Returns the paths of the plain indexes `names` (all if None).
+    """
+    names = configurator.get_indexer_names(names)
+    return [conf.params['path'] for confs in configurator.index_blocks.values()
+            for conf in confs
+            if isinstance(conf, IndexConfiguration) and conf.name in names]
+
+
+def is_rotated(paths):
+    """
+    Returns whether ``searchd`` rotated the indexes at `paths`: ``indexer
+    --rotate`` writes the new files of an index with the suffix ``.new`` and
+    ``searchd`` renames them once it serves them.
+    """
+    return not any(glob.glob('%s.new.*' % path) for path in paths)
+
+
+def wait_until_ready(configurator, timeout=None):
+    """
+    Waits until the ``searchd`` of `configurator` is running.
+    """
+    configurator.configure_runtime()
+    poll(lambda: is_running(configurator), timeout)
+
+
+def wait_until_rotated(configurator, names=None, timeout=None):
+    """
+    Waits until ``searchd`` serves the rotated indexes `names` (all if None).
+    Does not wait if ``searchd`` is not running, as nothing rotates them.
+    """
+    configurator.load_configuration()
+    if get_pid(configurator.searchd_conf.params['pid_file']) is None:
+        return
+    paths = get_index_paths(configurator, names)
+    poll(lambda: is_rotated(paths) and is_responding(), timeout,
+         'searchd to rotate the indexes')
@@ -0,0 +1,235 @@
+"""
+Routes statements across several identical ``searchd`` (replicas), with
+failover and temporary ejection of the ones failing to connect, and hedges
+slow reads to a second replica.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import itertools
+import os
+import threading
+import time
+
+# weight of the last latency in the moving average of the `latency` policy.
+LATENCY_ALPHA = 0.3
+
+# latencies kept to compute the delay of hedged reads, and the minimum
+# number of them to hedge.
+LATENCIES_WINDOW = 1000
+MIN_LATENCIES = 20
+
+# threads running hedged reads and the queries of scatter-gather.
+WORKERS = 8
+
+
+class Endpoint(object):
+    """
+    A ``searchd`` with the statistics of its statements.
+    """
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+        self.outstanding = 0
+        self.latency = 0.0
+        self.ejected_until = 0.0
+
+    def __repr__(self):
+        return '%s:%d' % (self.host, self.port)
+
+
+class Router(object):
+    """
+    Chooses the endpoints of each statement according to a `policy`:
+
+    * ``'round_robin'``: each endpoint in turn;
+    * ``'least_outstanding'``: the one with less statements running;
+    * ``'latency'``: the one with the lowest exponentially weighted moving
+      average of its latencies.
+
+    An endpoint failing to connect is ejected for `eject_seconds`: it is only
+    used when every other endpoint is also ejected.
+
+    If `hedge_percentile`, reads not answered within that percentile of the
+    last latencies are also sent to a second endpoint (see `hedge`).
+    """
+    def __init__(self, endpoints, policy, eject_seconds, hedge_percentile=0):
+        self.endpoints = [Endpoint(host, port) for host, port in endpoints]
+        self.policy = policy
+        self.eject_seconds = eject_seconds
+        self.hedge_percentile = hedge_percentile
+
+        # hedge metrics: reads that could be hedged, reads hedged and reads
+        # answered first by the second endpoint.
+        self.reads = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+        self._latencies = deque(maxlen=LATENCIES_WINDOW)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def get_endpoints(self):
+        """
+        Returns the endpoints in the order they are tried by a statement.
+        """
+        now = time.time()
+        with self._lock:
+            start = next(self._counter) % len(self.endpoints)
+            # rotated so ties are spread across endpoints.
+            endpoints = self.endpoints[start:] + self.endpoints[:start]
+            healthy = [e for e in endpoints if e.ejected_until <= now]
+            ejected = sorted((e for e in endpoints if e.ejected_until > now),
+                             key=lambda e: e.ejected_until)
+
+            if self.policy == 'least_outstanding':
+                healthy.sort(key=lambda e: e.outstanding)
+            elif self.policy == 'latency':
+                healthy.sort(key=lambda e: e.latency)
+        return healthy + ejected
+
+    def start(self, endpoint):
+        with self._lock:
+            endpoint.outstanding += 1
+
+    def finish(self, endpoint, latency=None, sample=True):
+        """
+        Records the end of a statement in `endpoint`, that took `latency`
+        seconds or failed if None. Only the latencies of reads (`sample`)
+        are used by the `latency` policy and to hedge.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if latency is None:
+                endpoint.ejected_until = time.time() + self.eject_seconds
+                return
+            endpoint.ejected_until = 0.0
+            if sample:
+                self._latencies.append(latency)
+                if endpoint.latency:
+                    latency = LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * endpoint.latency
+                endpoint.latency = latency
+
+    def get_hedge_delay(self):
+        """
+        Returns the seconds after which a read is hedged, or None if reads
+        are not hedged.
+        """
+        if not self.hedge_percentile or len(self.endpoints) < 2:
+            return None
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < MIN_LATENCIES:
+            return None
+        return latencies[min(len(latencies) - 1,
+                             len(latencies) * self.hedge_percentile // 100)]
+
+    def get_stats(self):
+        """
+        Returns a dictionary with the hedge metrics of this router.
+        """
+        with self._lock:
+            return {'reads': self.reads,
+                    'hedged': self.hedged,
+                    'hedge_wins': self.hedge_wins,
+                    'hedge_rate': self.hedged / self.reads if self.reads else 0.0}
+
+
+_executor = None
+
+
+def get_executor():
+    """
+    Returns the pool of threads of this process running statements
+    concurrently; each thread has its own sockets.
+    """
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS)
+    return _executor
+
+
+def _reset_executor():
+    # the threads of the executor do not exist in a forked process.
+    global _executor
+    _executor = None
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_executor)
+
+
+def hedge(router, fetch, delay):
+    """
+    Returns `fetch(endpoint)` of the first endpoint of `router` or, if it
+    does not return within `delay` seconds, of the first of it and the second
+    endpoint to return. The slower one is cancelled if not started yet, or
+    its result discarded. Raises the error of the first endpoint if both fail.
+    """
+    endpoints = router.get_endpoints()
+    executor = get_executor()
+    with router._lock:
+        router.reads += 1
+
+    first = executor.submit(fetch, endpoints[0])
+    done, _ = wait([first], timeout=delay)
+    if done and first.exception() is None:
+        return first.result()
+
+    with router._lock:
+        router.hedged += 1
+    second = executor.submit(fetch, endpoints[1])
+    pending = {first, second}
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                if future is second:
+                    with router._lock:
+                        router.hedge_wins += 1
+                return future.result()
+    return first.result()
+
+
+_routers = {}
+_routers_lock = threading.Lock()
+
+
+def get_router(endpoints, policy, eject_seconds, hedge_percentile=0):
+    """
+    Returns the router of `endpoints` (a list of (host, port)), shared by the
+    threads of this process so they share the statistics of the endpoints.
+    """
+    key = (tuple(endpoints), policy, eject_seconds, hedge_percentile)
+    with _routers_lock:
+        if key not in _routers:
+            _routers[key] = Router(endpoints, policy, eject_seconds, hedge_percentile)
+        return _routers[key]
+
+
+def get_stats():
+    """
+    Returns a dictionary mapping the endpoints of each router of this
+    process to its hedge metrics.
+    """
+    with _routers_lock:
+        routers = list(_routers.values())
+    return dict((tuple(repr(endpoint) for endpoint in router.endpoints), router.get_stats())
+                for router in routers)
+
+
+def get_index_router(configurator, index_names=None):
+    """
+    Returns the router of the indexes `index_names`: of the first one with
+    `Meta.connection_params`, or of ``INDEXES['connection_params']``.
+    """
+    configurator.configure_runtime()
+    connection_conf = configurator.connection_conf
+    for name in index_names or ():
+        if name in configurator.index_connection_confs:
+            connection_conf = configurator.index_connection_confs[name]
+            break
+    return get_router(connection_conf.get_endpoints(),
+                      *connection_conf.get_routing_parameters())
@@ -1,5 +1,6 @@
 import datetime
 import calendar
+import json
 
 from django.conf import settings
 from django.utils.timezone import get_current_timezone
@@ -268,6 +269,15 @@ class NotIn(In):
     _function = 'NOT IN'
 
 
+class InFunction(In):
+    """
+    The function form of ``IN``, ``IN(expr, value1, value2, ...)``, that
+    can be used in select expressions and combined with ``OR``.
+    """
+    def as_sql(self):
+        return Function.as_sql(self)
+
+
 class Between(Function):
     _function = 'BETWEEN'
     _arguments_num = 3
@@ -470,3 +480,52 @@ class DateTime(Date):
         if settings.USE_TZ:
             dt = dt.replace(tzinfo=get_current_timezone())
         return dt
+
+
+class MultiInteger(Value):
+    """
+    The values of a multi-valued attribute, e.g. ``(1, 2, 3)``.
+    """
+    _input_python_types = (tuple, list, set)
+    _python_type = tuple
+
+    def as_sql(self):
+        return '(%s)' % ', '.join('%d' % value for value in self._value)
+
+    @staticmethod
+    def to_python(db_value):
+        # Sphinx returns the values separated by commas.
+        if not db_value:
+            return []
+        return [int(value) for value in db_value.split(',')]
+
+
+class Json(Value):
+    """
+    A JSON document, e.g. ``{'color': 'red'}``.
+    """
+    _input_python_types = (dict, list)
+    _python_type = dict
+
+    def __init__(self, value):
+        if not isinstance(value, self._input_python_types):
+            raise TypeError("%s only accepts types %s" %
+                            (self.__class__, self._input_python_types))
+        super(Value, self).__init__(value)
+
+    def as_sql(self):
+        return '%s'
+
+    def get_params(self):
+        return [json.dumps(self._value)]
+
+    @staticmethod
+    def to_python(db_value):
+        # Sphinx returns the JSON document serialized.
+        if db_value is None or db_value == '':
+            return None
+        if isinstance(db_value, bytes):
+            db_value = db_value.decode('utf-8')
+        if not isinstance(db_value, str):
+            return db_value
+        return json.loads(db_value)
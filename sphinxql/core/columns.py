@@ -1,4 +1,6 @@
-from ..core.base import SQLExpression, Integer
+import re
+
+from ..core.base import SQLExpression, Integer, Json
 
 
 def quote(string):
@@ -47,3 +49,20 @@ class WeightColumn(Column):
 
     def as_sql(self):
         return '%s' % self._value
+
+
+class JsonPathColumn(Column):
+    """
+    Column representing a path inside a JSON attribute, e.g. ``props.color``
+    or ``props.sizes[0]``.
+    """
+    _path_regex = re.compile(r'^\w+(\.\w+|\[\d+\])*$')
+
+    def __init__(self, column, path):
+        if not self._path_regex.match(path):
+            raise ValueError('Invalid JSON path "%s" of "%s"' % (path, column.name))
+        super(JsonPathColumn, self).__init__(Json, '%s.%s' % (column.name, path))
+
+    def as_sql(self):
+        # Sphinx does not accept quoted JSON paths.
+        return self._value
@@ -1,6 +1,22 @@
 from . import base
 from .. import sql
 
+
+def all_in(lhs, rhs):
+    """
+    Returns the condition of a multi-valued `lhs` containing all values `rhs`.
+    """
+    assert isinstance(rhs, (tuple, set, list))
+    if not rhs:
+        raise ValueError('Lookup \'all\' requires at least one value.')
+
+    condition = None
+    for value in rhs:
+        equal = base.Equal(lhs, base.convert(value))
+        condition = equal if condition is None else base.And(condition, equal)
+    return condition
+
+
 LOOKUPS = {'eq': base.Equal,
            'neq': base.NotEqual,
            'lt': base.LessThan,
@@ -10,7 +26,8 @@ LOOKUPS = {'eq': base.Equal,
            'in': base.In,
            'nin': base.NotIn,
            'range': base.Between,
-           'nrange': base.NotBetween}
+           'nrange': base.NotBetween,
+           'all': all_in}
 
 LOOKUP_SEPARATOR = '__'
 
@@ -39,7 +56,7 @@ def parse_lookup(lhs, rhs):
                        'Check documentation on available lookups.'
                        .format(parts[1]))
 
-    if lookup not in ('in', 'nin', 'range', 'nrange'):
+    if lookup not in ('in', 'nin', 'range', 'nrange', 'all'):
         rhs = base.convert(rhs)
 
     return operation(column, rhs)
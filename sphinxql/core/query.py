@@ -5,6 +5,7 @@ from ..configuration.connection import Connection
 from ..exceptions import NotSupportedError
 from .base import CompilableSQL, All
 from .columns import IdColumn, Column
+from . import scatter
 
 # Sphinx sets a max of 5 columns in order by.
 MAX_ORDER_BY_ALLOWED = 5
@@ -28,12 +29,32 @@ class Query(CompilableSQL):
         self._connection = connection
         if connection is None:
             self._connection = Connection()
+        # the merged `SHOW META` of the last scatter-gather execution.
+        self._meta = None
 
     def __iter__(self):
         """
         If limits are defined, returns an iterator over all results.
         """
-        return self._connection.iterator(self.as_sql(), self.get_params())
+        endpoints = self._get_shard_endpoints()
+        if endpoints:
+            rows, self._meta = scatter.execute(self, endpoints)
+            return iter(rows)
+        self._meta = None
+        return self._connection.iterator(self.as_sql(), self.get_params(),
+                                         self.fromm.names())
+
+    def _get_shard_endpoints(self):
+        """
+        Returns the list of (host, port) of the nodes the queried indexes are
+        sharded across (their `Meta.shard_endpoints`), or None.
+        """
+        from sphinxql.configuration import indexes_configurator
+        indexes_configurator.configure_runtime()
+        for name in self.fromm.names():
+            if name in indexes_configurator.index_shard_endpoints:
+                return indexes_configurator.index_shard_endpoints[name]
+        return None
 
     def __str__(self):
         return self.as_sql() % tuple("\"%s\"" % x for x in self.get_params())
@@ -41,6 +62,15 @@ class Query(CompilableSQL):
     def __len__(self):
         return len(list(iter(self)))
 
+    def meta(self):
+        """
+        Returns a dictionary with the `SHOW META` of the last execution of
+        this query (e.g. `total_found`).
+        """
+        if self._meta is not None:
+            return self._meta
+        return self._connection.meta()
+
     @property
     def select(self):
         return self._statements['select']
@@ -128,6 +158,12 @@ class SelectStatement(CompilableSQL):
         self._expressions.clear()
         self._alias.clear()
 
+    def expressions(self):
+        """
+        Returns the list of selected expressions.
+        """
+        return list(self._expressions)
+
     def append(self, expression, alias=None):
         assert (alias is None) or alias not in self._alias
 
@@ -169,6 +205,12 @@ class FromStatement(CompilableSQL):
         assert index.build_name() not in self._indexes
         self._indexes[index.build_name()] = index
 
+    def names(self):
+        """
+        Returns the list of names of the indexes.
+        """
+        return list(self._indexes)
+
     def as_sql(self):
         assert self._indexes
         sql = ''
@@ -227,6 +269,13 @@ class OrderByStatement(CompilableSQL):
 
         return sql
 
+    def columns(self):
+        """
+        Returns the list of (column, ascending) of the order.
+        """
+        return [(column, direction == 'ASC') for column, direction in
+                zip(self._columns, self._directions)]
+
     def append(self, column, ascending=True):
         assert isinstance(column, Column)
         assert isinstance(ascending, bool)
@@ -0,0 +1,161 @@
+"""
+Scatter-gather of a query across independent ``searchd`` nodes, each serving
+a shard of the queried index: the query is sent to every node concurrently
+and their ordered rows are merged.
+"""
+from collections import OrderedDict
+import heapq
+import itertools
+
+from ..configuration import routing
+from ..configuration.connection import Connection
+from ..exceptions import NotSupportedError, SphinxError
+from .base import Count
+from .columns import WeightColumn
+
+# alias of the selected ORDER BY keys, by position.
+ORDER_ALIAS = 'sphinxql_order_%d'
+
+# the LIMIT of Sphinx when the query has none.
+DEFAULT_LIMIT = 20
+
+# meta values summed across nodes; `docs[i]` and `hits[i]` are per keyword.
+SUMMED_META = ('total', 'total_found')
+SUMMED_META_PREFIXES = ('docs[', 'hits[')
+
+
+class _SortKey(object):
+    """
+    The ORDER BY keys of a row, compared in the direction of each key.
+    """
+    __slots__ = ('values', 'directions')
+
+    def __init__(self, values, directions):
+        self.values = values
+        self.directions = directions
+
+    def __lt__(self, other):
+        for value, other_value, ascending in zip(self.values, other.values,
+                                                  self.directions):
+            if value != other_value:
+                return value < other_value if ascending else value > other_value
+        return False
+
+    def __eq__(self, other):
+        return self.values == other.values
+
+
+def _get_shard_query(query):
+    """
+    Returns the query sent to each node: `query` selecting its ORDER BY keys
+    (by default ``weight()`` descending, as Sphinx sorts), limited to the
+    rows of the global limit, and the directions of the keys.
+    """
+    if not query.select:
+        raise NotSupportedError('Scatter-gather queries must select their '
+                                'columns explicitly.')
+    shard_query = query.clone()
+    columns = shard_query.order_by.columns()
+    if not columns:
+        columns = [(WeightColumn(), False)]
+        shard_query.order_by.append(WeightColumn(), ascending=False)
+
+    for position, (column, _) in enumerate(columns):
+        shard_query.select.append(column, ORDER_ALIAS % position)
+
+    offset, count = query.limit or (0, DEFAULT_LIMIT)
+    shard_query.limit = (0, offset + count)
+    return shard_query, [ascending for _, ascending in columns]
+
+
+def _fetch(sql, params, endpoint):
+    connection = Connection(*endpoint)
+    rows = list(connection.iterator(sql, params))
+    return rows, connection.meta()
+
+
+def merge_rows(shards_rows, directions, offset, count):
+    """
+    Returns the rows `offset` to `offset + count` of the rows of each node,
+    each ending with its ORDER BY keys, merged in order. Ties are in the order
+    of Sphinx: ascending id, the first column.
+    """
+    keys = len(directions)
+    directions = list(directions) + [True]
+
+    def decorate(rows, i):
+        # `heapq.merge` has no `key` before Python 3.5; `i` breaks ties so
+        # rows are never compared.
+        for row in rows:
+            yield _SortKey(tuple(row[-keys:]) + (row[0],), directions), i, row
+
+    merged = heapq.merge(*[decorate(rows, i) for i, rows in enumerate(shards_rows)])
+    return [row[:-keys] for _, _, row in itertools.islice(merged, offset, offset + count)]
+
+
+def merge_counts(shards_rows, positions):
+    """
+    Returns the row of an aggregation without ``GROUP BY`` (e.g. ``COUNT(*)``)
+    of the rows of each node, with the counts at `positions` summed.
+    """
+    rows = [rows[0] for rows in shards_rows if rows]
+    if not rows:
+        return []
+    row = list(rows[0])
+    for position in positions:
+        row[position] = sum(other[position] for other in rows)
+    return [tuple(row)]
+
+
+def merge_meta(metas):
+    """
+    Returns the `SHOW META` of the nodes merged: the number of documents
+    (e.g. ``total_found``) summed and the time of the slowest one.
+    """
+    meta = OrderedDict(metas[0])
+    for name in meta:
+        values = [other.get(name) or 0 for other in metas]
+        if name in SUMMED_META or name.startswith(SUMMED_META_PREFIXES):
+            meta[name] = str(sum(int(value) for value in values))
+        elif name == 'time':
+            meta[name] = '%.3f' % max(float(value) for value in values)
+    return meta
+
+
+def execute(query, endpoints):
+    """
+    Executes `query` in each node of `endpoints` (a list of (host, port))
+    concurrently and returns a tuple (rows, meta) with their rows merged in
+    the order of the query, restricted to its global LIMIT, and their
+    `SHOW META` merged. Raises ``SphinxError`` if any node fails, since the
+    results would miss its documents.
+    """
+    counts = [position for position, expression in enumerate(query.select.expressions())
+              if isinstance(expression, Count)]
+    if counts:
+        shard_query, directions = query, []
+    else:
+        shard_query, directions = _get_shard_query(query)
+
+    sql, params = shard_query.as_sql(), shard_query.get_params()
+    executor = routing.get_executor()
+    futures = [executor.submit(_fetch, sql, params, endpoint) for endpoint in endpoints]
+
+    results = []
+    errors = []
+    for endpoint, future in zip(endpoints, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            errors.append('%s:%d: %s' % (endpoint[0], endpoint[1], e))
+    if errors:
+        raise SphinxError('Query failed in {0} of {1} shard endpoints.\n\n{2}'.format(
+            len(errors), len(endpoints), '\n'.join(errors)))
+
+    shards_rows = [rows for rows, _ in results]
+    if counts:
+        rows = merge_counts(shards_rows, counts)
+    else:
+        offset, count = query.limit or (0, DEFAULT_LIMIT)
+        rows = merge_rows(shards_rows, directions, offset, count)
+    return rows, merge_meta([meta for _, meta in results])
@@ -10,6 +10,10 @@ class Field(columns.Column):
     """
     _type = None
     _sphinx_field_name = None
+    # the declarations of the field in a real-time index.
+    _rt_field_names = ()
+    # whether the value is a column of the query of the source.
+    _is_query_column = True
 
     def __init__(self, model_attr):
         super(Field, self).__init__(self._type, None)
@@ -30,6 +34,7 @@ class Text(Field):
     """
     _sphinx_field_name = None
     _type = types.String
+    _rt_field_names = ('rt_field',)
 
 
 class Integer(Field):
@@ -38,6 +43,7 @@ class Integer(Field):
     """
     _sphinx_field_name = 'sql_attr_bigint'
     _type = types.Integer
+    _rt_field_names = ('rt_attr_bigint',)
 
 
 class Float(Field):
@@ -46,6 +52,7 @@ class Float(Field):
     """
     _sphinx_field_name = 'sql_attr_float'
     _type = types.Float
+    _rt_field_names = ('rt_attr_float',)
 
 
 class String(Field):
@@ -54,6 +61,7 @@ class String(Field):
     """
     _sphinx_field_name = 'sql_attr_string'
     _type = types.String
+    _rt_field_names = ('rt_attr_string',)
 
 
 class IndexedString(Field):
@@ -62,6 +70,7 @@ class IndexedString(Field):
     """
     _sphinx_field_name = 'sql_field_string'
     _type = types.String
+    _rt_field_names = ('rt_field', 'rt_attr_string')
 
 
 class DateTime(Field):
@@ -70,13 +79,57 @@ class DateTime(Field):
     """
     _sphinx_field_name = 'sql_attr_timestamp'
     _type = types.DateTime
+    _rt_field_names = ('rt_attr_timestamp',)
 
 
 class Date(Field):
     _sphinx_field_name = 'sql_attr_timestamp'
     _type = types.Date
+    _rt_field_names = ('rt_attr_timestamp',)
 
 
 class Bool(Field):
     _sphinx_field_name = 'sql_attr_bool'
     _type = types.Bool
+    _rt_field_names = ('rt_attr_bool',)
+
+
+class MultiInteger(Field):
+    """
+    A Sphinx multi-valued attribute (i.e. not indexed) with the ids of the
+    many-to-many relation `model_attr` of the model.
+    """
+    _sphinx_field_name = 'sql_attr_multi'
+    _type = types.MultiInteger
+    _rt_field_names = ('rt_attr_multi',)
+    _is_query_column = False
+
+
+class Json(Field):
+    """
+    A Sphinx JSON attribute (i.e. not indexed). Its keys can be used in
+    expressions with ``C('<field>.<key>')``.
+    """
+    _sphinx_field_name = 'sql_attr_json'
+    _type = types.Json
+    _rt_field_names = ('rt_attr_json',)
+
+
+class JoinedText(Field):
+    """
+    A Sphinx field (indexed but not stored) with the text of the rows of a
+    one-to-many relation of the model, e.g. ``JoinedText('comments__text')``.
+
+    The text is retrieved in a separate query (``sql_joined_field``), so the
+    query of the index does not join the related table. `related_query`
+    restricts the related rows (default: all) and, if `ranged`, the rows are
+    retrieved by ranges of ids.
+    """
+    _type = types.String
+    _rt_field_names = ('rt_field',)
+    _is_query_column = False
+
+    def __init__(self, model_attr, related_query=None, ranged=True):
+        super(JoinedText, self).__init__(model_attr)
+        self.related_query = related_query
+        self.ranged = ranged
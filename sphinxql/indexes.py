@@ -1,9 +1,10 @@
 from collections import OrderedDict
-from .configuration import indexes_configurator
+from .configuration import indexes_configurator, connect_delta_signals
 from .exceptions import ImproperlyConfigured
 from .fields import Field
 from .query import SearchQuerySet
 from .manager import IndexManager
+from . import rt, updates
 
 
 class MetaIndex(type):
@@ -47,6 +48,14 @@ class MetaIndex(type):
         # so it is indexed by Sphinx.
         indexes_configurator.register(new_class)
 
+        # keep real-time indexes up to date with the model, if asked.
+        if getattr(meta, 'rt', False) and getattr(meta, 'rt_signals', False):
+            rt.connect_signals(new_class)
+        if getattr(meta, 'update_signals', False):
+            updates.connect_signals(new_class)
+        if getattr(meta, 'delta', False):
+            connect_delta_signals(new_class)
+
         # managers
         has_any_manager = False
         for manager_name in attrs:
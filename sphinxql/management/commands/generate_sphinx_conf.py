@@ -3,6 +3,7 @@ from __future__ import unicode_literals
 import logging
 from django.core.management.base import BaseCommand
 from django.db.utils import InternalError, OperationalError
+from sphinxql import configuration
 from sphinxql.configuration import indexes_configurator
 
 _logger = logging.getLogger(__name__)
@@ -17,11 +18,22 @@ class Command(BaseCommand):
             action='store_true',
             help='',
             default=True)
+        parser.add_argument(
+            '--changed',
+            action='store_true',
+            default=False,
+            help='Reports whether sphinx.conf changed and the indexes whose '
+                 'configuration changed since they were built.')
 
     def handle(self, **options):
         try:
             indexes_configurator.configure()
-            indexes_configurator.output()
+            changed = indexes_configurator.output()
         except (InternalError, OperationalError):
             _logger.warning('Sphinx was not configured: no database found.')
-            pass
+            return
+
+        if options['changed']:
+            self.stdout.write('sphinx.conf %s' % ('changed' if changed else 'unchanged'))
+            for name in configuration.changed_indexes():
+                self.stdout.write('Changed index: %s' % name)
@@ -10,17 +10,70 @@ class Command(BaseCommand):
     help = "Indexes your models."
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            'indexes',
+            nargs='*',
+            help='Names of the indexes to build (default: all).')
         parser.add_argument(
             '--update',
             action='store_true',
             help='',
             default=False)
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=None,
+            help='Number of indexes built in parallel.')
+        parser.add_argument(
+            '--delta',
+            action='store_true',
+            default=False,
+            help='Rebuilds only the delta of the indexes with delta.')
+        parser.add_argument(
+            '--changed-only',
+            action='store_true',
+            default=False,
+            help='Rebuilds only the indexes whose configuration changed since '
+                 'they were built.')
+        parser.add_argument(
+            '--generation',
+            action='store_true',
+            default=False,
+            help='Builds the indexes in a new generation, swapped into searchd '
+                 'once it is valid.')
 
     def handle(self, **options):
         self.stdout.write('Started indexing')
         self.stdout.write('----------------')
 
-        if options['update']:
+        if options['changed_only']:
+            names = configuration.changed_indexes()
+            if options['indexes']:
+                names = [name for name in names if name in options['indexes']]
+            if not names:
+                self.stdout.write('No index changed')
+            elif options['generation']:
+                configuration.build_generation(names, output=self.stdout)
+            else:
+                configuration.index_parallel(names,
+                                             jobs=options['jobs'],
+                                             rotate=options['update'],
+                                             output=self.stdout)
+        elif options['generation']:
+            generations = configuration.build_generation(options['indexes'] or None,
+                                                         output=self.stdout)
+            for name, generation in generations.items():
+                self.stdout.write('%s: generation %d' % (name, generation))
+        elif options['delta']:
+            configuration.index_delta(options['indexes'] or None,
+                                      jobs=options['jobs'],
+                                      output=self.stdout)
+        elif options['indexes'] or options['jobs']:
+            configuration.index_parallel(options['indexes'] or None,
+                                         jobs=options['jobs'],
+                                         rotate=options['update'],
+                                         output=self.stdout)
+        elif options['update']:
             configuration.reindex(output=sys.stdout)
         else:
             configuration.index(output=sys.stdout)
@@ -0,0 +1,25 @@
+from __future__ import unicode_literals
+
+import sys
+from django.core.management.base import BaseCommand
+
+from sphinxql import configuration
+
+
+class Command(BaseCommand):
+    help = "Merges the delta indexes into their main indexes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'indexes',
+            nargs='*',
+            help='Names of the indexes with delta to merge (default: all).')
+
+    def handle(self, **options):
+        self.stdout.write('Started merging')
+        self.stdout.write('---------------')
+
+        configuration.merge_delta(options['indexes'] or None, output=sys.stdout)
+
+        self.stdout.write('----------------')
+        self.stdout.write('Merging finished')
@@ -0,0 +1,46 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sphinxql import rt
+from sphinxql.configuration import indexes_configurator
+
+
+class Command(BaseCommand):
+    help = "Writes all documents of a real-time index from its query."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'index',
+            help='Name of the real-time index (e.g. myapp_documentindex).')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of documents per REPLACE.')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of connections writing to searchd.')
+        parser.add_argument(
+            '--resume-file',
+            default=None,
+            help='File with the last written id, used to resume an '
+                 'interrupted population.')
+
+    def handle(self, **options):
+        index = indexes_configurator.indexes.get(options['index'])
+        if index is None or not getattr(index.Meta, 'rt', False):
+            raise CommandError('"%s" is not a real-time index.' % options['index'])
+
+        self.stdout.write('Started populating')
+        self.stdout.write('------------------')
+
+        written = rt.populate(index, batch_size=options['batch_size'],
+                              workers=options['workers'],
+                              resume_file=options['resume_file'],
+                              output=self.stdout)
+
+        self.stdout.write('-------------------')
+        self.stdout.write('Populating finished: %d documents' % written)
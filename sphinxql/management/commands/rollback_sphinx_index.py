@@ -0,0 +1,20 @@
+from __future__ import unicode_literals
+
+from django.core.management.base import BaseCommand
+
+from sphinxql import configuration
+
+
+class Command(BaseCommand):
+    help = "Swaps indexes built in generations back to their previous generation."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'indexes',
+            nargs='*',
+            help='Names of the indexes to roll back (default: all).')
+
+    def handle(self, **options):
+        generations = configuration.rollback(options['indexes'] or None)
+        for name, generation in generations.items():
+            self.stdout.write('%s: generation %d' % (name, generation))
@@ -15,6 +15,7 @@ class Command(BaseCommand):
 
         p = configuration.start()
         p.wait()
+        configuration.wait_until_ready()
 
         self.stdout.write('----')
         self.stdout.write('Done')
@@ -0,0 +1,49 @@
+from __future__ import unicode_literals
+
+import io
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sphinxql import pipe
+from sphinxql.configuration import indexes_configurator
+
+
+class Command(BaseCommand):
+    help = "Streams the documents of an index with a pipe source (used by indexer)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'index',
+            help='Name of the index (e.g. myapp_documentindex).')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=pipe.DEFAULT_BATCH_SIZE,
+            help='Number of instances read per query.')
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=None,
+            help='Number of processes computing the documents.')
+        parser.add_argument('--shard', type=int, default=None)
+        parser.add_argument('--shards', type=int, default=None)
+        parser.add_argument('--shard-first', type=int, default=None)
+        parser.add_argument('--shard-after-last', type=int, default=None)
+
+    def handle(self, **options):
+        index = indexes_configurator.indexes.get(options['index'])
+        if index is None:
+            raise CommandError('"%s" is not an index.' % options['index'])
+
+        shard = None
+        if options['shards']:
+            shard = (options['shard'], options['shards'])
+            if options['shard_first'] is not None or options['shard_after_last'] is not None:
+                shard += ((options['shard_first'], options['shard_after_last']),)
+
+        # indexer reads UTF-8, whatever the locale of the command.
+        output = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='\n')
+        pipe.stream(index, output, batch_size=options['batch_size'],
+                    shard=shard, processes=options['processes'])
+        output.flush()
@@ -1,6 +1,8 @@
 import inspect
 #from django.utils import six
 
+from . import rt, updates
+
 
 class IndexManager(object):
 
@@ -55,3 +57,24 @@ class IndexManager(object):
         """
         return self._queryset_class(index=self.index, using=self._db,
                                     hints=self._hints)
+
+    def replace(self, instances):
+        """
+        Writes the documents of `instances` (model instances or ids) in this
+        real-time index.
+        """
+        rt.replace(self.index, instances)
+
+    def delete(self, ids):
+        """
+        Deletes the documents `ids` (ids or model instances) from this
+        real-time index.
+        """
+        rt.delete(self.index, ids)
+
+    def update_attributes(self, ids, **values):
+        """
+        Sets the numeric attributes `values` of the documents `ids` (ids or
+        model instances) of this index without reindexing.
+        """
+        updates.update_attributes(self.index, ids, **values)
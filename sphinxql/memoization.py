@@ -0,0 +1,64 @@
+"""
+Memoization of Sphinx results within a request or a ``with memo():`` block.
+
+Contrary to the result cache, memoized results only live until the end of
+the block, so they are never stale across requests.
+"""
+import threading
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+def get_memo():
+    """
+    Returns the dictionary of memoized results of this thread, or None if
+    results are not being memoized.
+    """
+    return getattr(_local, 'results', None)
+
+
+@contextmanager
+def memo():
+    """
+    Memoizes the results of Sphinx queries executed inside the block: identical
+    queries (same SQL and parameters) hit Sphinx once. Nested blocks share the
+    results of the outermost block.
+    """
+    outermost = get_memo() is None
+    if outermost:
+        _local.results = {}
+    try:
+        yield
+    finally:
+        if outermost:
+            _local.results = None
+
+
+def clear_memo():
+    """
+    Forgets the memoized results, e.g. after writing to an index.
+    """
+    if get_memo() is not None:
+        _local.results = {}
+
+
+class MemoMiddleware(object):
+    """
+    Memoizes the results of Sphinx queries during each request.
+    """
+    def __init__(self, get_response=None):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with memo():
+            return self.get_response(request)
+
+    # old-style middleware (``MIDDLEWARE_CLASSES``)
+
+    def process_request(self, request):
+        _local.results = {}
+
+    def process_response(self, request, response):
+        _local.results = None
+        return response
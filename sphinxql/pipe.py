@@ -0,0 +1,197 @@
+"""
+Streams the documents of indexes with ``Meta.source_type = 'pipe'`` to
+``indexer`` in Sphinx ``tsvpipe`` format.
+
+Values are computed in Python, so a field's ``model_attr`` can be a model
+method or property (e.g. rendered markdown), a lookup of related objects, an
+F expression or a callable receiving the instance.
+"""
+from collections import deque
+import multiprocessing
+
+from django.db import connections
+from django.db.models.expressions import Combinable
+
+from .configuration.configurators import Configurator, _special_annotate, \
+    pipe_declarations
+from .fields import JoinedText
+from .rt import _get_multi_values, _get_joined_texts, _to_sphinx
+from .types import MultiInteger, Bool
+
+DEFAULT_BATCH_SIZE = 1000
+
+# prefix of the annotations of fields with an F expression.
+ANNOTATION_PREFIX = 'sphinxql_'
+
+
+def _get_fields(index):
+    """
+    Returns the list of (name, field) of the columns of the pipe, in order.
+    The field of the index id attribute is None.
+    """
+    fields = dict((field.name, field) for field in index.Meta.fields)
+    return [(name, fields.get(name))
+            for names in pipe_declarations(index).values() for name in names]
+
+
+def _get_attribute(instance, model_attr):
+    """
+    Returns the value of the lookup `model_attr` (e.g. ``author__name``) of
+    `instance`, calling methods.
+    """
+    value = instance
+    for attribute in model_attr.split('__'):
+        value = getattr(value, attribute)
+        if callable(value):
+            value = value()
+        if value is None:
+            return None
+    return value
+
+
+def _format(field, value):
+    """
+    Formats a Sphinx `value` of `field` as a cell of a TSV row.
+    """
+    if field is not None and field.type() is MultiInteger:
+        return ','.join('%d' % v for v in value)
+    if isinstance(value, bool) or (field is not None and field.type() is Bool):
+        return '1' if value else '0'
+    if isinstance(value, float):
+        return repr(value)
+    # TSV has no escaping: separators are replaced by spaces.
+    return str(value).replace('\t', ' ').replace('\n', ' ').replace('\r', ' ')
+
+
+def get_query(index, shard=None):
+    """
+    Returns the query of the documents of `index` (or of the shard `shard`,
+    a tuple (shard, shards) or (shard, shards, bounds) of a range shard),
+    ordered by primary key.
+    """
+    query = Configurator._get_indexing_query(index)
+    if shard is not None:
+        query = Configurator._shard_query(index, query, *shard)
+
+    annotation = dict((ANNOTATION_PREFIX + field.name, field.model_attr)
+                      for field in index.Meta.fields
+                      if isinstance(field.model_attr, Combinable))
+    if annotation:
+        query = _special_annotate(query, annotation)
+    return query.order_by('pk')
+
+
+def get_rows(index, instances):
+    """
+    Returns the TSV rows (strings without the line break) of `instances`.
+    """
+    if not instances:
+        return []
+    ids = [instance.pk for instance in instances]
+    columns = _get_fields(index)
+
+    # values not in the model, retrieved per field for all instances.
+    other_values = {}
+    for name, field in columns:
+        if isinstance(field, JoinedText):
+            other_values[name] = _get_joined_texts(index, field, ids)
+        elif field is not None and not field._is_query_column:
+            other_values[name] = _get_multi_values(index, field, ids)
+
+    rows = []
+    for instance in instances:
+        row = ['%d' % instance.pk]
+        for name, field in columns:
+            if field is None:
+                value = int(index.Meta.index_id)
+            elif name in other_values:
+                value = other_values[name][instance.pk]
+            elif isinstance(field.model_attr, Combinable):
+                value = getattr(instance, ANNOTATION_PREFIX + name)
+            elif isinstance(field.model_attr, str):
+                value = _get_attribute(instance, field.model_attr)
+            else:
+                value = field.model_attr(instance)
+            row.append(_format(field, _to_sphinx(field, value)))
+        rows.append('\t'.join(row))
+    return rows
+
+
+def _iterate_pages(query, batch_size):
+    """
+    Yields the pages of `batch_size` instances of `query` (ordered by primary
+    key) using keyset pagination.
+    """
+    last_id = None
+    while True:
+        page = query if last_id is None else query.filter(pk__gt=last_id)
+        instances = list(page[:batch_size])
+        if instances:
+            last_id = instances[-1].pk
+            yield instances
+        if len(instances) < batch_size:
+            break
+
+
+def _iterate_id_ranges(query, batch_size):
+    """
+    Yields the ranges (first id, last id) of pages of `batch_size` ids of
+    `query` using keyset pagination on the ids only.
+    """
+    ids_query = query.values_list('pk', flat=True)
+    last_id = None
+    while True:
+        page = ids_query if last_id is None else ids_query.filter(pk__gt=last_id)
+        ids = list(page[:batch_size])
+        if ids:
+            last_id = ids[-1]
+            yield ids[0], ids[-1]
+        if len(ids) < batch_size:
+            break
+
+
+def _get_range_rows(index_name, shard, first_id, last_id):
+    # runs in a worker process.
+    from .configuration import indexes_configurator
+    index = indexes_configurator.indexes[index_name]
+    query = get_query(index, shard).filter(pk__gte=first_id, pk__lte=last_id)
+    return get_rows(index, list(query))
+
+
+def stream(index, output, batch_size=DEFAULT_BATCH_SIZE, shard=None,
+           processes=None):
+    """
+    Writes the TSV rows of the documents of `index` (or of the shard `shard`,
+    see `get_query`) to `output`.
+
+    Instances are read by pages of `batch_size` ordered by primary key, so
+    the memory used does not depend on the number of documents. If
+    `processes`, the pages are computed by that number of processes, each
+    with a range of ids.
+    """
+    query = get_query(index, shard)
+
+    if not processes or processes < 2:
+        for instances in _iterate_pages(query, batch_size):
+            for row in get_rows(index, instances):
+                output.write(row + '\n')
+        return
+
+    # forked processes must not share the connections of this one.
+    connections.close_all()
+    pool = multiprocessing.get_context('fork').Pool(processes)
+    try:
+        results = deque()
+        for first_id, last_id in _iterate_id_ranges(query, batch_size):
+            results.append(pool.apply_async(
+                _get_range_rows, (index.build_name(), shard, first_id, last_id)))
+            # bound the pages in memory to the ones being computed.
+            while len(results) > 2 * processes:
+                for row in results.popleft().get():
+                    output.write(row + '\n')
+        while results:
+            for row in results.popleft().get():
+                output.write(row + '\n')
+    finally:
+        pool.close()
+        pool.join()
@@ -1,15 +1,23 @@
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 import django.db.models.query
+from django.db import connections
 
+from .cache import get_result_cache
+from .memoization import get_memo
 from .core.query import Query
 from .core import base
 from .core.lookups import LOOKUP_SEPARATOR, parse_lookup
-from sphinxql.exceptions import NotSupportedError
-from .types import Bool
-from .sql import Match, And, Neg, C, Column, All, Count
+from sphinxql.exceptions import NotSupportedError, ImproperlyConfigured
+from .types import Bool, Integer
+from .sql import Match, And, Neg, C, Column, IdColumn, WeightColumn, All, Count
 from sphinxql.configuration import indexes_configurator
+from sphinxql.configuration.configurators import INDEX_ID_ATTRIBUTE
+
+# alias of the select expression used to restrict large sets of ids.
+RESTRICTION_ALIAS = 'sphinxql_restricted'
 
 
 def iterate_over_queryset(query_set, callback, amount=1000):
@@ -42,6 +50,37 @@ def iterate_over_queryset(query_set, callback, amount=1000):
         offset += amount
 
 
+def execute_query(query, with_meta=False):
+    """
+    Hits Sphinx with `query` and returns a tuple (rows, meta), where `meta` is
+    the `SHOW META` of the query if `with_meta` or None otherwise.
+
+    Uses the results memoized by :func:`sphinxql.memo` and the result cache
+    when ``INDEXES['result_cache']`` is set.
+    """
+    def fetch():
+        rows = list(query)
+        meta = query.meta() if with_meta else None
+        return rows, meta
+
+    results = get_memo()
+    if results is not None:
+        key = (query.as_sql(), tuple(query.get_params()))
+        entry = results.get(key)
+        if entry is not None and not (with_meta and entry[1] is None):
+            return entry
+
+    result_cache = get_result_cache()
+    if result_cache is None:
+        entry = fetch()
+    else:
+        entry = result_cache.fetch(query, fetch, with_meta)
+
+    if results is not None:
+        results[key] = entry
+    return entry
+
+
 class SphinxQuerySet(object):
     def __init__(self, index):
         self._index = index
@@ -52,8 +91,12 @@ class SphinxQuerySet(object):
         # This is a global constraint on queries, we keep it here.
         self._match = ''
 
+        # sorted tuple of the ids the documents are restricted to, or None.
+        self._restricted_ids = None
+
         self._result_cache = None
         self._fetch_cache = None
+        self._meta_cache = None
 
         self._set_default_fields(self.query)
 
@@ -63,19 +106,64 @@ class SphinxQuerySet(object):
         Fetches by hitting Sphinx
         """
         if self._fetch_cache is None:
-            self._fetch_cache = list(self._get_query())
+            self._fetch_cache, self._meta_cache = execute_query(self._get_query())
         assert isinstance(self._fetch_cache, list)
         return self._fetch_cache
 
-    def _get_query(self):
+    def meta(self):
+        """
+        Returns a dictionary with the Sphinx `SHOW META` of this query, e.g.
+        `total_found`.
+        """
+        if self._meta_cache is None:
+            self._fetch_cache, self._meta_cache = execute_query(
+                self._get_query(), with_meta=True)
+        return self._meta_cache
+
+    def _get_query(self, count=False):
         """
-        Returns a copy of the query exactly prior to hit db.
+        Returns a copy of the query exactly prior to hit db. If `count`, the
+        query selects the number of matched documents.
         """
         clone = self.query.clone()
+        if count:
+            clone.select.clear()
+            clone.select.append(Count(All()))
         if self._match:
             clone.where = self._add_condition(clone.where, Match(self._match))
+        if self._restricted_ids is not None:
+            self._restrict_query(clone, self._restricted_ids)
         return clone
 
+    def _restrict_query(self, query, ids):
+        """
+        Restricts `query` to the documents whose id is in `ids`.
+
+        Up to `max_filter_values` ids are filtered with `IN` in the WHERE.
+        Sphinx does not support `OR` in the WHERE, so larger sets are split in
+        chunks of `IN()` functions joined with `OR` in a select expression,
+        and the WHERE filters on the expression.
+        """
+        max_values = indexes_configurator.searchd_conf.max_filter_values
+
+        if not ids:
+            # Sphinx does not allow documents with id 0.
+            condition = IdColumn() == 0
+        elif len(ids) <= max_values:
+            condition = base.In(IdColumn(), ids)
+        else:
+            expression = None
+            for offset in range(0, len(ids), max_values):
+                chunk = base.InFunction(IdColumn(), ids[offset:offset + max_values])
+                if expression is None:
+                    expression = chunk
+                else:
+                    expression = base.Or(expression, chunk)
+            query.select.append(expression, RESTRICTION_ALIAS)
+            condition = Column(Bool, RESTRICTION_ALIAS) == 1
+
+        query.where = self._add_condition(query.where, condition)
+
     def _parsed_results(self):
         """
         Hits Sphinx and parses the results into indexes instances.
@@ -128,11 +216,9 @@ class SphinxQuerySet(object):
         return self
 
     def count(self):
-        q = self._get_query()
-        q.select.clear()
-        q.select.append(Count(All()))
+        q = self._get_query(count=True)
 
-        result = list(q)
+        result, _ = execute_query(q)
         if result:
             # first row, second entry (first entry is row's `id`)
             return result[0][1]
@@ -155,6 +241,18 @@ class SphinxQuerySet(object):
 
         return clone
 
+    def restrict_to_ids(self, ids):
+        """
+        Restricts the documents to the ones whose id is in `ids`. Successive
+        calls intersect the restrictions.
+        """
+        clone = self.clone()
+        ids = set(ids)
+        if clone._restricted_ids is not None:
+            ids &= set(clone._restricted_ids)
+        clone._restricted_ids = tuple(sorted(ids))
+        return clone
+
     def search(self, *extended_queries):
         clone = self.clone()
         if clone._match == '':
@@ -216,13 +314,62 @@ class SphinxQuerySet(object):
             where = where | And | condition
         return where
 
+    def _create_cloned_instance(self):
+        return SphinxQuerySet(self._index)
+
     def clone(self):
-        clone = SphinxQuerySet(self._index)
+        clone = self._create_cloned_instance()
         clone._match = self._match
+        clone._restricted_ids = self._restricted_ids
         clone.query = self.query.clone()
         return clone
 
 
+class MultiSphinxQuerySet(SphinxQuerySet):
+    """
+    A `SphinxQuerySet` over several indexes, ordered by Sphinx across all of
+    them. Each index must define `Meta.index_id`, used to identify the index of
+    each result.
+
+    The results are instances of their index with the `id` and the `relevance`
+    of the match; columns are resolved in the first index.
+    """
+    def __init__(self, *indexes):
+        assert indexes
+        self._indexes = indexes
+        self._indexes_by_id = OrderedDict()
+        for index in indexes:
+            if not hasattr(index.Meta, 'index_id'):
+                raise ImproperlyConfigured('Index "%s" must define Meta.index_id '
+                                           'to be searched with other indexes.'
+                                           % index.__name__)
+            if index.Meta.index_id in self._indexes_by_id:
+                raise ImproperlyConfigured('Indexes "%s" and "%s" have the same '
+                                           'Meta.index_id.' % (
+                                               self._indexes_by_id[index.Meta.index_id].__name__,
+                                               index.__name__))
+            self._indexes_by_id[index.Meta.index_id] = index
+
+        super(MultiSphinxQuerySet, self).__init__(indexes[0])
+        for index in indexes[1:]:
+            self.query.fromm.append(index)
+
+    def _set_default_fields(self, query):
+        query.select.clear()
+        query.select.append(Column(Integer, INDEX_ID_ATTRIBUTE))
+        query.select.append(WeightColumn(), 'relevance')
+
+    def _parsed_results(self):
+        for result in self._fetch_raw():
+            instance = self._indexes_by_id[result[1]]()
+            setattr(instance, 'id', result[0])
+            setattr(instance, 'relevance', result[2])
+            yield instance
+
+    def _create_cloned_instance(self):
+        return MultiSphinxQuerySet(*self._indexes)
+
+
 class ResultStrategy(object):
     def __init__(self, search_query_set):
         self._search_query_set = search_query_set
@@ -235,18 +382,32 @@ class ModelResultStrategy(ResultStrategy):
 
     def __init__(self, search_query_set):
         super(ModelResultStrategy, self).__init__(search_query_set)
+        self._query_set = None
 
     def __iter__(self):
-        return self._search_query_set._model_query_set.__iter__()
+        return self._get_query_set().__iter__()
 
     def __len__(self):
-        return self._search_query_set._model_query_set.__len__()
+        return self._get_query_set().__len__()
 
     def __getitem__(self, item):
-        return self._search_query_set._model_query_set.__getitem__(item)
+        return self._get_query_set().__getitem__(item)
 
     def count(self):
-        return self._search_query_set._model_query_set.count()
+        return self._get_query_set().count()
+
+    def _get_query_set(self):
+        """
+        Returns the Django queryset restricted to the ids of
+        :meth:`SearchQuerySet.restrict_to`, if any. Uses `_query_set`.
+        """
+        if self._query_set is None:
+            query_set = self._search_query_set._model_query_set
+            ids = self._search_query_set._sphinx_query_set._restricted_ids
+            if ids is not None:
+                query_set = query_set.filter(pk__in=ids)
+            self._query_set = query_set
+        return self._query_set
 
 
 class SphinxSearchResultStrategy(ResultStrategy):
@@ -367,6 +528,27 @@ class SearchQuerySet(object):
     def search_filter(self, *conditions, clone=None, **lookups):
         clone._sphinx_query_set = self._sphinx_query_set.filter(*conditions, **lookups)
 
+    @clone_query_set
+    def restrict_to(self, queryset, max_ids=None, clone=None):
+        """
+        Restricts the search to the instances of `queryset`.
+
+        The ids of `queryset` are retrieved once, here, and are sent to Sphinx
+        so it ranks and pages within them. If `queryset` has more than
+        `max_ids` instances, the ids are not sent to Sphinx and the results
+        are restricted in Django's query instead.
+        """
+        ids = queryset.values_list('pk', flat=True)
+        if max_ids is not None:
+            ids = ids[:max_ids + 1]
+        ids = list(ids)
+
+        if max_ids is not None and len(ids) > max_ids:
+            clone._model_query_set = self._model_query_set.filter(
+                pk__in=queryset.values('pk'))
+        else:
+            clone._sphinx_query_set = self._sphinx_query_set.restrict_to_ids(ids)
+
     @clone_query_set
     def search(self, *extended_queries, order_by_relevance=True, clone=None):
         clone._sphinx_query_set = clone._sphinx_query_set.search(*extended_queries)
@@ -422,3 +604,116 @@ class SearchQuerySet(object):
 
     def count(self):
         return self._result_strategy.count()
+
+
+class MultiSearchQuerySet(object):
+    """
+    A queryset to search several indexes at once and translate the results
+    into instances of their models, in the order of Sphinx.
+
+    Each model is retrieved with one query; if `parallel`, the queries run in
+    parallel threads.
+    """
+
+    def __init__(self, *indexes, parallel=False):
+        self._indexes = indexes
+        self._parallel = parallel
+        self._sphinx_query_set = MultiSphinxQuerySet(*indexes)
+        self._result_cache = None
+
+    def _clone(self):
+        clone = self.__class__(*self._indexes, parallel=self._parallel)
+        clone._sphinx_query_set = self._sphinx_query_set
+        return clone
+
+    def search(self, *extended_queries, order_by_relevance=True):
+        clone = self._clone()
+        clone._sphinx_query_set = clone._sphinx_query_set.search(*extended_queries)
+        if not clone._sphinx_query_set.query.order_by and order_by_relevance:
+            clone = clone.search_order_by(C('@relevance'))
+        return clone
+
+    def search_filter(self, *conditions, **lookups):
+        clone = self._clone()
+        clone._sphinx_query_set = self._sphinx_query_set.filter(*conditions, **lookups)
+        return clone
+
+    def search_order_by(self, *columns):
+        clone = self._clone()
+        clone._sphinx_query_set = self._sphinx_query_set.order_by(*columns)
+        return clone
+
+    def __iter__(self):
+        return iter(self._get_models())
+
+    def __len__(self):
+        return len(self._get_models())
+
+    def __getitem__(self, item):
+        if self._result_cache is not None:
+            return self._result_cache[item]
+
+        results = self._sphinx_query_set[item]
+        if isinstance(item, slice):
+            return self._fetch_models(results)
+        return self._fetch_models([results])[0]
+
+    def count(self):
+        return self._sphinx_query_set.count()
+
+    def _get_models(self):
+        """
+        Returns all the models, up to `max_matches`. Uses `_result_cache`.
+        """
+        if self._result_cache is None:
+            results = []
+
+            def callback(index_obj):
+                results.append(index_obj)
+                return False
+
+            iterate_over_queryset(self._sphinx_query_set, callback)
+            self._result_cache = self._fetch_models(results)
+        return self._result_cache
+
+    def _fetch_models(self, results):
+        """
+        Returns the models of the Sphinx `results`, in the same order,
+        annotated with `search_result`.
+        """
+        ids = OrderedDict()
+        for result in results:
+            ids.setdefault(result.__class__, []).append(result.id)
+
+        if self._parallel and len(ids) > 1:
+            with ThreadPoolExecutor(max_workers=len(ids)) as executor:
+                futures = [executor.submit(self._fetch_index_models_in_thread, index, ids[index])
+                           for index in ids]
+                models = dict(zip(ids, [future.result() for future in futures]))
+        else:
+            models = {index: self._fetch_index_models(index, ids[index]) for index in ids}
+
+        result_models = []
+        for result in results:
+            # the model may have been deleted after indexing.
+            model = models[result.__class__].get(result.id)
+            if model is not None:
+                model.search_result = result
+                result_models.append(model)
+        return result_models
+
+    @staticmethod
+    def _fetch_index_models(index, ids):
+        """
+        Returns a dictionary id -> model of the models of `index` in `ids`.
+        """
+        return django.db.models.query.QuerySet(index.Meta.model).in_bulk(ids)
+
+    @classmethod
+    def _fetch_index_models_in_thread(cls, index, ids):
+        try:
+            return cls._fetch_index_models(index, ids)
+        finally:
+            # Django opens a connection per thread.
+            for connection in connections.all():
+                connection.close()
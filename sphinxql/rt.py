@@ -0,0 +1,471 @@
+"""
+Writes to real-time indexes, i.e. indexes with ``Meta.rt = True``.
+
+Documents are computed from the database with the same expressions
+(``model_attr``) used to build plain indexes, so a document written here is
+equal to the one ``indexer`` would build.
+"""
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import calendar
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_save, post_delete
+
+from .cache import bump_generation
+from .configuration.configurators import Configurator, _get_annotation, \
+    _special_annotate, _get_multi_valued_relation, _get_joined_relation
+from .configuration.connection import Connection
+from .exceptions import NotSupportedError
+from .fields import JoinedText
+from .memoization import clear_memo
+from .types import String, MultiInteger, Json
+
+logger = logging.getLogger(__name__)
+
+# number of documents per `REPLACE` statement.
+DEFAULT_BATCH_SIZE = 100
+
+# seconds between flushes of the background flusher.
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+
+def _on_commit(callback, using):
+    """
+    Calls `callback` when the current transaction of `using` commits, or
+    immediately when not in a transaction.
+    """
+    if hasattr(transaction, 'on_commit'):
+        transaction.on_commit(callback, using=using)
+    else:
+        # Django 1.8 has no `on_commit`: the ids are written when added, even
+        # if their transaction rolls back.
+        callback()
+
+
+def _check_rt(index):
+    if not getattr(index.Meta, 'rt', False):
+        raise NotSupportedError('"%s" is not a real-time index.' % index.__name__)
+
+
+def _get_ids(instances):
+    """
+    Returns the ids of `instances`, a list of model instances or of ids.
+    """
+    return [getattr(instance, 'pk', instance) for instance in instances]
+
+
+def _to_sphinx(field, value):
+    """
+    Converts the value of a `field` from the database to Sphinx.
+    """
+    if value is None:
+        # Sphinx has no NULL.
+        if field is not None and field.type() is String:
+            return ''
+        if field is not None and field.type() is MultiInteger:
+            return ()
+        if field is not None and field.type() is Json:
+            return '{}'
+        return 0
+    if field is not None and field.type() is Json:
+        return json.dumps(value) if not isinstance(value, str) else value
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return calendar.timegm(value.timetuple())
+    return value
+
+
+def _invalidate(index):
+    # results of the index cached before the write are stale.
+    bump_generation([index.build_name()])
+    clear_memo()
+
+
+def _get_columns(index):
+    """
+    Returns the names of the columns of the documents of `index`, after the id.
+    """
+    return list(_get_annotation(index)) + [
+        field.name for field in index.Meta.fields if not field._is_query_column]
+
+
+def _get_multi_values(index, field, ids):
+    """
+    Returns a dictionary mapping each id of `ids` to the tuple of values of
+    the multi-valued `field`.
+    """
+    through, document_field, value_field = _get_multi_valued_relation(index, field)
+
+    values = dict((id, []) for id in ids)
+    rows = through._default_manager.filter(
+        **{'%s__in' % document_field.attname: ids}).order_by(value_field.attname)\
+        .values_list(document_field.attname, value_field.attname)
+    for id, value in rows:
+        values[id].append(value)
+    return dict((id, tuple(value)) for id, value in values.items())
+
+
+def _get_joined_texts(index, field, ids):
+    """
+    Returns a dictionary mapping each id of `ids` to the text of the joined
+    `field`, the texts of its related rows separated by spaces.
+    """
+    query, document_field, text_lookup = _get_joined_relation(index, field)
+
+    texts = dict((id, []) for id in ids)
+    rows = query.filter(**{'%s__in' % document_field.attname: ids})\
+        .order_by(document_field.attname)\
+        .values_list(document_field.attname, text_lookup)
+    for id, text in rows:
+        if text:
+            texts[id].append(text)
+    return dict((id, ' '.join(text)) for id, text in texts.items())
+
+
+def _get_documents(index, query):
+    """
+    Returns the list of documents ``(id, value, ...)`` of the Django `query`,
+    with one value per column of the index.
+    """
+    annotation = _get_annotation(index)
+    fields = dict((field.name, field) for field in index.Meta.fields)
+
+    query = _special_annotate(query, annotation)
+
+    documents = []
+    for row in query.values_list('pk', *annotation):
+        documents.append((row[0],) + tuple(
+            _to_sphinx(fields.get(name), value)
+            for name, value in zip(annotation, row[1:])))
+
+    # values not in the query, retrieved per field.
+    other_fields = [field for field in index.Meta.fields
+                    if not field._is_query_column]
+    if other_fields and documents:
+        ids = [document[0] for document in documents]
+        other_values = []
+        for field in other_fields:
+            if isinstance(field, JoinedText):
+                other_values.append(_get_joined_texts(index, field, ids))
+            else:
+                other_values.append(_get_multi_values(index, field, ids))
+        documents = [document + tuple(values[document[0]] for values in other_values)
+                     for document in documents]
+    return documents
+
+
+def get_documents(index, ids):
+    """
+    Returns the list of documents ``(id, value, ...)`` of the instances with
+    `ids` in the query of the index, with one value per field of the index.
+    """
+    query = Configurator._get_source_query(index).filter(pk__in=ids)
+    return _get_documents(index, query)
+
+
+def _write(index, documents, connection):
+    """
+    Writes `documents` in the real-time `index` with one ``REPLACE``.
+    """
+    columns = ['id'] + _get_columns(index)
+    values = '(%s)' % ', '.join(['%s'] * len(columns))
+
+    sql = 'REPLACE INTO {0} ({1}) VALUES {2}'.format(
+        index.build_name(),
+        ', '.join('`%s`' % column for column in columns),
+        ', '.join([values] * len(documents)))
+    connection.execute(sql, [value for document in documents
+                             for value in document], [index.build_name()])
+
+
+def replace(index, instances, connection=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Writes the documents of `instances` (model instances or ids) in the
+    real-time `index`, in ``REPLACE`` statements of at most `batch_size`
+    documents. Instances that are no longer in the query of the index are
+    deleted from it.
+    """
+    _check_rt(index)
+    ids = _get_ids(instances)
+    if not ids:
+        return
+    connection = connection or Connection()
+
+    written_ids = set()
+    for offset in range(0, len(ids), batch_size):
+        documents = get_documents(index, ids[offset:offset + batch_size])
+        if documents:
+            _write(index, documents, connection)
+            written_ids.update(document[0] for document in documents)
+
+    missing_ids = set(ids) - written_ids
+    if missing_ids:
+        _delete(index, sorted(missing_ids), connection)
+
+    _invalidate(index)
+
+
+def populate(index, batch_size=1000, workers=4, resume_file=None,
+             output=None):
+    """
+    Writes every document of the query of the real-time `index`.
+
+    Rows are read by pages of `batch_size` ordered by primary key (keyset
+    pagination) and written by `workers` threads, each with its own
+    connection to ``searchd``. The progress is written to `output`. If
+    `resume_file` is given, the last written id is saved in it, so an
+    interrupted population resumes after it; it is removed when the
+    population completes. Returns the number of written documents.
+    """
+    _check_rt(index)
+    query = Configurator._get_indexing_query(index).order_by('pk')
+
+    last_id = None
+    if resume_file is not None and os.path.exists(resume_file):
+        with open(resume_file) as f:
+            content = f.read().strip()
+        if content:
+            last_id = int(content)
+
+    local = threading.local()
+
+    def write(documents):
+        if not hasattr(local, 'connection'):
+            local.connection = Connection()
+        _write(index, documents, local.connection)
+        return len(documents)
+
+    written = 0
+    start = time.time()
+
+    def collect(future, future_last_id):
+        nonlocal written
+        written += future.result()
+        # futures are collected in reading order, so every document before
+        # `future_last_id` is written.
+        if resume_file is not None:
+            with open(resume_file, 'w') as f:
+                f.write('%d' % future_last_id)
+        if output is not None:
+            elapsed = max(time.time() - start, 1e-6)
+            output.write('%d documents written (%.0f docs/sec), last id %d\n' %
+                         (written, written / elapsed, future_last_id))
+
+    futures = deque()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            page = query if last_id is None else query.filter(pk__gt=last_id)
+            documents = _get_documents(index, page[:batch_size])
+            if documents:
+                last_id = documents[-1][0]
+                futures.append((executor.submit(write, documents), last_id))
+
+            # bound the documents in memory to the ones being written.
+            while len(futures) > 2 * workers:
+                collect(*futures.popleft())
+
+            if len(documents) < batch_size:
+                break
+
+        while futures:
+            collect(*futures.popleft())
+
+    # the population is complete: the next one starts from the beginning.
+    if resume_file is not None and os.path.exists(resume_file):
+        os.remove(resume_file)
+
+    _invalidate(index)
+    return written
+
+
+def _delete(index, ids, connection):
+    sql = 'DELETE FROM {0} WHERE id IN ({1})'.format(
+        index.build_name(), ', '.join(['%s'] * len(ids)))
+    connection.execute(sql, list(ids), [index.build_name()])
+
+
+def delete(index, ids, connection=None):
+    """
+    Deletes the documents `ids` (ids or model instances) from the real-time
+    `index`.
+    """
+    _check_rt(index)
+    ids = _get_ids(ids)
+    if not ids:
+        return
+    _delete(index, ids, connection or Connection())
+    _invalidate(index)
+
+
+class WriteBuffer(object):
+    """
+    Collects the ids of the documents to write in real-time indexes and writes
+    them in batches of `batch_size` documents.
+
+    Ids added within a transaction are written when it commits (and discarded
+    if it rolls back, also to a savepoint). If `background`, a thread writes
+    the collected ids every `interval` seconds, or as soon as `batch_size`
+    ids are collected, with repeated ids written once; otherwise they are
+    written on commit.
+    """
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, background=False,
+                 interval=DEFAULT_FLUSH_INTERVAL):
+        self.batch_size = batch_size
+        self.background = background
+        self.interval = interval
+
+        # key (e.g. the index) -> ordered dictionary of the ids committed but
+        # not written yet (to their values, see `_merge`).
+        self._dirty = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._thread = None
+        self._wake_up = threading.Event()
+        self._stopped = threading.Event()
+
+    def add(self, index, ids, using=None):
+        """
+        Marks the documents `ids` of `index` as dirty in the current
+        transaction of the database `using`.
+        """
+        _check_rt(index)
+        self._add(index, OrderedDict((id, None) for id in _get_ids(ids)), using)
+
+    def _add(self, key, items, using):
+        """
+        Adds `items` (id -> value) to the items of `key` when the current
+        transaction of `using` commits.
+        """
+        # each add commits its own items: the callbacks of the adds rolled
+        # back to a savepoint are discarded without affecting the others.
+        _on_commit(lambda: self._commit(OrderedDict([(key, items)])),
+                   using or DEFAULT_DB_ALIAS)
+
+    def _commit(self, pending):
+        size = 0
+        with self._lock:
+            for key, items in pending.items():
+                self._merge(self._dirty.setdefault(key, OrderedDict()), items)
+                size = max(size, len(self._dirty[key]))
+
+        if not self.background:
+            self.flush()
+        elif size >= self.batch_size:
+            self._wake_up.set()
+
+    def flush(self):
+        """
+        Writes all the committed dirty documents.
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, OrderedDict()
+        if not dirty:
+            return
+
+        connection = Connection()
+        items = list(dirty.items())
+        for i, (key, key_items) in enumerate(items):
+            try:
+                self._write(key, key_items, connection)
+            except Exception:
+                # keep the unwritten dirty so a later flush writes them,
+                # under the ones committed since.
+                with self._lock:
+                    for key, key_items in items[i:]:
+                        self._merge(key_items, self._dirty.get(key, {}))
+                        self._dirty[key] = key_items
+                raise
+
+    @staticmethod
+    def _merge(items, new_items):
+        """
+        Merges `new_items` (id -> value), added later, into `items`.
+        """
+        items.update(new_items)
+
+    def _write(self, index, items, connection):
+        replace(index, list(items), connection, self.batch_size)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake_up.wait(self.interval)
+            self._wake_up.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Real-time indexes could not be written.')
+
+    def start(self):
+        """
+        Starts the background flusher.
+        """
+        if self._thread is not None:
+            return
+        self.background = True
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='sphinxql-rt-flusher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops the background flusher and writes the pending documents.
+        """
+        if self._thread is not None:
+            self._stopped.set()
+            self._wake_up.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+_write_buffer = None
+
+
+def get_write_buffer():
+    """
+    Returns the `WriteBuffer` used by ``Meta.rt_signals``, configured by
+    ``INDEXES['rt_write_buffer']``.
+    """
+    global _write_buffer
+
+    if _write_buffer is None:
+        options = dict(settings.INDEXES.get('rt_write_buffer', {}))
+        _write_buffer = WriteBuffer(**options)
+        if _write_buffer.background:
+            _write_buffer.start()
+    return _write_buffer
+
+
+def connect_signals(index):
+    """
+    Keeps the real-time `index` up to date with the saves and deletes of
+    its model, written by the `WriteBuffer` when their transaction commits.
+    """
+    _check_rt(index)
+
+    def on_change(sender, instance, using=None, **kwargs):
+        get_write_buffer().add(index, [instance.pk], using)
+
+    dispatch_uid = 'sphinxql_rt_%s' % index.build_name()
+    post_save.connect(on_change, sender=index.Meta.model, weak=False,
+                      dispatch_uid=dispatch_uid)
+    post_delete.connect(on_change, sender=index.Meta.model, weak=False,
+                        dispatch_uid=dispatch_uid)
+
+
+def disconnect_signals(index):
+    """
+    Stops keeping the real-time `index` up to date with its model.
+    """
+    dispatch_uid = 'sphinxql_rt_%s' % index.build_name()
+    post_save.disconnect(sender=index.Meta.model, dispatch_uid=dispatch_uid)
+    post_delete.disconnect(sender=index.Meta.model, dispatch_uid=dispatch_uid)
@@ -1,5 +1,5 @@
 from .core.base import Match, Neg, Count, All
-from .core.columns import Column, IdColumn, WeightColumn
+from .core.columns import Column, IdColumn, WeightColumn, JsonPathColumn
 
 
 import sphinxql.core.base
@@ -19,11 +19,19 @@ class C(sphinxql.core.base.SQLExpression):
         elif self._value == '@relevance':
             return WeightColumn()
 
+        name, _, path = self._value.partition('.')
         try:
-            return index.__dict__[self._value]
+            column = index.__dict__[name]
         except KeyError:
             raise KeyError('Field "%s" not found in "%s"' %
-                           (self._value, index.__name__))
+                           (name, index.__name__))
+
+        if path:
+            if column.type() is not sphinxql.core.base.Json:
+                raise KeyError('Field "%s" of "%s" is not a JSON field' %
+                               (name, index.__name__))
+            return JsonPathColumn(column, path)
+        return column
 
 
 class _Infix:
@@ -1 +1 @@
-from .core.base import Integer, Float, String, Bool, Date, DateTime
+from .core.base import Integer, Float, String, Bool, Date, DateTime, MultiInteger, Json
@@ -33,9 +33,7 @@ class Searchd:
 
         configuration.index()
         configuration.start(DEVNULL)
-        # Give searchd some time to start up
-        # This is cumbersome, reading the information about start from pipe would be much nicer!
-        sleep(1)
+        configuration.wait_until_ready()
         self.running = True
 
     def stop(self):
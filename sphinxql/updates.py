@@ -0,0 +1,132 @@
+"""
+In-place updates of the numeric attributes of indexes with Sphinx ``UPDATE``,
+which keeps attributes fresh between reindexes without running ``indexer``.
+"""
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models.signals import post_save
+
+from .configuration import indexes_configurator
+from .configuration.connection import Connection
+from .exceptions import NotSupportedError
+from .rt import WriteBuffer, _get_ids, _invalidate, _to_sphinx
+from .types import Integer, Float, Bool, Date, DateTime, MultiInteger
+
+# types of the attributes Sphinx updates in place.
+UPDATABLE_TYPES = (Integer, Float, Bool, Date, DateTime, MultiInteger)
+
+
+def _get_updatable_fields(index):
+    """
+    Returns a dictionary mapping the name of each attribute of `index` that
+    can be updated to its field.
+    """
+    return dict((field.name, field) for field in index.Meta.fields
+                if field.is_attribute and field.type() in UPDATABLE_TYPES)
+
+
+def update_attributes(index, ids, connection=None, **values):
+    """
+    Sets the attributes `values` (attribute name -> value) of the documents
+    `ids` (ids or model instances) of `index`. Only numeric, boolean and date
+    attributes can be updated.
+    """
+    fields = _get_updatable_fields(index)
+    for name in values:
+        if name not in fields:
+            raise NotSupportedError('"%s" is not a numeric attribute of "%s": '
+                                    'it cannot be updated.' % (name, index.__name__))
+    values = dict((name, tuple(value) if isinstance(value, (list, set)) else value)
+                  for name, value in values.items())
+    ids = _get_ids(ids)
+    if not ids or not values:
+        return
+    connection = connection or Connection()
+
+    names = sorted(values)
+    assignments = ', '.join('`%s` = %%s' % name for name in names)
+    params = [_to_sphinx(fields[name], values[name]) for name in names]
+
+    max_values = indexes_configurator.searchd_conf.max_filter_values
+    for offset in range(0, len(ids), max_values):
+        chunk = ids[offset:offset + max_values]
+        sql = 'UPDATE {0} SET {1} WHERE id IN ({2})'.format(
+            index.build_name(), assignments, ', '.join(['%s'] * len(chunk)))
+        connection.execute(sql, params + list(chunk), [index.build_name()])
+
+    _invalidate(index)
+
+
+class AttributesBuffer(WriteBuffer):
+    """
+    A `WriteBuffer` of attribute updates: each document keeps the last value
+    of each attribute, and the documents of an index with the same values are
+    updated with one ``UPDATE``.
+    """
+    def add(self, index, ids, values, using=None):
+        """
+        Sets the attributes `values` of the documents `ids` of `index` when
+        the current transaction of the database `using` commits.
+        """
+        self._add(index, OrderedDict((id, dict(values)) for id in _get_ids(ids)), using)
+
+    @staticmethod
+    def _merge(items, new_items):
+        for id, values in new_items.items():
+            merged = dict(items.get(id, {}))
+            merged.update(values)
+            items[id] = merged
+
+    def _write(self, index, items, connection):
+        # values -> ids with them
+        groups = OrderedDict()
+        for id, values in items.items():
+            key = tuple(sorted((name, tuple(value) if isinstance(value, (list, set)) else value)
+                               for name, value in values.items()))
+            groups.setdefault(key, []).append(id)
+        for values, ids in groups.items():
+            update_attributes(index, ids, connection, **dict(values))
+
+
+_attributes_buffer = None
+
+
+def get_attributes_buffer():
+    """
+    Returns the `AttributesBuffer` used by ``Meta.update_signals``, configured
+    by ``INDEXES['rt_write_buffer']``.
+    """
+    global _attributes_buffer
+
+    if _attributes_buffer is None:
+        options = dict(settings.INDEXES.get('rt_write_buffer', {}))
+        _attributes_buffer = AttributesBuffer(**options)
+        if _attributes_buffer.background:
+            _attributes_buffer.start()
+    return _attributes_buffer
+
+
+def connect_signals(index):
+    """
+    Updates the attributes of `index` on saves of its model that only change
+    model fields indexed as updatable attributes, i.e. saves with
+    ``update_fields``.
+    """
+    # model field -> attribute names
+    attributes = {}
+    for field in _get_updatable_fields(index).values():
+        if isinstance(field.model_attr, str) and field._is_query_column:
+            attributes.setdefault(field.model_attr, []).append(field.name)
+
+    def on_save(sender, instance, update_fields=None, using=None, **kwargs):
+        if not update_fields or not set(update_fields) <= set(attributes):
+            # other fields changed: the document requires a reindex.
+            return
+        values = dict((name, getattr(instance, model_attr))
+                      for model_attr in update_fields
+                      for name in attributes[model_attr])
+        get_attributes_buffer().add(index, [instance.pk], values, using)
+
+    post_save.connect(on_save, sender=index.Meta.model, weak=False,
+                      dispatch_uid='sphinxql_update_%s' % index.build_name())
@@ -2,7 +2,7 @@ from django.db.models import F, CharField, Value
 from django.db.models.functions import Concat
 from sphinxql import indexes, fields
 
-from .models import Document
+from .models import Document, Type
 
 
 class DocumentIndex(indexes.Index):
@@ -36,3 +36,22 @@ class DocumentIndex2(indexes.Index):
     class Meta:
         model = Document
         range_step = 10000
+
+
+class TaggedDocumentIndex(indexes.Index):
+    text = fields.IndexedString(model_attr='text')
+    tags = fields.MultiInteger(model_attr='tags')
+
+    class Meta:
+        model = Document
+
+
+class TypeIndex(indexes.Index):
+    name = fields.IndexedString(model_attr='name')
+    documents = fields.JoinedText(model_attr='document__text')
+    short_documents = fields.JoinedText(
+        model_attr='document__text', ranged=False,
+        related_query=Document.objects.filter(text__startswith='Short'))
+
+    class Meta:
+        model = Type
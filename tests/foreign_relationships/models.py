@@ -11,6 +11,11 @@ class Type(models.Model):
     date = models.DateField()
 
 
+class Tag(models.Model):
+    name = models.CharField(max_length=200)
+
+
 class Document(models.Model):
     text = models.TextField()
     type = models.ForeignKey(Type)
+    tags = models.ManyToManyField(Tag)
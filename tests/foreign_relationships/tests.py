@@ -1,10 +1,10 @@
 import datetime
 from sphinxql.core.base import Date
 
-from sphinxql.query import Query
+from sphinxql.query import Query, SphinxQuerySet
 
-from .indexes import DocumentIndex
-from .models import Document, Type, MainType
+from .indexes import DocumentIndex, TaggedDocumentIndex, TypeIndex
+from .models import Document, Type, MainType, Tag
 
 from tests import SphinxQLTestCase
 
@@ -31,3 +31,60 @@ class IndexTestCase(SphinxQLTestCase):
         self.assertEqual('MainType1', result[0][4])
         self.assertEqual('MainType1 Type1', result[0][5])
         self.assertEqual(self.date, Date.to_python(result[0][6]))
+
+
+class MultiValuedTestCase(SphinxQLTestCase):
+
+    def setUp(self):
+        super(MultiValuedTestCase, self).setUp()
+
+        main_type = MainType.objects.create(name='MainType1')
+        type = Type.objects.create(name='Type1', type=main_type,
+                                   date=datetime.datetime.now().date())
+        self.tags = [Tag.objects.create(name='tag%d' % x) for x in range(3)]
+
+        self.document = Document.objects.create(type=type, text="What a nice text")
+        self.document.tags.add(self.tags[0], self.tags[1])
+        self.other = Document.objects.create(type=type, text="What a nice text")
+        self.other.tags.add(self.tags[1], self.tags[2])
+        self.index()
+
+        self.query = SphinxQuerySet(TaggedDocumentIndex)
+
+    def test_values(self):
+        result = list(self.query.filter(id=self.document.id)[:1])[0]
+        self.assertEqual(result.tags, [self.tags[0].id, self.tags[1].id])
+
+    def test_in(self):
+        self.assertEqual(self.query.filter(tags__in=[self.tags[0].id]).count(), 1)
+        self.assertEqual(self.query.filter(tags__in=[self.tags[1].id]).count(), 2)
+
+    def test_all(self):
+        ids = [self.tags[1].id, self.tags[2].id]
+        results = list(self.query.filter(tags__all=ids)[:10])
+        self.assertEqual([result.id for result in results], [self.other.id])
+
+
+class JoinedTextTestCase(SphinxQLTestCase):
+
+    def setUp(self):
+        super(JoinedTextTestCase, self).setUp()
+
+        main_type = MainType.objects.create(name='MainType1')
+        date = datetime.datetime.now().date()
+        self.type = Type.objects.create(name='Type1', type=main_type, date=date)
+        Type.objects.create(name='Type2', type=main_type, date=date)
+
+        Document.objects.create(type=self.type, text="What a nice text")
+        Document.objects.create(type=self.type, text="Short and sweet")
+        self.index()
+
+        self.query = SphinxQuerySet(TypeIndex)
+
+    def test_search(self):
+        results = list(self.query.search('nice')[:10])
+        self.assertEqual([result.id for result in results], [self.type.id])
+
+        self.assertEqual(self.query.search('sweet').count(), 1)
+        self.assertEqual(self.query.search('@short_documents sweet').count(), 1)
+        self.assertEqual(self.query.search('@short_documents nice').count(), 0)
@@ -23,3 +23,36 @@ class DocumentIndex(indexes.Index):
     class Meta:
         model = Document
         range_step = 100
+
+
+class FilteredDocumentIndex(indexes.Index):
+    my_text = fields.Text(model_attr='text')
+    my_number = fields.Integer(model_attr='number')
+
+    class Meta:
+        model = Document
+        query = Document.objects.filter(number__gte=500)
+        range_step = 'auto'
+        range_rows = 100
+        range_throttle = 0
+
+
+class RtDocumentIndex(indexes.Index):
+    my_summary = fields.IndexedString(model_attr='summary')
+    my_text = fields.Text(model_attr='text')
+
+    my_added_time = fields.DateTime(model_attr='added_time')
+    my_number = fields.Integer(model_attr='number')
+
+    class Meta:
+        model = Document
+        rt = True
+        rt_signals = True
+
+
+class JsonDocumentIndex(indexes.Index):
+    my_text = fields.Text(model_attr='text')
+    properties = fields.Json(model_attr='properties')
+
+    class Meta:
+        model = Document
@@ -17,3 +17,5 @@ class Document(models.Model):
     unicode = models.CharField(max_length=254)
 
     slash = models.CharField(max_length=20)
+
+    properties = models.TextField(default='{}')
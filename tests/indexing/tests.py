@@ -1,10 +1,15 @@
+import os
+import tempfile
+
 from django.utils.timezone import now
 
+from sphinxql import configuration, rt
 from sphinxql.core.base import DateTime, Date, Count, All
-from sphinxql.query import Query
-from sphinxql.sql import Match
+from sphinxql.query import Query, SphinxQuerySet
+from sphinxql.sql import C, Match, In
 
-from .indexes import DocumentIndex
+from .indexes import DocumentIndex, RtDocumentIndex, JsonDocumentIndex, \
+    FilteredDocumentIndex
 from .models import Document
 
 from tests import SphinxQLTestCase
@@ -69,6 +74,13 @@ class IndexTestCase(SphinxQLTestCase):
         self.query.where = Match('@unicode c mara')
         self.assertEqual(len(self.query), 0)
 
+    def test_update_attributes(self):
+        DocumentIndex.objects.update_attributes([self.document], my_number=5, my_bool=False)
+
+        result = list(self.query)[0]
+        self.assertEqual(result[5], 5)
+        self.assertEqual(result[7], 0)
+
     def test_slash(self):
         """
         Issue #6: slashes must be escaped correctly.
@@ -100,3 +112,116 @@ class IndexSeveralTestCase(SphinxQLTestCase):
     def test_range_query(self):
         self.query.select.append(Count(All()))
         self.assertEqual(list(self.query)[0][1], 1000)
+
+    def test_filtered_range_query(self):
+        query = Query()
+        query.fromm.append(FilteredDocumentIndex)
+        query.select.append(Count(All()))
+        self.assertEqual(list(query)[0][1], 500)
+
+    def test_index_parallel(self):
+        Document.objects.create(
+            summary="This is a summary", text="What a nice text",
+            date=now().date(), added_time=now(),
+            number=3, float=2.2, bool=True,
+            unicode='câmara', slash='/summary')
+
+        outputs = configuration.index_parallel(jobs=2, rotate=True)
+        self.assertTrue(DocumentIndex.build_name() in outputs)
+
+        self.query.select.append(Count(All()))
+        self.assertEqual(list(self.query)[0][1], 1001)
+
+
+class RtIndexTestCase(SphinxQLTestCase):
+
+    def setUp(self):
+        super(RtIndexTestCase, self).setUp()
+
+        self.document = Document.objects.create(
+            summary="This is a summary", text="What a nice text",
+            date=now().date(),
+            added_time=now().replace(microsecond=0),
+            number=2, float=2.2, bool=True,
+            unicode='câmara',
+            slash='/summary')
+
+        self.query = SphinxQuerySet(RtDocumentIndex)
+
+    def test_save(self):
+        self.assertEqual(self.query.count(), 1)
+
+        result = list(self.query[:1])[0]
+        self.assertEqual(result.id, self.document.id)
+        self.assertEqual(result.my_summary, 'This is a summary')
+        self.assertEqual(result.my_added_time, self.document.added_time)
+        self.assertEqual(result.my_number, 2)
+
+        self.assertEqual(self.query.search('nice').count(), 1)
+
+        self.document.text = 'What a short text'
+        self.document.save()
+        self.assertEqual(self.query.search('nice').count(), 0)
+        self.assertEqual(self.query.search('short').count(), 1)
+
+    def test_delete(self):
+        self.document.delete()
+        self.assertEqual(self.query.count(), 0)
+
+    def test_replace(self):
+        RtDocumentIndex.objects.delete([self.document.id])
+        self.assertEqual(self.query.count(), 0)
+
+        RtDocumentIndex.objects.replace(Document.objects.all())
+        self.assertEqual(self.query.count(), 1)
+
+    def test_populate(self):
+        for x in range(4):
+            Document.objects.create(
+                summary="This is a summary", text="What a nice text",
+                date=now().date(), added_time=now(),
+                number=x, float=2.2, bool=True,
+                unicode='câmara', slash='/summary')
+        ids = list(Document.objects.values_list('pk', flat=True).order_by('pk'))
+        RtDocumentIndex.objects.delete(ids)
+        self.assertEqual(self.query.count(), 0)
+
+        # resumes after the 2nd document.
+        resume_file = os.path.join(tempfile.mkdtemp(), 'resume')
+        with open(resume_file, 'w') as f:
+            f.write('%d' % ids[1])
+
+        written = rt.populate(RtDocumentIndex, batch_size=2, workers=2,
+                              resume_file=resume_file)
+        self.assertEqual(written, 3)
+        self.assertEqual(self.query.count(), 3)
+        self.assertFalse(os.path.exists(resume_file))
+
+        self.assertEqual(rt.populate(RtDocumentIndex, batch_size=2), 5)
+        self.assertEqual(self.query.count(), 5)
+
+
+class JsonIndexTestCase(SphinxQLTestCase):
+
+    def setUp(self):
+        super(JsonIndexTestCase, self).setUp()
+
+        for color, size in (('red', 1), ('blue', 2), ('red', 3)):
+            Document.objects.create(
+                summary="This is a summary", text="What a nice text",
+                date=now().date(), added_time=now(),
+                number=size, float=2.2, bool=True,
+                unicode='câmara', slash='/summary',
+                properties='{"color": "%s", "size": %d}' % (color, size))
+        self.index()
+
+        self.query = SphinxQuerySet(JsonDocumentIndex)
+
+    def test_decode(self):
+        result = list(self.query.order_by(C('properties.size'))[:1])[0]
+        self.assertEqual(result.properties, {'color': 'red', 'size': 1})
+
+    def test_filter(self):
+        self.assertEqual(self.query.filter(C('properties.color') == 'red').count(), 2)
+        self.assertEqual(self.query.filter(C('properties.size') > 1).count(), 2)
+        self.assertEqual(self.query.filter(C('properties.size') |In| (1, 2)).count(), 2)
@@ -12,6 +12,7 @@ class AuthorIndex(indexes.Index):
     class Meta:
         model = Author
         query = Author.objects.all()
+        index_id = 1
 
 
 class Author2Index(indexes.Index):
@@ -20,3 +21,32 @@ class Author2Index(indexes.Index):
     class Meta:
         model = Author
         query = Author.objects.all()
+
+
+class ShardedAuthorIndex(indexes.Index):
+    first_name = fields.IndexedString(model_attr='first_name')
+    number = fields.Integer(model_attr='number')
+
+    class Meta:
+        model = Author
+        shards = 3
+
+
+class RangeShardedAuthorIndex(indexes.Index):
+    first_name = fields.IndexedString(model_attr='first_name')
+    number = fields.Integer(model_attr='number')
+
+    class Meta:
+        model = Author
+        shards = 2
+        shard_by = 'range'
+
+
+class DeltaAuthorIndex(indexes.Index):
+    first_name = fields.IndexedString(model_attr='first_name')
+    number = fields.Integer(model_attr='number')
+
+    class Meta:
+        model = Author
+        delta = True
+        delta_field = 'time'
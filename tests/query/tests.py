@@ -1,10 +1,14 @@
 import datetime
 
+from sphinxql import configuration
+from sphinxql.configuration import indexes_configurator
 from sphinxql.core.query import Query
-from sphinxql.sql import Match
+from sphinxql.query import SphinxQuerySet
+from sphinxql.sql import Match, C
 from sphinxql.types import String
 
-from .indexes import AuthorIndex, Author2Index
+from .indexes import AuthorIndex, Author2Index, ShardedAuthorIndex, \
+    RangeShardedAuthorIndex, DeltaAuthorIndex
 from .models import Author
 
 from tests import SphinxQLTestCase
@@ -101,3 +105,92 @@ class QueryTestCase(SphinxQLTestCase):
     def test_match(self):
         self.query.where = Match("foo")
         self.assertEqual(len(self.query), 1)
+
+
+class ShardedIndexTestCase(SphinxQLTestCase):
+
+    def setUp(self):
+        super(ShardedIndexTestCase, self).setUp()
+
+        for x in range(1, 11):
+            Author.objects.create(first_name='foo', last_name='bar', number=x,
+                                  time=datetime.datetime(2014, 2, 2, 12, 12, 12))
+        self.index()
+
+    def test_configuration(self):
+        names = [conf.name for conf in
+                 indexes_configurator.index_blocks[ShardedAuthorIndex.build_name()]]
+        self.assertEqual(names, ['query_shardedauthorindex_shard0',
+                                 'query_shardedauthorindex_shard1',
+                                 'query_shardedauthorindex_shard2',
+                                 'query_shardedauthorindex_shard0',
+                                 'query_shardedauthorindex_shard1',
+                                 'query_shardedauthorindex_shard2',
+                                 'query_shardedauthorindex'])
+        self.assertEqual(indexes_configurator.searchd_conf.params['dist_threads'], 3)
+
+    def test_query(self):
+        for index in (ShardedAuthorIndex, RangeShardedAuthorIndex):
+            query = SphinxQuerySet(index)
+            self.assertEqual(query.count(), 10)
+            self.assertEqual(query.search('foo').count(), 10)
+
+            numbers = [result.number for result in query.order_by(-C('number'))[:10]]
+            self.assertEqual(numbers, list(range(10, 0, -1)))
+
+
+class DeltaIndexTestCase(SphinxQLTestCase):
+
+    def setUp(self):
+        super(DeltaIndexTestCase, self).setUp()
+
+        for x in range(1, 6):
+            Author.objects.create(first_name='foo', last_name='bar', number=x,
+                                  time=datetime.datetime(2014, 2, 2, 12, 12, 12))
+        self.index()
+
+    def test_configuration(self):
+        names = [conf.name for conf in
+                 indexes_configurator.index_blocks[DeltaAuthorIndex.build_name()]]
+        self.assertEqual(names, ['query_deltaauthorindex_main',
+                                 'query_deltaauthorindex_delta',
+                                 'query_deltaauthorindex_main',
+                                 'query_deltaauthorindex_delta',
+                                 'query_deltaauthorindex'])
+
+        delta_source = indexes_configurator.index_blocks[DeltaAuthorIndex.build_name()][1]
+        self.assertEqual(delta_source.parent, 'query_deltaauthorindex_main')
+        self.assertIn('sql_query_killlist', delta_source.params)
+
+    def test_delta(self):
+        query = SphinxQuerySet(DeltaAuthorIndex)
+
+        Author.objects.create(first_name='foo', last_name='bar', number=6,
+                              time=datetime.datetime(2014, 2, 2, 12, 12, 12))
+        author = Author.objects.get(number=1)
+        author.first_name = 'baz'
+        author.time = datetime.datetime(2015, 2, 2, 12, 12, 12)
+        author.save()
+
+        configuration.index_delta()
+        self.assertEqual(query.count(), 6)
+        self.assertEqual(query.search('foo').count(), 5)
+        self.assertEqual(query.search('baz').count(), 1)
+
+        configuration.merge_delta()
+        self.assertEqual(query.count(), 6)
+        self.assertEqual(query.search('baz').count(), 1)
+
+        # after the merge, the delta is empty.
+        configuration.index_delta()
+        self.assertEqual(query.count(), 6)
+
+    def test_deleted(self):
+        query = SphinxQuerySet(DeltaAuthorIndex)
+
+        Author.objects.get(number=1).delete()
+        configuration.index_delta()
+        self.assertEqual(query.count(), 4)
+
+        configuration.merge_delta()
+        self.assertEqual(query.count(), 4)
@@ -24,3 +24,4 @@ class DocumentIndex(indexes.Index):
 
     class Meta:
         model = Document
+        index_id = 2
@@ -2,11 +2,15 @@ import datetime
 
 from django.db.models import Sum
 
-from sphinxql.query import SearchQuerySet
+from sphinxql.configuration import indexes_configurator
+from sphinxql.exceptions import ImproperlyConfigured
+from sphinxql.query import SearchQuerySet, MultiSearchQuerySet, RESTRICTION_ALIAS
 from sphinxql.sql import C
 
 from .indexes import DocumentIndex
 from .models import Document
+from tests.query.indexes import AuthorIndex, Author2Index
+from tests.query.models import Author
 
 from tests import SphinxQLTestCase
 
@@ -139,6 +143,81 @@ class SearchQuerySetTestCase(SphinxQLTestCase):
 
         self.assertEqual(DocumentIndex.other_objects.count(), 3)
 
+    def test_restrict_to(self):
+        subset = Document.objects.filter(number__lte=20)
+
+        q = self.query.restrict_to(subset)
+        self.assertEqual(len(q), 10)
+
+        q = q.search('@text What')
+        self.assertEqual(len(q), 10)
+        self.assertEqual(q[0].number, 20)
+        self.assertTrue('IN' in q._sphinx_query_set._get_query().as_sql())
+
+        q = q.restrict_to(Document.objects.filter(number__gte=10))
+        self.assertEqual(len(q), 6)
+
+    def test_restrict_to_empty(self):
+        q = self.query.search('@text What').restrict_to(Document.objects.none())
+        self.assertEqual(len(q), 0)
+
+    def test_restrict_to_max_ids(self):
+        subset = Document.objects.filter(number__lte=20)
+
+        q = self.query.search('@text What').restrict_to(subset, max_ids=5)
+        # the restriction is applied by Django
+        self.assertEqual(q._sphinx_query_set._restricted_ids, None)
+        self.assertEqual(len(q), 10)
+        self.assertEqual(q[0].number, 20)
+
+
+class MultiSearchQuerySetTestCase(SphinxQLTestCase):
+    def setUp(self):
+        super(MultiSearchQuerySetTestCase, self).setUp()
+
+        for x in range(1, 11):
+            Document.objects.create(
+                summary="This is a summary", text="What a nice text. " * x,
+                date=datetime.date(2015, 2, 2),
+                added_time=datetime.datetime(2015, 4, 4, 12, 12, 12),
+                number=x)
+            # ids must be unique across indexes searched together
+            Author.objects.create(id=1000 + x, first_name='What', last_name='Nice',
+                                  number=x, time=datetime.datetime(2015, 4, 4, 12, 12, 12))
+
+        self.index()
+
+        self.query = MultiSearchQuerySet(DocumentIndex, AuthorIndex)
+
+    def test_search(self):
+        q = self.query.search('What')
+        self.assertEqual(len(q), 20)
+        self.assertEqual(q.count(), 20)
+
+        models = list(q)
+        self.assertEqual(len([m for m in models if isinstance(m, Document)]), 10)
+        self.assertEqual(len([m for m in models if isinstance(m, Author)]), 10)
+
+        for model in models:
+            self.assertEqual(model.search_result.id, model.id)
+
+        # the order of Sphinx is kept
+        relevances = [model.search_result.relevance for model in models]
+        self.assertEqual(relevances, sorted(relevances, reverse=True))
+
+    def test_slice(self):
+        q = self.query.search('What')
+        self.assertEqual(len(q[0:5]), 5)
+        self.assertEqual(q[0].id, list(q)[0].id)
+
+    def test_parallel(self):
+        q = MultiSearchQuerySet(DocumentIndex, AuthorIndex, parallel=True).search('What')
+        self.assertEqual(len(list(q)), 20)
+
+    def test_index_id_required(self):
+        with self.assertRaises(ImproperlyConfigured):
+            MultiSearchQuerySet(DocumentIndex, Author2Index)
+
 
 class HighNumberSearchQuerySetTestCase(SphinxQLTestCase):
     """
@@ -176,3 +255,16 @@ class HighNumberSearchQuerySetTestCase(SphinxQLTestCase):
         query = query.search_order_by(-C('@id'))
         self.assertEqual(len(query.search('@text nice')), 910)
         self.assertEqual(query.search('nice').count(), 910)
+
+    def test_restrict_to_chunks(self):
+        searchd_conf = indexes_configurator.searchd_conf
+        max_filter_values = searchd_conf.max_filter_values
+        searchd_conf.max_filter_values = 100
+        try:
+            q = self.query.search('nice').restrict_to(
+                Document.objects.filter(number__lte=250))
+            self.assertTrue(RESTRICTION_ALIAS in q._sphinx_query_set._get_query().as_sql())
+            self.assertEqual(len(q), 250)
+            self.assertEqual(q.count(), 250)
+        finally:
+            searchd_conf.max_filter_values = max_filter_values
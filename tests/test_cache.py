@@ -0,0 +1,130 @@
+import threading
+import time
+from unittest import TestCase, mock
+
+from django.core.cache import caches
+
+from sphinxql import cache
+from sphinxql.cache import ResultCache
+
+
+class MockFromStatement:
+
+    def __init__(self, names):
+        self._names = names
+
+    def names(self):
+        return self._names
+
+
+class MockQuery:
+
+    def __init__(self, sql, params=(), names=('test',)):
+        self.sql = sql
+        self.params = list(params)
+        self.fromm = MockFromStatement(list(names))
+
+    def as_sql(self):
+        return self.sql
+
+    def get_params(self):
+        return self.params
+
+
+class ResultCacheTestCase(TestCase):
+
+    def setUp(self):
+        caches['default'].clear()
+        self.cache = ResultCache(key_prefix='test')
+        self.calls = 0
+
+    def fetch(self, with_meta=False):
+        def fetch():
+            self.calls += 1
+            return [(1, 'a')], {'total_found': '1'} if with_meta else None
+        return fetch
+
+    def test_cached(self):
+        query = MockQuery('SELECT * FROM test WHERE MATCH(%s)', ['a'])
+
+        self.assertEqual(self.cache.fetch(query, self.fetch()), ([(1, 'a')], None))
+        self.assertEqual(self.cache.fetch(query, self.fetch()), ([(1, 'a')], None))
+        self.assertEqual(self.calls, 1)
+
+        # different parameters are a different query.
+        self.cache.fetch(MockQuery('SELECT * FROM test WHERE MATCH(%s)', ['b']), self.fetch())
+        self.assertEqual(self.calls, 2)
+
+    def test_meta(self):
+        query = MockQuery('SELECT * FROM test')
+
+        self.cache.fetch(query, self.fetch())
+        rows, meta = self.cache.fetch(query, self.fetch(True), with_meta=True)
+        self.assertEqual(meta, {'total_found': '1'})
+        self.assertEqual(self.calls, 2)
+
+        # results with meta also serve queries without it.
+        self.cache.fetch(query, self.fetch())
+        self.assertEqual(self.calls, 2)
+
+    def test_bump_generation(self):
+        query = MockQuery('SELECT * FROM test')
+        other_query = MockQuery('SELECT * FROM other', names=['other'])
+
+        self.cache.fetch(query, self.fetch())
+        self.cache.fetch(other_query, self.fetch())
+        self.assertEqual(self.calls, 2)
+
+        self.cache.bump_generation(['test'])
+        self.cache.fetch(query, self.fetch())
+        self.cache.fetch(other_query, self.fetch())
+        self.assertEqual(self.calls, 3)
+
+        # bumps all indexes
+        self.cache.bump_generation()
+        self.cache.fetch(query, self.fetch())
+        self.cache.fetch(other_query, self.fetch())
+        self.assertEqual(self.calls, 5)
+
+    def test_single_flight(self):
+        query = MockQuery('SELECT * FROM test')
+
+        def slow_fetch():
+            time.sleep(0.1)
+            self.calls += 1
+            return [(1, 'a')], None
+
+        threads = [threading.Thread(target=self.cache.fetch, args=(query, slow_fetch))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+
+    @mock.patch.object(cache, 'LOCKS_NUM', 1)
+    def test_wait_other_process(self):
+        result_cache = ResultCache(key_prefix='test', lock_timeout=5)
+        query = MockQuery('SELECT * FROM test')
+        other_query = MockQuery('SELECT * FROM other', names=['other'])
+        key = result_cache.make_key(query)
+        # another process is fetching `query`
+        caches['default'].add('%s:lock' % key, 1, 5)
+
+        results = []
+        thread = threading.Thread(target=lambda: results.append(
+            result_cache.fetch(query, self.fetch())))
+        thread.start()
+        time.sleep(0.05)
+
+        # a key of the same lock is fetched while `query` waits
+        start = time.time()
+        result_cache.fetch(other_query, self.fetch())
+        self.assertLess(time.time() - start, 1)
+        self.assertEqual(self.calls, 1)
+
+        caches['default'].set(key, ([(2, 'b')], None))
+        thread.join()
+        self.assertEqual(results, [([(2, 'b')], None)])
+        self.assertEqual(self.calls, 1)
@@ -1,10 +1,17 @@
 from collections import OrderedDict
-from unittest import TestCase
-from sphinxql import indexes
+from unittest import TestCase, mock
 
-from sphinxql.configuration.configurations import IndexConfiguration
-from sphinxql.configuration.configurators import add_source_conf_param
-from sphinxql.exceptions import ImproperlyConfigured
+from django.conf import settings
+from django.db.models.signals import post_delete
+
+from sphinxql import indexes, fields
+
+from sphinxql.configuration.configurations import IndexConfiguration, \
+    DistributedIndexConfiguration, SourceConfiguration
+from sphinxql import configuration
+from sphinxql.configuration import configurators
+from sphinxql.configuration.configurators import add_source_conf_param, Configurator
+from sphinxql.exceptions import ImproperlyConfigured, SphinxError
 
 
 class ConfiguratorTestCase(TestCase):
@@ -35,6 +42,37 @@ class ConfiguratorTestCase(TestCase):
 
         self.assertEqual(index_configurator.format_output(), expected)
 
+    def test_distributed_format(self):
+        index_configurator = DistributedIndexConfiguration(
+            'test', OrderedDict([('type', 'distributed'),
+                                 ('local', ['test_shard0', 'test_shard1']),
+                                 ('agent', ['box:9312:test_shard2'])]))
+
+        expected = "index test \n{\n" \
+                   "    type = distributed\n" \
+                   "    local = test_shard0\n" \
+                   "    local = test_shard1\n" \
+                   "    agent = box:9312:test_shard2\n" \
+                   "}\n"
+
+        self.assertEqual(index_configurator.format_output(), expected)
+
+    def test_parent_format(self):
+        source_configurator = SourceConfiguration('test_delta',
+                                                  OrderedDict([('sql_query', 'SELECT 1')]),
+                                                  parent='test_main')
+
+        expected = "source test_delta : test_main\n{\n    sql_query = SELECT 1\n}\n"
+
+        self.assertEqual(source_configurator.format_output(), expected)
+
+    def test_add_to_tuple(self):
+        source_conf = {'sql_query_pre': ('SET NAMES utf8',)}
+        add_source_conf_param(source_conf, 'sql_query_pre', 'SET SESSION query_cache_type=OFF')
+
+        self.assertEqual(source_conf['sql_query_pre'],
+                         ['SET NAMES utf8', 'SET SESSION query_cache_type=OFF'])
+
     def test_wrong_parameter(self):
         self.assertRaises(ImproperlyConfigured,
                           IndexConfiguration, 'test', {'source': 'test1',
@@ -69,3 +107,225 @@ class ConfiguratorTestCase(TestCase):
             class Index(indexes.Index):
                 class Meta:
                     model = OrderedDict
+
+
+class IndexerNamesTestCase(TestCase):
+    def setUp(self):
+        self.configurator = Configurator()
+        self.configurator.index_blocks['app_index'] = [
+            IndexConfiguration('app_index', {'source': 'app_index', 'path': 'p'})]
+        self.configurator.index_blocks['app_sharded'] = [
+            IndexConfiguration('app_sharded_shard0', {'source': 's0', 'path': 'p0'}),
+            IndexConfiguration('app_sharded_shard1', {'source': 's1', 'path': 'p1'}),
+            DistributedIndexConfiguration('app_sharded', {
+                'type': 'distributed', 'local': ['app_sharded_shard0', 'app_sharded_shard1']})]
+
+    def test_all(self):
+        self.assertEqual(self.configurator.get_indexer_names(),
+                         ['app_index', 'app_sharded_shard0', 'app_sharded_shard1'])
+
+    def test_names(self):
+        self.assertEqual(self.configurator.get_indexer_names(['app_sharded']),
+                         ['app_sharded_shard0', 'app_sharded_shard1'])
+        self.assertEqual(self.configurator.get_indexer_names(['app_sharded_shard1', 'app_index']),
+                         ['app_sharded_shard1', 'app_index'])
+
+    def test_unknown(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.configurator.get_indexer_names(['unknown'])
+
+
+class RtIndexTestCase(TestCase):
+    def setUp(self):
+        text = fields.Text('text')
+        text._value = 'text'
+        title = fields.IndexedString('title')
+        title._value = 'title'
+        number = fields.Integer('number')
+        number._value = 'number'
+
+        class Index(object):
+            class Meta:
+                fields = [text, title, number]
+                rt = True
+                index_id = 3
+
+            @classmethod
+            def build_name(cls):
+                return 'app_index'
+
+        self.index = Index
+
+    def test_rt_index(self):
+        index_conf = Configurator._configure_rt_index(self.index)
+
+        self.assertEqual(index_conf.name, 'app_index')
+        self.assertEqual(index_conf.params['type'], 'rt')
+        self.assertEqual(index_conf.params['rt_field'], ['text', 'title'])
+        self.assertEqual(index_conf.params['rt_attr_string'], ['title'])
+        self.assertEqual(index_conf.params['rt_attr_bigint'], ['number'])
+        self.assertEqual(index_conf.params['rt_attr_uint'], ['sphinxql_index_id'])
+        self.assertNotIn('source', index_conf.params)
+
+    def test_rt_blocks(self):
+        sources_confs, indexes_confs = Configurator()._configure_index_blocks(self.index)
+        self.assertEqual(sources_confs, [])
+        self.assertEqual([conf.name for conf in indexes_confs], ['app_index'])
+
+        self.index.Meta.shards = 2
+        with self.assertRaises(ImproperlyConfigured):
+            Configurator()._configure_index_blocks(self.index)
+
+
+class ShardEndpointsTestCase(TestCase):
+    def setUp(self):
+        class Index(object):
+            class Meta:
+                shard_endpoints = ['node0:9306', 'node1:9306', 'node2:9306']
+
+        self.index = Index
+
+    def test_shard_node(self):
+        with mock.patch.dict(settings.INDEXES, {'shard_node': 1}):
+            self.assertEqual(Configurator._get_shard_node(self.index), (1, 3))
+        with mock.patch.dict(settings.INDEXES, {'shard_node': 3}):
+            with self.assertRaises(ImproperlyConfigured):
+                Configurator._get_shard_node(self.index)
+
+        # without a node, the index has all rows
+        self.assertIsNone(Configurator._get_shard_node(self.index))
+
+    def test_not_sharded(self):
+        self.index.Meta.shards = 2
+        with self.assertRaises(ImproperlyConfigured):
+            Configurator()._configure_index_blocks(self.index)
+
+
+class MockQuery(object):
+
+    def __init__(self, min_id, max_id, count):
+        self.bounds = {'min': min_id, 'max': max_id}
+        self._count = count
+
+    def aggregate(self, **kwargs):
+        return self.bounds
+
+    def count(self):
+        return self._count
+
+
+class AutoRangeStepTestCase(TestCase):
+    def setUp(self):
+        class Index(object):
+            class Meta:
+                range_step = 'auto'
+                range_rows = 100
+
+        self.index = Index
+
+    def test_dense(self):
+        with mock.patch.object(configurators, '_table_rows', return_value=None):
+            step = configurators._auto_range_step(self.index, MockQuery(1, 1000, 1000))
+        self.assertEqual(step, 100)
+
+    def test_sparse(self):
+        # ids spread over 10 times the rows need 10 times the step.
+        with mock.patch.object(configurators, '_table_rows', return_value=1000):
+            step = configurators._auto_range_step(self.index, MockQuery(1, 10000, 0))
+        self.assertEqual(step, 1000)
+
+    def test_empty(self):
+        step = configurators._auto_range_step(self.index, MockQuery(None, None, 0))
+        self.assertEqual(step, 100)
+
+
+class ReplicaLagTestCase(TestCase):
+    def setUp(self):
+        class Index(object):
+            class Meta:
+                index_using = 'replica'
+                max_replica_lag = 10
+
+            @classmethod
+            def build_name(cls):
+                return 'app_index'
+
+        self.index = Index
+
+    def test_lag(self):
+        with mock.patch.object(configurators, 'replica_lag', return_value=5) as lag:
+            configurators.check_replica_lag(self.index)
+        lag.assert_called_once_with('replica')
+
+        with mock.patch.object(configurators, 'replica_lag', return_value=20):
+            with self.assertRaises(SphinxError):
+                configurators.check_replica_lag(self.index)
+
+    def test_stopped(self):
+        with mock.patch.object(configurators, 'replica_lag', return_value=None):
+            with self.assertRaises(SphinxError):
+                configurators.check_replica_lag(self.index)
+
+    def test_delta(self):
+        self.index.Meta.delta = True
+        with mock.patch.object(Configurator, '_get_source_query',
+                               return_value=mock.Mock(db='default')):
+            with self.assertRaises(ImproperlyConfigured):
+                Configurator()._configure_index_blocks(self.index)
+
+    @mock.patch.object(configurators, 'connections')
+    def test_postgresql_version(self, connections):
+        connection = connections.__getitem__.return_value
+        connection.vendor = 'postgresql'
+        cursor = connection.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = (3,)
+
+        for version, function in [(90600, 'pg_last_xlog_receive_location()'),
+                                  (100000, 'pg_last_wal_receive_lsn()')]:
+            connection.pg_version = version
+            self.assertEqual(configurators.replica_lag('replica'), 3)
+            self.assertIn(function, cursor.execute.call_args[0][0])
+
+    def test_no_replica(self):
+        del self.index.Meta.index_using
+        with mock.patch.object(configurators, 'replica_lag') as lag:
+            configurators.check_replica_lag(self.index)
+        self.assertFalse(lag.called)
+
+
+class DeltaSignalsTestCase(TestCase):
+    def setUp(self):
+        class Model(object):
+            pass
+
+        class Index(object):
+            class Meta:
+                model = Model
+
+            @classmethod
+            def build_name(cls):
+                return 'app_index'
+
+        self.index = Index
+
+    @mock.patch('sphinxql.configuration.connections')
+    def test_deleted(self, connections):
+        connection = connections.__getitem__.return_value
+        connection.introspection.table_names.return_value = []
+        cursor = connection.cursor.return_value.__enter__.return_value
+
+        configuration.connect_delta_signals(self.index)
+        instance = self.index.Meta.model()
+        instance.pk = 1
+
+        # without the table of the main index, deletes are not recorded
+        post_delete.send(sender=self.index.Meta.model, instance=instance)
+        self.assertFalse(cursor.execute.called)
+
+        # the table is looked up until it exists
+        connection.introspection.table_names.return_value = [configurators.DELTA_DELETED_TABLE]
+        post_delete.send(sender=self.index.Meta.model, instance=instance)
+        post_delete.send(sender=self.index.Meta.model, instance=instance)
+        self.assertEqual(connection.introspection.table_names.call_count, 2)
+        self.assertEqual(cursor.execute.call_args_list,
+                         [mock.call(configurators.delta_deleted_query(self.index), [1])] * 2)
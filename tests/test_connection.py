@@ -0,0 +1,61 @@
+import threading
+from unittest import TestCase, mock
+
+import MySQLdb
+
+from sphinxql.configuration import connection
+from sphinxql.configuration.connection import Connection
+
+
+@mock.patch.object(connection.MySQLdb, 'connect', side_effect=lambda **kwargs: mock.MagicMock())
+class ConnectionTestCase(TestCase):
+
+    def setUp(self):
+        connection._reset_connections()
+
+    def tearDown(self):
+        connection._reset_connections()
+
+    def test_thread(self, connect):
+        one = Connection('localhost', 9306)
+        other = Connection('localhost', 9306)
+        self.assertIs(one._get_db(), other._get_db())
+        self.assertEqual(connect.call_count, 1)
+
+        dbs = []
+        thread = threading.Thread(target=lambda: dbs.append(one._get_db()))
+        thread.start()
+        thread.join()
+        self.assertIsNot(dbs[0], one._get_db())
+
+    def test_fork(self, connect):
+        db = Connection('localhost', 9306)._get_db()
+
+        # what happens in the child of a fork
+        connection._reset_connections()
+        self.assertIsNot(Connection('localhost', 9306)._get_db(), db)
+        # the socket of the parent is not closed.
+        self.assertFalse(db.close.called)
+
+    def test_pid(self, connect):
+        db = Connection('localhost', 9306)._get_db()
+        with mock.patch.object(connection.os, 'getpid', return_value=-1):
+            self.assertIsNot(Connection('localhost', 9306)._get_db(), db)
+
+    def test_reconnect(self, connect):
+        db = Connection('localhost', 9306)._get_db()
+        db.cursor.return_value.execute.side_effect = \
+            MySQLdb.OperationalError(2006, 'MySQL server has gone away')
+
+        Connection('localhost', 9306).execute('SELECT 1', ())
+        self.assertTrue(db.close.called)
+        self.assertEqual(connect.call_count, 2)
+
+    def test_error(self, connect):
+        db = Connection('localhost', 9306)._get_db()
+        db.cursor.return_value.execute.side_effect = \
+            MySQLdb.ProgrammingError(1064, 'syntax error')
+
+        with self.assertRaises(MySQLdb.ProgrammingError):
+            Connection('localhost', 9306).execute('SELECT', ())
+        self.assertEqual(connect.call_count, 1)
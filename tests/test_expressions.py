@@ -1,9 +1,10 @@
 from unittest import TestCase, expectedFailure
 import datetime
 
-from sphinxql.core.base import Function, Or
-from sphinxql.sql import Column, And, In, NotIn, Between, NotBetween
-from sphinxql.types import Integer, Bool, Date
+from sphinxql.core.base import Function, Or, InFunction
+from sphinxql.core.lookups import all_in
+from sphinxql.sql import C, Column, And, In, NotIn, Between, NotBetween
+from sphinxql.types import Integer, Bool, Date, Json
 
 
 class ExpressionTestCase(TestCase):
@@ -133,6 +134,21 @@ class BooleansTestCase(TestCase):
         self.assertEqual(r.type(), Bool)
         self.assertEqual(r.sql(), '`test` NOT IN (2, 3, 4, 5)')
 
+    def test_in_function(self):
+        r = InFunction(self.column, (2, 3))
+        self.assertEqual(r.type(), Bool)
+        self.assertEqual(r.sql(), 'IN(`test`, 2, 3)')
+
+        r = Or(r, InFunction(self.column, (4,)))
+        self.assertEqual(r.sql(), '(IN(`test`, 2, 3)) OR (IN(`test`, 4))')
+
+    def test_all_in(self):
+        r = all_in(self.column, (2, 3))
+        self.assertEqual(r.type(), Bool)
+        self.assertEqual(r.sql(), '(`test` = 2) AND (`test` = 3)')
+
+        self.assertRaises(ValueError, all_in, self.column, ())
+
     def test_between(self):
         r = self.column |Between| (2, 3)
         self.assertEqual(r.type(), Bool)
@@ -182,3 +198,35 @@ class OtherTestCase(TestCase):
 
     def test_wrong_function_arguments(self):
         self.assertRaises(IndexError, Function, [1, 2])
+
+
+class JsonPathTestCase(TestCase):
+    def setUp(self):
+        class Index:
+            props = Column(Json, 'props')
+            number = Column(Integer, 'number')
+
+        self.index = Index
+
+    def test_path(self):
+        column = C('props.color').resolve_columns(self.index)
+        self.assertEqual(column.sql(), 'props.color')
+
+        column = C('props.sizes[0]').resolve_columns(self.index)
+        self.assertEqual(column.sql(), 'props.sizes[0]')
+
+    def test_conditions(self):
+        r = (C('props.color') == 'red').resolve_columns(self.index)
+        self.assertEqual(r.type(), Bool)
+        self.assertEqual(r.as_sql(), 'props.color = %s')
+        self.assertEqual(r.get_params(), ['red'])
+
+        r = (C('props.size') |In| (2, 3)).resolve_columns(self.index)
+        self.assertEqual(r.sql(), 'props.size IN (2, 3)')
+
+        r = (C('props.size') > 2).resolve_columns(self.index)
+        self.assertEqual(r.sql(), 'props.size > 2')
+
+    def test_invalid(self):
+        self.assertRaises(KeyError, C('number.color').resolve_columns, self.index)
+        self.assertRaises(ValueError, C('props.color; DROP').resolve_columns, self.index)
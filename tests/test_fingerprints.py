@@ -0,0 +1,130 @@
+from collections import OrderedDict
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from sphinxql.configuration import fingerprints
+from sphinxql.configuration.configurations import IndexConfiguration, \
+    DistributedIndexConfiguration, RtIndexConfiguration, SourceConfiguration
+from sphinxql.configuration.configurators import Configurator
+
+
+class FingerprintsTestCase(TestCase):
+    def setUp(self):
+        self.configurator = Configurator()
+        self.configurator._runtime_configured = True
+        self.configurator._loaded = True
+        self.configurator._configured = True
+        self.configurator.index_path = tempfile.mkdtemp()
+        self.configurator.sphinx_file = os.path.join(self.configurator.index_path,
+                                                     'sphinx.conf')
+
+        self.source = SourceConfiguration('app_index', {
+            'type': 'mysql', 'sql_host': 'localhost', 'sql_user': 'user',
+            'sql_pass': '', 'sql_db': 'db', 'sql_query': 'SELECT id FROM app',
+            'sql_range_step': 100})
+        self.configurator.index_blocks['app_index'] = [
+            self.source,
+            IndexConfiguration('app_index', {'source': 'app_index', 'path': 'p'})]
+        self.configurator.index_blocks['app_sharded'] = [
+            IndexConfiguration('app_sharded_shard0', {'source': 's0', 'path': 'p0'}),
+            IndexConfiguration('app_sharded_shard1', {'source': 's1', 'path': 'p1'}),
+            DistributedIndexConfiguration('app_sharded', {
+                'type': 'distributed', 'local': ['app_sharded_shard0', 'app_sharded_shard1']})]
+        self.configurator.index_blocks['app_rt'] = [
+            RtIndexConfiguration('app_rt', {'type': 'rt', 'path': 'rt', 'rt_field': ['text']})]
+
+    def tearDown(self):
+        shutil.rmtree(self.configurator.index_path)
+
+    def test_order(self):
+        # the order of the parameters does not change the fingerprint
+        params = list(self.source.params.items())
+        reversed_source = SourceConfiguration('app_index', OrderedDict(reversed(params)))
+        self.assertEqual(fingerprints.fingerprint([self.source]),
+                         fingerprints.fingerprint([reversed_source]))
+
+    def test_never_built(self):
+        self.assertEqual(fingerprints.get_changed(self.configurator),
+                         ['app_index', 'app_sharded'])
+
+    def test_changed(self):
+        fingerprints.save(self.configurator)
+        self.assertEqual(fingerprints.get_changed(self.configurator), [])
+
+        # the step does not change the documents
+        self.source.params['sql_range_step'] = 1000
+        self.assertEqual(fingerprints.get_changed(self.configurator), [])
+
+        self.source.params['sql_query'] = 'SELECT id FROM app WHERE id > 2'
+        self.assertEqual(fingerprints.get_changed(self.configurator), ['app_index'])
+
+    def test_range_shard(self):
+        query = mock.Mock()
+
+        def configure(last_id):
+            query.aggregate.return_value = {'min': 1, 'max': last_id}
+            first, _ = Configurator._shard_bounds(query, 1, 2)
+            self.source.params['sql_query'] = 'SELECT id FROM app WHERE id >= %d' % first
+
+        configure(1000)
+        fingerprints.save(self.configurator)
+
+        # a new row does not move the bounds of the shards
+        configure(1001)
+        self.assertEqual(fingerprints.get_changed(self.configurator), [])
+
+    def test_plain_names(self):
+        fingerprints.save(self.configurator, ['app_sharded_shard0'])
+        self.assertEqual(fingerprints.get_changed(self.configurator),
+                         ['app_index', 'app_sharded'])
+
+        fingerprints.save(self.configurator, ['app_sharded_shard0', 'app_sharded_shard1'])
+        self.assertEqual(fingerprints.get_changed(self.configurator), ['app_index'])
+
+    def test_output(self):
+        self.configurator.indexes['app_index'] = None
+        self.configurator.indexer_conf = Configurator._configure_indexer()
+        self.configurator.searchd_conf = self.configurator._configure_searchd()
+
+        self.assertTrue(self.configurator.output())
+        self.assertFalse(self.configurator.output())
+
+        self.source.params['sql_query'] = 'SELECT id FROM app WHERE id > 2'
+        self.assertTrue(self.configurator.output())
+        self.assertEqual(sorted(os.listdir(self.configurator.index_path)),
+                         ['sphinx.conf', 'sphinxql_configuration.pickle'])
+
+    def test_load_configuration(self):
+        self.configurator.indexes['app_index'] = None
+        self.configurator.indexer_conf = Configurator._configure_indexer()
+        self.configurator.searchd_conf = self.configurator._configure_searchd()
+        self.configurator.output()
+
+        configurator = Configurator()
+        configurator._runtime_configured = True
+        configurator.sphinx_file = self.configurator.sphinx_file
+        configurator.indexes['app_index'] = None
+        configurator.load_configuration()
+
+        self.assertFalse(configurator._configured)
+        self.assertEqual(list(configurator.index_blocks), ['app_index'])
+        self.assertEqual([conf.format_output() for conf in configurator.index_blocks['app_index']],
+                         [conf.format_output() for conf in self.configurator.index_blocks['app_index']])
+        self.assertEqual(configurator.get_indexer_names(), ['app_index'])
+
+    def test_load_configuration_of_other_version(self):
+        # a pickle of a class that does not exist in this version.
+        with open(self.configurator._get_cache_file(), 'wb') as f:
+            f.write(b'csphinxql.configuration.configurations\nMissingConfiguration\n.')
+
+        configurator = Configurator()
+        configurator._runtime_configured = True
+        configurator.sphinx_file = self.configurator.sphinx_file
+        configured = []
+        configurator.configure = lambda: configured.append(True)
+        configurator.load_configuration()
+
+        self.assertEqual(configured, [True])
+        self.assertFalse(configurator._loaded)
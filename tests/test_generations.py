@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from sphinxql import configuration
+from sphinxql.configuration import generations
+from sphinxql.configuration.configurations import IndexConfiguration
+from sphinxql.configuration.configurators import Configurator
+from sphinxql.exceptions import SphinxError
+
+
+class MockIndex(object):
+    class Meta:
+        pass
+
+
+class GenerationsTestCase(TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+        self.configurator = Configurator()
+        self.configurator._runtime_configured = True
+        self.configurator._loaded = True
+        self.configurator._configured = True
+        self.configurator.index_path = self.path
+        self.configurator.sphinx_file = os.path.join(self.path, 'sphinx.conf')
+        self.configurator.indexes['app_index'] = MockIndex
+        self.configurator.index_blocks['app_index'] = [IndexConfiguration(
+            'app_index', {'source': 'app_index', 'path': os.path.join(self.path, 'app_index')})]
+        self.configurator.indexer_conf = Configurator._configure_indexer()
+        self.configurator.searchd_conf = self.configurator._configure_searchd()
+        self.configurator.searchd_conf.params['pid_file'] = os.path.join(self.path, 'searchd.pid')
+
+        self.documents = 10
+        patcher = mock.patch.object(configuration, 'indexes_configurator', self.configurator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(configuration, 'call_process', self.call_process)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def call_process(self, args, output=None):
+        if args[0] == 'indexer':
+            # the index is built at the path of the build configuration.
+            with open(args[-1]) as f:
+                path = [line.split('=')[1].strip() for line in f
+                        if line.strip().startswith('path')][0]
+            with open(path + '.sph', 'w') as f:
+                f.write(str(self.documents))
+        elif '--dumpheader' in args:
+            return 'total-documents: %d\n' % self.documents
+        return ''
+
+    def read_index(self):
+        with open(os.path.join(self.path, 'app_index.sph')) as f:
+            return f.read()
+
+    def test_build(self):
+        self.assertEqual(configuration.build_generation(), {'app_index': 1})
+        self.assertEqual(configuration.current_generation('app_index'), 1)
+        self.assertEqual(self.read_index(), '10')
+        self.assertFalse(os.path.exists(self.configurator.sphinx_file + '.build'))
+
+        self.documents = 12
+        self.assertEqual(configuration.build_generation(), {'app_index': 2})
+        self.assertEqual(self.read_index(), '12')
+
+    def test_invalid(self):
+        configuration.build_generation()
+
+        # too few documents compared to the current generation
+        self.documents = 2
+        with self.assertRaises(SphinxError):
+            configuration.build_generation()
+        self.assertEqual(configuration.current_generation('app_index'), 1)
+        self.assertEqual(self.read_index(), '10')
+        self.assertFalse(os.path.exists(generations.get_path(self.configurator, 'app_index', 2) + '.sph'))
+
+    def test_rollback(self):
+        with self.assertRaises(SphinxError):
+            configuration.rollback()
+
+        configuration.build_generation()
+        self.documents = 11
+        configuration.build_generation()
+
+        self.assertEqual(configuration.rollback(), {'app_index': 1})
+        self.assertEqual(configuration.current_generation('app_index'), 1)
+        self.assertEqual(self.read_index(), '10')
+
+    def test_keep(self):
+        for documents in (10, 11, 12):
+            self.documents = documents
+            configuration.build_generation()
+
+        metadata = generations.load(self.configurator, 'app_index')
+        self.assertEqual([entry['generation'] for entry in metadata['generations']], [2, 3])
+        self.assertFalse(os.path.exists(os.path.dirname(
+            generations.get_path(self.configurator, 'app_index', 1))))
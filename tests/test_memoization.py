@@ -0,0 +1,84 @@
+from unittest import TestCase
+
+from sphinxql import memo
+from sphinxql.memoization import MemoMiddleware, get_memo, clear_memo
+from sphinxql.query import execute_query
+
+
+class MockQuery:
+
+    def __init__(self, sql, params=()):
+        self.sql = sql
+        self.params = list(params)
+        self.hits = 0
+
+    def __iter__(self):
+        self.hits += 1
+        return iter([(1, 'a')])
+
+    def meta(self):
+        return {'total_found': '1'}
+
+    def as_sql(self):
+        return self.sql
+
+    def get_params(self):
+        return self.params
+
+
+class MemoTestCase(TestCase):
+
+    def test_memo(self):
+        query = MockQuery('SELECT * FROM test WHERE MATCH(%s)', ['a'])
+
+        with memo():
+            self.assertEqual(execute_query(query), ([(1, 'a')], None))
+            self.assertEqual(execute_query(query), ([(1, 'a')], None))
+            self.assertEqual(query.hits, 1)
+
+            # requires meta
+            rows, meta = execute_query(query, with_meta=True)
+            self.assertEqual(meta, {'total_found': '1'})
+            self.assertEqual(query.hits, 2)
+
+            execute_query(MockQuery('SELECT * FROM test WHERE MATCH(%s)', ['a']))
+            self.assertEqual(query.hits, 2)
+
+            execute_query(MockQuery('SELECT * FROM test WHERE MATCH(%s)', ['b']))
+
+        self.assertEqual(get_memo(), None)
+        execute_query(query)
+        self.assertEqual(query.hits, 3)
+
+    def test_nested(self):
+        query = MockQuery('SELECT * FROM test')
+
+        with memo():
+            execute_query(query)
+            with memo():
+                execute_query(query)
+            self.assertNotEqual(get_memo(), None)
+            execute_query(query)
+        self.assertEqual(query.hits, 1)
+
+    def test_clear(self):
+        query = MockQuery('SELECT * FROM test')
+
+        with memo():
+            execute_query(query)
+            clear_memo()
+            execute_query(query)
+        self.assertEqual(query.hits, 2)
+
+    def test_middleware(self):
+        query = MockQuery('SELECT * FROM test')
+
+        def get_response(request):
+            execute_query(query)
+            execute_query(query)
+            return 'response'
+
+        middleware = MemoMiddleware(get_response)
+        self.assertEqual(middleware('request'), 'response')
+        self.assertEqual(query.hits, 1)
+        self.assertEqual(get_memo(), None)
@@ -0,0 +1,78 @@
+import datetime
+from unittest import TestCase, mock
+
+from sphinxql import fields
+from sphinxql.configuration.configurators import Configurator, pipe_declarations
+from sphinxql.pipe import get_rows
+
+
+def _field(field, name):
+    field._value = name
+    return field
+
+
+class MockInstance:
+
+    def __init__(self, pk, title, views):
+        self.pk = pk
+        self.title = title
+        self.views = views
+        self.date = datetime.date(2014, 2, 2)
+
+    def rendered_title(self):
+        return '<b>%s</b>' % self.title
+
+
+class MockIndex:
+
+    class Meta:
+        fields = [_field(fields.Text('rendered_title'), 'text'),
+                  _field(fields.Integer('views'), 'views'),
+                  _field(fields.Date('date'), 'date'),
+                  _field(fields.IndexedString('title'), 'title'),
+                  _field(fields.Bool(lambda instance: instance.views > 1), 'popular')]
+        index_id = 3
+        source_type = 'pipe'
+
+    @classmethod
+    def build_name(cls):
+        return 'app_index'
+
+
+class PipeTestCase(TestCase):
+
+    def test_declarations(self):
+        self.assertEqual(list(pipe_declarations(MockIndex).items()),
+                         [('tsvpipe_field', ['text']),
+                          ('tsvpipe_attr_bigint', ['views']),
+                          ('tsvpipe_attr_timestamp', ['date']),
+                          ('tsvpipe_field_string', ['title']),
+                          ('tsvpipe_attr_bool', ['popular']),
+                          ('tsvpipe_attr_uint', ['sphinxql_index_id'])])
+
+    def test_source(self):
+        source_conf = Configurator._configure_pipe_source(MockIndex)
+
+        self.assertEqual(source_conf.params['type'], 'tsvpipe')
+        command = source_conf.params['tsvpipe_command']
+        self.assertIn('stream_sphinx_documents', command)
+        self.assertTrue(command.endswith(' app_index'))
+        self.assertEqual(source_conf.params['tsvpipe_field_string'], ['title'])
+
+    @mock.patch.object(Configurator, '_get_indexing_query', mock.Mock())
+    @mock.patch.object(Configurator, '_shard_bounds', return_value=(None, 51))
+    def test_range_shard(self, shard_bounds):
+        with mock.patch.object(MockIndex.Meta, 'shard_by', 'range', create=True):
+            source_conf = Configurator._configure_pipe_source(MockIndex, 'app_index_shard0', (0, 2))
+
+        # the bounds are the ones of the configuration
+        self.assertTrue(source_conf.params['tsvpipe_command'].endswith(
+            ' app_index --shard 0 --shards 2 --shard-after-last 51'))
+        self.assertEqual(shard_bounds.call_args[0][1:], (0, 2))
+
+    def test_rows(self):
+        rows = get_rows(MockIndex, [MockInstance(1, 'a\ttitle', 2),
+                                    MockInstance(2, None, 1)])
+
+        self.assertEqual(rows, ['1\t<b>a title</b>\t2\t1391299200\ta title\t1\t3',
+                                '2\t<b>None</b>\t1\t1391299200\t\t0\t3'])
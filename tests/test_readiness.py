@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from sphinxql.configuration import readiness
+from sphinxql.exceptions import SphinxError
+
+
+class ReadinessTestCase(TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_poll(self):
+        calls = []
+
+        def check():
+            calls.append(1)
+            return len(calls) == 3
+
+        readiness.poll(check, timeout=1)
+        self.assertEqual(len(calls), 3)
+
+    def test_poll_timeout(self):
+        with self.assertRaises(SphinxError):
+            readiness.poll(lambda: False, timeout=0.05)
+
+    def test_pid(self):
+        pid_file = os.path.join(self.path, 'searchd.pid')
+        self.assertEqual(readiness.get_pid(pid_file), None)
+
+        with open(pid_file, 'w') as f:
+            f.write('%d\n' % os.getpid())
+        self.assertEqual(readiness.get_pid(pid_file), os.getpid())
+
+        with open(pid_file, 'w') as f:
+            f.write('')
+        self.assertEqual(readiness.get_pid(pid_file), None)
+
+    def test_rotated(self):
+        path = os.path.join(self.path, 'index')
+        open(path + '.sph', 'w').close()
+        self.assertTrue(readiness.is_rotated([path]))
+
+        open(path + '.new.sph', 'w').close()
+        self.assertFalse(readiness.is_rotated([path]))
@@ -0,0 +1,171 @@
+import threading
+from unittest import TestCase, mock
+
+import MySQLdb
+
+from sphinxql.configuration import connection, routing
+from sphinxql.configuration.configurations import ConnectionConfiguration
+from sphinxql.configuration.connection import Connection
+from sphinxql.exceptions import ImproperlyConfigured, SphinxError
+
+
+class RouterTestCase(TestCase):
+
+    def test_endpoints(self):
+        conf = ConnectionConfiguration({'host': 'localhost', 'port': 9306,
+                                        'endpoints': ['one:9306', 'two:9307']})
+        self.assertEqual(conf.get_endpoints(), [('one', 9306), ('two', 9307)])
+        self.assertEqual(conf.get_routing_parameters(), ('round_robin', 30, 0))
+
+        conf = ConnectionConfiguration({'host': 'localhost', 'port': 9306})
+        self.assertEqual(conf.get_endpoints(), [('localhost', 9306)])
+
+        with self.assertRaises(ImproperlyConfigured):
+            ConnectionConfiguration({'host': 'localhost', 'port': 9306,
+                                     'policy': 'random'})
+
+    def test_round_robin(self):
+        router = routing.Router([('one', 1), ('two', 2)], 'round_robin', 30)
+        first = [router.get_endpoints()[0].host for _ in range(4)]
+        self.assertEqual(first, ['one', 'two', 'one', 'two'])
+
+    def test_least_outstanding(self):
+        router = routing.Router([('one', 1), ('two', 2)], 'least_outstanding', 30)
+        router.start(router.endpoints[0])
+        self.assertEqual([router.get_endpoints()[0].host for _ in range(2)],
+                         ['two', 'two'])
+
+    def test_latency(self):
+        router = routing.Router([('one', 1), ('two', 2)], 'latency', 30)
+        for endpoint, latency in zip(router.endpoints, [0.2, 0.1]):
+            router.start(endpoint)
+            router.finish(endpoint, latency)
+        self.assertEqual([router.get_endpoints()[0].host for _ in range(2)],
+                         ['two', 'two'])
+
+    def test_eject(self):
+        router = routing.Router([('one', 1), ('two', 2)], 'round_robin', 30)
+        router.start(router.endpoints[0])
+        router.finish(router.endpoints[0])
+        self.assertEqual([[e.host for e in router.get_endpoints()] for _ in range(2)],
+                         [['two', 'one'], ['two', 'one']])
+
+        # a success restores it
+        router.start(router.endpoints[0])
+        router.finish(router.endpoints[0], 0.1)
+        self.assertEqual(sorted(router.get_endpoints()[0].host for _ in range(2)),
+                         ['one', 'two'])
+
+
+def _connect(host, port, charset):
+    db = mock.MagicMock()
+    db.host = host
+    if host == 'down':
+        raise MySQLdb.OperationalError(2003, "Can't connect")
+    return db
+
+
+@mock.patch.object(connection.MySQLdb, 'connect', side_effect=_connect)
+class FailoverTestCase(TestCase):
+
+    def setUp(self):
+        connection._reset_connections()
+        self.router = routing.Router([('down', 1), ('up', 2)], 'round_robin', 30)
+        patcher = mock.patch.object(Connection, '_get_router', return_value=self.router)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        connection._reset_connections()
+
+    def test_failover(self, connect):
+        query = Connection()
+        list(query.iterator('SELECT * FROM app_index', ()))
+        list(query.iterator('SELECT * FROM app_index', ()))
+        self.assertEqual(query._endpoint.host, 'up')
+        self.assertTrue(self.router.endpoints[0].ejected_until)
+
+        # the meta is of the endpoint of the last query
+        query.meta()
+        self.assertEqual(connect.call_args[1]['host'], 'up')
+
+    def test_samples(self, connect):
+        # only the latency of the query is a sample, not of its `SHOW META`
+        query = Connection()
+        list(query.iterator('SELECT * FROM app_index', ()))
+        query.meta()
+        self.assertEqual(len(self.router._latencies), 1)
+
+        with self.assertRaises(SphinxError):
+            Connection().execute('DELETE FROM app_index WHERE id = %s', [1])
+        self.assertEqual(len(self.router._latencies), 1)
+
+    def test_write(self, connect):
+        # writes go to every endpoint
+        with self.assertRaises(SphinxError):
+            Connection().execute('DELETE FROM app_index WHERE id = %s', [1])
+        self.assertEqual(sorted(call[1]['host'] for call in connect.call_args_list),
+                         ['down', 'down', 'up'])
+
+
+class HedgeTestCase(TestCase):
+
+    def setUp(self):
+        self.router = routing.Router([('one', 1), ('two', 2)], 'latency', 30, 90)
+        # 'two' is slower, so reads are sent first to 'one'
+        for latency in range(routing.MIN_LATENCIES):
+            self.router.start(self.router.endpoints[1])
+            self.router.finish(self.router.endpoints[1], latency / 1000.)
+
+    def test_delay(self):
+        self.assertEqual(self.router.get_hedge_delay(), 0.018)
+
+        # without enough latencies or a second endpoint, reads are not hedged
+        self.assertIsNone(routing.Router([('one', 1), ('two', 2)], 'latency', 30, 90)
+                          .get_hedge_delay())
+        self.assertIsNone(routing.Router([('one', 1)], 'latency', 30, 90).get_hedge_delay())
+
+    def test_fast(self):
+        result = routing.hedge(self.router, lambda endpoint: endpoint.host, 1)
+        self.assertEqual(result, 'one')
+        self.assertEqual(self.router.get_stats(), {'reads': 1, 'hedged': 0,
+                                                   'hedge_wins': 0, 'hedge_rate': 0.0})
+
+    def test_slow(self):
+        release = threading.Event()
+
+        def fetch(endpoint):
+            if endpoint.host == 'one':
+                release.wait(5)
+            return endpoint.host
+
+        try:
+            result = routing.hedge(self.router, fetch, 0.01)
+        finally:
+            release.set()
+        self.assertEqual(result, 'two')
+        self.assertEqual(self.router.get_stats(), {'reads': 1, 'hedged': 1,
+                                                   'hedge_wins': 1, 'hedge_rate': 1.0})
+
+    def test_failed(self):
+        def fetch(endpoint):
+            if endpoint.host == 'one':
+                raise MySQLdb.OperationalError(2003, "Can't connect")
+            return endpoint.host
+
+        # the second endpoint is asked as soon as the first fails
+        self.assertEqual(routing.hedge(self.router, fetch, 5), 'two')
+
+        def fail(endpoint):
+            raise MySQLdb.OperationalError(2003, "Can't connect to %s" % endpoint.host)
+
+        with self.assertRaisesRegex(MySQLdb.OperationalError, 'one'):
+            routing.hedge(self.router, fail, 5)
+
+    @mock.patch.object(Connection, '_fetch', return_value=([(1, 0)], {'total': '1'}))
+    def test_connection(self, fetch):
+        with mock.patch.object(Connection, '_get_router', return_value=self.router):
+            query = Connection()
+            self.assertEqual(list(query.iterator('SELECT * FROM app_index', ())), [(1, 0)])
+            self.assertEqual(query.meta(), {'total': '1'})
+        self.assertEqual(self.router.reads, 1)
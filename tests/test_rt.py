@@ -0,0 +1,120 @@
+from unittest import TestCase, mock
+
+from django.db import transaction
+
+from django.db.models.signals import post_save
+
+from sphinxql.exceptions import NotSupportedError
+from sphinxql.rt import WriteBuffer, connect_signals, disconnect_signals
+
+
+class MockModel:
+    pass
+
+
+class MockIndex:
+
+    class Meta:
+        rt = True
+        model = MockModel
+
+    @classmethod
+    def build_name(cls):
+        return 'app_index'
+
+
+class MockPlainIndex:
+
+    class Meta:
+        pass
+
+
+@mock.patch('sphinxql.rt.Connection', mock.Mock())
+@mock.patch('sphinxql.rt.replace')
+class WriteBufferTestCase(TestCase):
+
+    def written(self, replace):
+        return [(call[0][0], call[0][1]) for call in replace.call_args_list]
+
+    def test_autocommit(self, replace):
+        buffer = WriteBuffer()
+        buffer.add(MockIndex, [1, 2])
+
+        self.assertEqual(self.written(replace), [(MockIndex, [1, 2])])
+
+    def test_transaction(self, replace):
+        buffer = WriteBuffer()
+        with transaction.atomic():
+            buffer.add(MockIndex, [1, 2])
+            self.assertEqual(self.written(replace), [])
+
+        self.assertEqual(self.written(replace), [(MockIndex, [1, 2])])
+
+    def test_savepoint(self, replace):
+        buffer = WriteBuffer()
+        with transaction.atomic():
+            buffer.add(MockIndex, [1])
+            with self.assertRaises(ValueError):
+                with transaction.atomic():
+                    buffer.add(MockIndex, [2])
+                    raise ValueError
+
+        self.assertEqual(self.written(replace), [(MockIndex, [1])])
+
+    def test_rollback(self, replace):
+        buffer = WriteBuffer()
+        with self.assertRaises(ValueError):
+            with transaction.atomic():
+                buffer.add(MockIndex, [1])
+                raise ValueError
+
+        with transaction.atomic():
+            buffer.add(MockIndex, [2])
+
+        self.assertEqual(self.written(replace), [(MockIndex, [2])])
+
+    def test_batch_size(self, replace):
+        buffer = WriteBuffer(batch_size=2)
+        buffer.add(MockIndex, [1, 2, 3])
+
+        self.assertEqual(replace.call_args[0][3], 2)
+
+    def test_background(self, replace):
+        buffer = WriteBuffer(background=True, interval=60)
+        buffer.start()
+        buffer.add(MockIndex, [1])
+        self.assertEqual(self.written(replace), [])
+
+        buffer.stop()
+        self.assertEqual(self.written(replace), [(MockIndex, [1])])
+
+    def test_background_transaction(self, replace):
+        buffer = WriteBuffer(background=True, interval=60)
+        buffer.start()
+        with transaction.atomic():
+            buffer.add(MockIndex, [1, 2])
+            buffer.add(MockIndex, [2, 3])
+
+        # written once, with repeated ids coalesced.
+        buffer.stop()
+        self.assertEqual(self.written(replace), [(MockIndex, [1, 2, 3])])
+
+    def test_not_rt(self, replace):
+        with self.assertRaises(NotSupportedError):
+            WriteBuffer().add(MockPlainIndex, [1])
+
+
+@mock.patch('sphinxql.rt.get_write_buffer')
+class SignalsTestCase(TestCase):
+
+    def test_disconnect(self, get_write_buffer):
+        instance = MockModel()
+        instance.pk = 1
+
+        connect_signals(MockIndex)
+        post_save.send(sender=MockModel, instance=instance, created=False)
+        get_write_buffer.return_value.add.assert_called_once_with(MockIndex, [1], None)
+
+        disconnect_signals(MockIndex)
+        post_save.send(sender=MockModel, instance=instance, created=False)
+        self.assertEqual(get_write_buffer.return_value.add.call_count, 1)
@@ -0,0 +1,103 @@
+from unittest import TestCase, mock
+
+from sphinxql import fields
+from sphinxql.configuration import indexes_configurator
+from sphinxql.core import scatter
+from sphinxql.core.columns import Column
+from sphinxql.core.query import Query
+from sphinxql.exceptions import SphinxError
+from sphinxql.types import Integer
+
+
+class MockIndex:
+
+    class Meta:
+        fields = []
+
+    @classmethod
+    def build_name(cls):
+        return 'app_index'
+
+
+def _query(limit=None, order_by=()):
+    query = Query()
+    query.fromm.append(MockIndex)
+    query.select.append(Column(Integer, 'views'))
+    for column, ascending in order_by:
+        query.order_by.append(Column(Integer, column), ascending=ascending)
+    query.limit = limit
+    return query
+
+
+class MergeTestCase(TestCase):
+
+    def test_rows(self):
+        # rows (id, views, date) ordered by views DESC, date ASC
+        shards_rows = [[(1, 5, 1), (2, 3, 2)],
+                       [(4, 5, 0), (3, 5, 1), (5, 1, 0)]]
+        rows = scatter.merge_rows(shards_rows, [False, True], 0, 10)
+        self.assertEqual(rows, [(4,), (1,), (3,), (2,), (5,)])
+
+        self.assertEqual(scatter.merge_rows(shards_rows, [False, True], 1, 2), [(1,), (3,)])
+
+    def test_ties(self):
+        # a document in several shards is kept in the order of the shards,
+        # without comparing rows (e.g. with None)
+        shards_rows = [[(1, None, 0.5)], [(1, 'a', 0.5)]]
+        self.assertEqual(scatter.merge_rows(shards_rows, [False], 0, 10),
+                         [(1, None), (1, 'a')])
+
+    def test_counts(self):
+        self.assertEqual(scatter.merge_counts([[(0, 3)], [], [(0, 4)]], [1]), [(0, 7)])
+        self.assertEqual(scatter.merge_counts([[], []], [1]), [])
+
+    def test_meta(self):
+        meta = scatter.merge_meta([
+            {'total': '2', 'total_found': '20', 'time': '0.010', 'keyword[0]': 'a',
+             'docs[0]': '20', 'hits[0]': '30'},
+            {'total': '3', 'total_found': '30', 'time': '0.020', 'keyword[0]': 'a',
+             'docs[0]': '30', 'hits[0]': '31'}])
+        self.assertEqual(meta, {'total': '5', 'total_found': '50', 'time': '0.020',
+                                'keyword[0]': 'a', 'docs[0]': '50', 'hits[0]': '61'})
+
+
+class ExecuteTestCase(TestCase):
+
+    def setUp(self):
+        self.endpoints = [('node0', 9306), ('node1', 9306)]
+        # rows end with the selected weight()
+        self.results = {
+            self.endpoints[0]: ([(1, 10, 7), (3, 30, 5)], {'total_found': '2'}),
+            self.endpoints[1]: ([(2, 20, 6)], {'total_found': '1'})}
+        patcher = mock.patch.object(scatter, '_fetch', side_effect=self._fetch)
+        self.fetch = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fetch(self, sql, params, endpoint):
+        if endpoint not in self.results:
+            raise SphinxError('down')
+        return self.results[endpoint]
+
+    def test_relevance(self):
+        rows, meta = scatter.execute(_query(limit=(1, 2)), self.endpoints)
+
+        sql = self.fetch.call_args[0][0]
+        self.assertEqual(sql, 'SELECT `id`, `views`, weight() AS sphinxql_order_0 '
+                              'FROM app_index ORDER BY weight() DESC LIMIT 0, 3')
+        self.assertEqual(rows, [(2, 20), (3, 30)])
+        self.assertEqual(meta['total_found'], '3')
+
+    def test_failure(self):
+        with self.assertRaises(SphinxError):
+            scatter.execute(_query(), self.endpoints + [('node2', 9306)])
+
+    def test_query(self):
+        # rows end with the selected `views`
+        self.results = {
+            self.endpoints[0]: ([(1, 10, 10), (3, 30, 30)], {'total_found': '2'}),
+            self.endpoints[1]: ([(2, 20, 20)], {'total_found': '1'})}
+        query = _query(limit=(0, 2), order_by=[('views', True)])
+        with mock.patch.dict(indexes_configurator.index_shard_endpoints,
+                             {'app_index': self.endpoints}):
+            self.assertEqual(list(query), [(1, 10), (2, 20)])
+        self.assertEqual(query.meta()['total_found'], '3')
@@ -1,7 +1,7 @@
 import datetime
 from unittest import TestCase
 
-from sphinxql.types import Date, DateTime, Float, String
+from sphinxql.types import Date, DateTime, Float, String, MultiInteger, Json
 
 
 class DateTestCase(TestCase):
@@ -68,3 +68,15 @@ class ConversionsTestCase(TestCase):
 
         db_value = String(string).as_sql() % String(string).get_params()[0]
         self.assertEqual(Float.to_python(db_value), string)
+
+    def test_multi_integer(self):
+        self.assertEqual(MultiInteger((1, 2)).as_sql(), '(1, 2)')
+
+        self.assertEqual(MultiInteger.to_python('1,2,30'), [1, 2, 30])
+        self.assertEqual(MultiInteger.to_python(''), [])
+
+    def test_json(self):
+        self.assertEqual(Json({'color': 'red'}).get_params(), ['{"color": "red"}'])
+
+        self.assertEqual(Json.to_python('{"color": "red"}'), {'color': 'red'})
+        self.assertEqual(Json.to_python(''), None)
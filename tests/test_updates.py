@@ -0,0 +1,77 @@
+import datetime
+from unittest import TestCase, mock
+
+from sphinxql import fields
+from sphinxql.configuration import indexes_configurator
+from sphinxql.exceptions import NotSupportedError
+from sphinxql.updates import update_attributes, AttributesBuffer
+
+
+def _field(field, name):
+    field._value = name
+    return field
+
+
+class MockIndex:
+
+    class Meta:
+        fields = [_field(fields.IndexedString('title'), 'title'),
+                  _field(fields.Integer('views'), 'views'),
+                  _field(fields.Date('date'), 'date')]
+
+    @classmethod
+    def build_name(cls):
+        return 'app_index'
+
+
+class UpdateAttributesTestCase(TestCase):
+
+    def setUp(self):
+        self.connection = mock.Mock()
+
+    def test_update(self):
+        update_attributes(MockIndex, [1, 2], self.connection, views=3,
+                          date=datetime.date(2014, 2, 2))
+
+        self.connection.execute.assert_called_once_with(
+            'UPDATE app_index SET `date` = %s, `views` = %s WHERE id IN (%s, %s)',
+            [1391299200, 3, 1, 2], ['app_index'])
+
+    def test_chunks(self):
+        with mock.patch.object(indexes_configurator.searchd_conf, 'max_filter_values', 2):
+            update_attributes(MockIndex, [1, 2, 3], self.connection, views=3)
+
+        self.assertEqual([call[0][1] for call in self.connection.execute.call_args_list],
+                         [[3, 1, 2], [3, 3]])
+
+    def test_not_numeric(self):
+        with self.assertRaises(NotSupportedError):
+            update_attributes(MockIndex, [1], self.connection, title='a')
+
+
+@mock.patch('sphinxql.rt.Connection', mock.Mock())
+@mock.patch('sphinxql.updates.update_attributes')
+class AttributesBufferTestCase(TestCase):
+
+    def test_grouped_by_values(self, update):
+        buffer = AttributesBuffer(background=True)
+        buffer.add(MockIndex, [1], {'views': 3})
+        buffer.add(MockIndex, [2], {'views': 3})
+        buffer.add(MockIndex, [3], {'views': 4})
+        buffer.flush()
+
+        self.assertEqual([(call[0][1], call[1]) for call in update.call_args_list],
+                         [([1, 2], {'views': 3}), ([3], {'views': 4})])
+
+    def test_last_write_wins(self, update):
+        buffer = AttributesBuffer(background=True)
+        buffer.add(MockIndex, [1], {'views': 3})
+        buffer.add(MockIndex, [1], {'views': 4})
+        buffer.add(MockIndex, [1], {'views': 3})
+        buffer.add(MockIndex, [2], {'views': 4, 'date': datetime.date(2014, 2, 2)})
+        buffer.add(MockIndex, [2], {'views': 5})
+        buffer.flush()
+
+        self.assertEqual([(call[0][1], call[1]) for call in update.call_args_list],
+                         [([1], {'views': 3}),
+                          ([2], {'views': 5, 'date': datetime.date(2014, 2, 2)})])